@@ -0,0 +1,125 @@
+# Import required modules
+import asyncio  # Lock around launches and recycling
+import logging  # Module logger
+from playwright.async_api import async_playwright  # Asynchronous browser automation using Playwright
+from Metrics import metrics  # Run-wide timers and counters
+
+logger = logging.getLogger(__name__)
+
+
+# One launched Chromium with the bookkeeping the pool needs to recycle it
+class PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_opened = 0  # Pages opened in any of its contexts since launch
+        self.active_contexts = 0  # Contexts handed out and not yet released
+        self.retiring = False  # No new contexts once set; closed when the last one is released
+
+
+# Warm Chromium instances shared by every scraper: started once, health-checked before each
+# context is handed out and replaced after max_pages pages to cap memory growth.
+class BrowserPool:
+    def __init__(self, profile=None, max_pages=500):
+        self.profile = profile  # Optional BrowserProfile (launch args and request blocking)
+        self.max_pages = max_pages  # Pages a browser may open before it is recycled (0 = never)
+        self.playwright = None
+        self.current = None  # PooledBrowser receiving new contexts
+        self.contexts = {}  # {context: PooledBrowser}
+        self.lock = asyncio.Lock()
+
+    async def start(self):
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        return self
+
+    async def close(self):
+        browsers = set(self.contexts.values())
+        if self.current is not None:
+            browsers.add(self.current)
+        for pooled in browsers:
+            await self.close_browser(pooled)
+        self.current = None
+        self.contexts = {}
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def launch(self):
+        launch_options = self.profile.launch_options() if self.profile else {'headless': True}
+        with metrics.timer('browser_launch'):
+            browser = await self.playwright.chromium.launch(**launch_options)
+        metrics.increment('browser_launches')
+        logger.info("Launched a pooled browser.")
+        return PooledBrowser(browser)
+
+    async def close_browser(self, pooled):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"Browser was already gone: {e}")
+
+    # A browser is usable if it is still connected and not due for recycling
+    def healthy(self, pooled):
+        if not pooled.browser.is_connected():
+            logger.warning("Pooled browser disconnected; launching a new one.")
+            metrics.increment('failures', stage='browser')
+            return False
+        if self.max_pages and pooled.pages_opened >= self.max_pages:
+            logger.info(f"Recycling browser after {pooled.pages_opened} pages.")
+            return False
+        return True
+
+    # Retire the current browser; it closes once its last context is released
+    async def retire(self, pooled):
+        pooled.retiring = True
+        if pooled.active_contexts == 0 or not pooled.browser.is_connected():
+            await self.close_browser(pooled)
+
+    async def browser(self):
+        """
+        Returns a healthy browser, launching or replacing the current one if needed.
+        """
+        await self.start()
+        async with self.lock:
+            if self.current is not None and not self.healthy(self.current):
+                await self.retire(self.current)
+                self.current = None
+            if self.current is None:
+                self.current = await self.launch()
+            return self.current
+
+    async def new_context(self, **options):
+        """
+        Opens a context on a healthy browser with the profile applied.
+        Release it with release() rather than closing it directly.
+        """
+        pooled = await self.browser()
+        context = await pooled.browser.new_context(**options)
+        pooled.active_contexts += 1
+        self.contexts[context] = pooled
+
+        def count_page(page):
+            pooled.pages_opened += 1
+
+        context.on('page', count_page)
+        if self.profile:
+            await self.profile.apply(context)  # Abort images, fonts, media and trackers
+        return context
+
+    async def release(self, context):
+        pooled = self.contexts.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            logger.debug(f"Context was already closed: {e}")
+        if pooled is None:
+            return
+        pooled.active_contexts -= 1
+        if pooled.retiring and pooled.active_contexts == 0:
+            await self.close_browser(pooled)
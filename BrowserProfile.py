@@ -0,0 +1,68 @@
+# Import required modules
+from urllib.parse import urlparse  # To match request hosts against the tracker list
+
+
+# Lightweight Chromium launch settings and request blocking shared by both scrapers
+class BrowserProfile:
+    # Chromium flags for a headless scraper: no GPU, no background services, minimal caching
+    LAUNCH_ARGS = [
+        '--disable-gpu',
+        '--disable-dev-shm-usage',
+        '--disable-extensions',
+        '--disable-background-networking',
+        '--disable-background-timer-throttling',
+        '--disable-default-apps',
+        '--disable-sync',
+        '--disable-translate',
+        '--mute-audio',
+        '--no-first-run',
+        '--disk-cache-size=1',
+        '--media-cache-size=1',
+    ]
+
+    # Resource types the scrapers never read (image URLs come from the src attribute)
+    BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+
+    # Analytics and ad hosts loaded by the site
+    TRACKER_DOMAINS = (
+        'google-analytics.com',
+        'googletagmanager.com',
+        'googlesyndication.com',
+        'doubleclick.net',
+        'facebook.net',
+        'facebook.com',
+        'hotjar.com',
+        'clarity.ms',
+        'sc-static.net',
+        'snapchat.com',
+        'tiktok.com',
+    )
+
+    def __init__(self, block_resources=True, blocked_types=None, blocked_domains=None):
+        self.block_resources = block_resources  # False keeps the launch args but lets every request through
+        self.blocked_types = set(blocked_types if blocked_types is not None else self.BLOCKED_RESOURCE_TYPES)
+        self.blocked_domains = tuple(blocked_domains if blocked_domains is not None else self.TRACKER_DOMAINS)
+        self.blocked_requests = 0  # Requests aborted so far, across every context using this profile
+
+    # Keyword arguments for chromium.launch()
+    def launch_options(self):
+        return {'headless': True, 'args': list(self.LAUNCH_ARGS)}
+
+    # Install the request-routing layer on a browser context
+    async def apply(self, context):
+        if self.block_resources:
+            await context.route('**/*', self.route_request)
+
+    async def route_request(self, route):
+        if self.should_block(route.request.resource_type, route.request.url):
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    # Block unused resource types and any request to a known tracker host
+    def should_block(self, resource_type, url):
+        if resource_type in self.blocked_types:
+            return True
+        host = urlparse(url).hostname or ''
+        return any(host == domain or host.endswith('.' + domain) for domain in self.blocked_domains)
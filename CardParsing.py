@@ -0,0 +1,210 @@
+# Import required modules
+import hashlib  # Listing IDs of cards without a URL
+import json  # To serialize the identifying fields deterministically
+import re  # Precompiled patterns shared by both scrapers
+from datetime import datetime, timedelta  # Cutoff and absolute posting dates
+
+# Text of the tag that marks a pinned (featured) property card
+PIN_MARKER = 'مميز'
+
+# Class patterns of the offices page, compiled once instead of for every card
+OFFICE_CARD_CLASS = re.compile('relative.*rounded-lg.*flex')
+OFFICE_IMAGE_BOX_CLASS = re.compile('shrink-0')
+OFFICE_IMAGE_CLASS = re.compile('rounded-lg')
+OFFICE_BODY_CLASS = re.compile('ps-3.*overflow-hidden')
+OFFICE_TITLE_CLASS = re.compile('font-bold.*text-lg.*line-clamp-2')
+OFFICE_DESCRIPTION_CLASS = re.compile('line-clamp-2')
+OFFICE_ADS_CLASS = re.compile('text-base.*text-primary-dark.*font-bold')
+LINK_LAST_SEGMENT = re.compile(r'/([^/]+)$')  # Phone number at the end of an office link
+
+# Absolute dates as shown on older cards
+ABSOLUTE_DATE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+# Full ISO 8601 timestamps as sent by the listing API, e.g. "2024-01-31T10:15:00Z"
+TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?')
+
+# Arabic-Indic and Persian digits to ASCII
+DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+
+# Relative time units: singular, dual and plural spellings -> (unit, seconds per unit, amount implied by the word)
+UNITS = {
+    'ثانية': ('second', 1, 1), 'ثانيتين': ('second', 1, 2), 'ثواني': ('second', 1, None), 'ثوان': ('second', 1, None),
+    'دقيقة': ('minute', 60, 1), 'دقيقتين': ('minute', 60, 2), 'دقائق': ('minute', 60, None),
+    'ساعة': ('hour', 3600, 1), 'ساعتين': ('hour', 3600, 2), 'ساعات': ('hour', 3600, None),
+    'يوم': ('day', 86400, 1), 'يومين': ('day', 86400, 2), 'أيام': ('day', 86400, None), 'ايام': ('day', 86400, None),
+    'أسبوع': ('week', 604800, 1), 'اسبوع': ('week', 604800, 1), 'أسبوعين': ('week', 604800, 2),
+    'اسبوعين': ('week', 604800, 2), 'أسابيع': ('week', 604800, None), 'اسابيع': ('week', 604800, None),
+    'شهر': ('month', 2592000, 1), 'شهرين': ('month', 2592000, 2), 'أشهر': ('month', 2592000, None),
+    'اشهر': ('month', 2592000, None), 'شهور': ('month', 2592000, None),
+    'سنة': ('year', 31536000, 1), 'سنتين': ('year', 31536000, 2), 'سنوات': ('year', 31536000, None),
+}
+
+# Date words only match on their own, so "اليوم" (today) is not read as "يوم" (a day) nor "خامس" as "امس".
+# Digits and spaces may touch them ("3ساعات"); letters may not.
+NOT_LETTER_BEFORE = r'(?<![^\W\d_])'
+NOT_LETTER_AFTER = r'(?![^\W\d_])'
+
+
+def date_words(words):
+    return NOT_LETTER_BEFORE + '(' + '|'.join(map(re.escape, words)) + ')' + NOT_LETTER_AFTER
+
+
+# Longest spellings first so "ساعتين" is not read as "ساعة"
+RELATIVE_DATE = re.compile(r'(?:(\d+)\s*)?' + date_words(sorted(UNITS, key=len, reverse=True)))
+JUST_NOW = re.compile(date_words(('الآن', 'الان', 'حالا', 'للتو')))
+TODAY = re.compile(date_words(('اليوم',)))
+YESTERDAY = re.compile(date_words(('أمس', 'امس', 'الأمس', 'الامس', 'بالأمس', 'بالامس', 'البارحة')))
+
+# Units short enough for a card to count as posted today
+RECENT_UNITS = {'second', 'minute', 'hour', 'today'}
+
+# Amounts as shown on cards: "150,000 د.ك", "1.5"; Arabic separators are mapped before matching
+NUMBER = re.compile(r'\d+(?:,\d{3})*(?:\.\d+)?')
+SEPARATORS = str.maketrans({'٬': ',', '٫': '.', '،': ','})
+
+# Currency markers -> ISO 4217 code; the site lists prices in Kuwaiti dinars unless marked otherwise
+CURRENCIES = {'د.ك': 'KWD', 'دينار': 'KWD', 'KWD': 'KWD', 'KD': 'KWD', '$': 'USD', 'USD': 'USD', 'دولار': 'USD'}
+DEFAULT_CURRENCY = 'KWD'
+
+# Fields that identify a listing when it has no URL yet
+ID_FIELDS = ('title', 'image_url', 'image')
+
+# Arabic spelling variants folded together before comparing texts
+DIACRITICS = re.compile('[\u064B-\u065F\u0670\u0640]')  # Harakat, superscript alef and tatweel
+LETTER_VARIANTS = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'})
+NON_WORD = re.compile(r'[^\w]+')
+
+COUNTRY_CODE = '965'  # Kuwait
+LOCAL_NUMBER_LENGTH = 8  # Kuwaiti numbers without the country code
+
+
+# Parse a card date into (absolute datetime, unit); unit is 'timestamp' for full API timestamps,
+# 'absolute' for YYYY-MM-DD dates and 'today' for اليوم.
+# Returns (None, None) for text that is not a recognizable date.
+def parse_date(text, now):
+    text = (text or '').translate(DIGITS)
+    match = TIMESTAMP.search(text)
+    if match:
+        posted_at = parse_timestamp(match.group())
+        if posted_at is not None:
+            return posted_at, 'timestamp'
+    match = ABSOLUTE_DATE.search(text)
+    if match:
+        try:
+            return datetime(*map(int, match.groups())), 'absolute'
+        except ValueError:
+            return None, None
+    if JUST_NOW.search(text):
+        return now, 'second'
+    if TODAY.search(text):
+        return now.replace(hour=0, minute=0, second=0, microsecond=0), 'today'
+    if YESTERDAY.search(text):
+        return now - timedelta(days=1), 'day'
+    match = RELATIVE_DATE.search(text)
+    if match:
+        unit, seconds, implied = UNITS[match.group(2)]
+        amount = int(match.group(1)) if match.group(1) else (implied or 1)
+        return now - timedelta(seconds=amount * seconds), unit
+    return None, None
+
+
+# Absolute timestamps for a batch of card date texts ("منذ 3 ساعات" -> now minus 3 hours)
+def normalize_dates(texts, now=None):
+    now = now or datetime.now()
+    return [parse_date(text, now)[0] for text in texts]
+
+
+# Classifies card records against a cutoff computed once per scan (yesterday at midnight)
+class CardClassifier:
+    def __init__(self, now=None):
+        self.now = now or datetime.now()
+        self.cutoff = (self.now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # Tag a raw card record with is_pinned, date_text, posted_at and is_old.
+    # Absolute dates are old before the cutoff; relative ones are old unless given in seconds, minutes or hours,
+    # and full timestamps by the same rule: old once a day has passed, when the card would read "منذ يوم".
+    def classify(self, record):
+        pin_text = record.get('pin_text')
+        record['is_pinned'] = bool(pin_text and PIN_MARKER in pin_text)
+        record['date_text'] = (record.get('relative_date') or '').strip()
+
+        posted_at, unit = parse_date(record['date_text'], self.now)
+        record['posted_at'] = posted_at.isoformat(timespec='seconds') if posted_at else None
+        if unit == 'timestamp':
+            record['is_old'] = self.now - posted_at >= timedelta(days=1)
+        elif unit == 'absolute':
+            record['is_old'] = posted_at < self.cutoff
+        else:
+            record['is_old'] = unit not in RECENT_UNITS
+        return record
+
+    def classify_many(self, records):
+        for record in records:
+            self.classify(record)
+        return records
+
+
+# (amount, currency) of a price text such as "150,000 د.ك"; (None, None) without a number
+def parse_price(text):
+    if text is None:
+        return None, None
+    text = str(text).translate(DIGITS).translate(SEPARATORS)
+    match = NUMBER.search(text)
+    if not match:
+        return None, None
+    currency = next((code for marker, code in CURRENCIES.items() if marker in text), DEFAULT_CURRENCY)
+    return float(match.group().replace(',', '')), currency
+
+
+# Integer count (views, ads) from text such as "1,234" or "٣٤"; ints pass through
+def parse_count(value):
+    if value is None or isinstance(value, int):
+        return value
+    match = NUMBER.search(str(value).translate(DIGITS).translate(SEPARATORS))
+    return int(float(match.group().replace(',', ''))) if match else None
+
+
+# E.164 phone number ("+96550000000") from tel: hrefs, local numbers or numbers with 00/+ prefixes.
+# Returns None when the text holds no digits.
+def normalize_phone(value):
+    if value is None:
+        return None
+    digits = re.sub(r'\D', '', str(value).translate(DIGITS))
+    if not digits:
+        return None
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if len(digits) == LOCAL_NUMBER_LENGTH:
+        digits = COUNTRY_CODE + digits
+    return f"+{digits}"
+
+
+# datetime from a datetime or an ISO 8601 string; None for anything else.
+# Timestamps with a UTC offset are converted to naive local time, like the scrape clock.
+def parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo is not None else parsed
+
+
+# Stable ID for a card: its detail URL when known, otherwise a hash of its identifying fields
+def listing_id(record):
+    url = record.get('detail_url') or record.get('link')
+    if url:
+        return url
+    key = json.dumps([record.get(field) for field in ID_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# Text folded for near-duplicate comparison: no diacritics, unified letter variants, ASCII digits,
+# lowercase words separated by single spaces
+def normalize_text(text):
+    text = DIACRITICS.sub('', str(text or '')).translate(LETTER_VARIANTS).translate(DIGITS).lower()
+    return NON_WORD.sub(' ', text).strip()
@@ -0,0 +1,105 @@
+# Import required modules
+from dataclasses import dataclass, asdict, fields  # Typed, lightweight record containers
+from datetime import datetime  # Absolute posting dates
+import pyarrow as pa  # Typed columns of a batch of records
+import CardParsing  # Normalizers for prices, counts, phones and dates
+
+# Column types of the record fields, by annotation
+ARROW_TYPES = {str: pa.string(), float: pa.float64(), int: pa.int64(), datetime: pa.timestamp('us')}
+
+
+# Shared behaviour of the output records: dict rows for the writers and typed columns for batches
+class ListingRecord:
+    __slots__ = ()
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def arrow_schema(cls):
+        return pa.schema([(field.name, ARROW_TYPES[field.type]) for field in fields(cls)])
+
+    # {field: [values]} of a batch of records
+    @classmethod
+    def columns(cls, records):
+        return {field.name: [getattr(record, field.name) for record in records] for field in fields(cls)}
+
+    @classmethod
+    def to_arrow(cls, records):
+        return pa.Table.from_pydict(cls.columns(records), schema=cls.arrow_schema())
+
+    @classmethod
+    def to_frame(cls, records):
+        return frame_from_arrow(cls.to_arrow(records))
+
+
+# pandas DataFrame of an Arrow table, keeping integer columns with missing values as integers
+def frame_from_arrow(table):
+    import pandas as pd  # Imported on first use: only the pandas Excel writer and history snapshots need it
+    pandas_types = {pa.string(): pd.StringDtype(), pa.int64(): pd.Int64Dtype()}  # Nullable strings and integers
+    return table.to_pandas(types_mapper=pandas_types.get)
+
+
+# One property listing from the sale/rent/exchange search pages.
+# Built from raw scraped strings; price, views, phone and date are normalized on creation.
+@dataclass(slots=True)
+class PropertyCard(ListingRecord):
+    title: str = None
+    price: str = None  # Price as shown on the card, e.g. "150,000 د.ك"
+    price_value: float = None  # Numeric amount of the price
+    currency: str = None  # ISO 4217 code of the price
+    relative_date: str = None  # Date as shown on the card, e.g. "منذ 3 ساعات"
+    posted_at: datetime = None  # Absolute posting time
+    description: str = None
+    image_url: str = None
+    link: str = None
+    mobile_number: str = None  # E.164, e.g. "+96550000000"
+    views_number: int = None
+    pin_status: str = None
+    duplicate_of: str = None  # Listing ID of the earliest listing this one near-duplicates, if any
+
+    def __post_init__(self):
+        if self.price_value is None:
+            self.price_value, self.currency = CardParsing.parse_price(self.price)
+        self.posted_at = CardParsing.parse_timestamp(self.posted_at)
+        self.mobile_number = CardParsing.normalize_phone(self.mobile_number)
+        self.views_number = CardParsing.parse_count(self.views_number)
+
+
+# A property listing the seen index already holds, fetched again only so the history store records its
+# daily views. Main writes it to the history store alone; the output files keep new or changed listings.
+class UnchangedPropertyCard(PropertyCard):
+    __slots__ = ()
+
+
+# One office from the offices page
+@dataclass(slots=True)
+class OfficeCard(ListingRecord):
+    image: str = None
+    title: str = None
+    description: str = None
+    ads: str = None
+    link: str = None
+    mobile_number: str = None  # E.164, e.g. "+96550000000"
+
+    def __post_init__(self):
+        self.mobile_number = CardParsing.normalize_phone(self.mobile_number)
+
+
+# Base class for scraping failures surfaced to Main
+class ScrapeError(Exception):
+    pass
+
+
+# Raised when a section page has no cards to scrape
+class NoCardsFound(ScrapeError):
+    def __init__(self, url):
+        super().__init__(f"No cards found on {url}")
+        self.url = url
+
+
+# Raised when queued detail pages could not be loaded, so the work queue retries them
+class DetailPagesFailed(ScrapeError):
+    def __init__(self, urls):
+        super().__init__(f"{len(urls)} detail pages failed to load, first {urls[0]}")
+        self.urls = urls
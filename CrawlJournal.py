@@ -0,0 +1,110 @@
+# Import required modules
+import glob  # Journals of earlier runs
+import json  # One JSON entry per journal line
+import logging  # Module logger
+import os  # Journal paths and fsync
+import re  # Dated run folder names
+
+logger = logging.getLogger(__name__)
+
+
+# Append-only checkpoint journal of one section crawl: the scanned card list, every emitted
+# card and a final "done" marker. A resumed crawl replays it and only does the unfinished work.
+class CrawlJournal:
+    def __init__(self, folder, section, resume=False):
+        self.path = os.path.join(folder, f"{section}.journal.jsonl")
+        self.scan = None  # Classified card records saved after the scroll phase
+        self.entries = {}  # {card key: card dict} of the cards already emitted, in order
+        self.done = False  # The section finished in a previous attempt
+        os.makedirs(folder, exist_ok=True)
+        if resume:
+            self.load()
+        elif os.path.exists(self.path):
+            os.remove(self.path)  # A fresh crawl starts a fresh journal
+        self.file = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            valid = 0  # Offset just past the last complete entry
+            for line in f:
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    # A line cut short by a crash ends the usable journal; drop it so new entries start clean
+                    f.truncate(valid)
+                    break
+                valid += len(line)
+                if entry['type'] == 'scan':
+                    self.scan = entry['records']
+                elif entry['type'] == 'cards':
+                    for key, card in entry['cards']:
+                        self.entries[key] = card
+                elif entry['type'] == 'done':
+                    self.done = True
+        logger.info(
+            f"Resuming from {self.path}: {len(self.entries)} cards done"
+            f"{', scan saved' if self.scan is not None else ''}{', section complete' if self.done else ''}."
+        )
+
+    # Cards emitted before the crash, in their original order
+    def cards(self):
+        return list(self.entries.values())
+
+    def processed(self, key):
+        return key in self.entries
+
+    def append(self, entry, sync=False):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def save_scan(self, records):
+        self.scan = records
+        self.append({'type': 'scan', 'records': records}, sync=True)
+
+    # Checkpoint a batch of emitted cards as [(key, card dict)]
+    def add_cards(self, cards):
+        if not cards:
+            return
+        for key, card in cards:
+            self.entries[key] = card
+        self.append({'type': 'cards', 'cards': [[key, card] for key, card in cards]})
+
+    def finish(self):
+        self.done = True
+        self.append({'type': 'done'}, sync=True)
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # Remove the journal of a section that failed while the run went on; a resumed run starts it over
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    # True when the journal at path ends with the "done" marker written by finish()
+    @staticmethod
+    def finished(path):
+        with open(path, 'rb') as f:
+            f.seek(max(0, os.path.getsize(path) - 64))
+            lines = f.read().splitlines()
+        return bool(lines) and lines[-1].strip() == json.dumps({'type': 'done'}).encode()
+
+
+# Dated run folders under root (YYYY-MM-DD/.journal/) holding a journal without its "done" marker, oldest first
+def unfinished_runs(root='.'):
+    dates = set()
+    for path in glob.glob(os.path.join(root, '*', '.journal', '*.journal.jsonl')):
+        date = os.path.basename(os.path.dirname(os.path.dirname(path)))
+        if re.fullmatch(r'\d{4}-\d{2}-\d{2}', date) and not CrawlJournal.finished(path):
+            dates.add(date)
+    return sorted(dates)
@@ -0,0 +1,141 @@
+# Import required modules
+import asyncio  # For bounding concurrent requests
+import json  # To decode embedded JSON state
+import logging  # Module logger
+from urllib.parse import unquote, urlparse  # Listing ID at the end of a detail URL
+import httpx  # Async HTTP client with connection pooling and keep-alive
+from bs4 import BeautifulSoup  # For HTML parsing
+from Metrics import metrics  # Run-wide timers and counters
+
+logger = logging.getLogger(__name__)
+
+
+# Fetches listing detail pages over plain HTTP instead of driving a browser
+class DetailPageFetcher:
+    # Keys that hold the phone number / view count in embedded JSON state (compared lowercased)
+    PHONE_KEYS = {'phone', 'mobile', 'phonenumber', 'mobilenumber', 'phone_number', 'mobile_number'}
+    VIEW_KEYS = {'views', 'viewscount', 'views_count', 'viewcount', 'view_count'}
+    ID_KEYS = ('id', '_id', 'postId', 'post_id', 'uuid', 'slug')  # Keys identifying the listing object in the state
+
+    def __init__(self, max_connections=10, timeout=20, scheduler=None):
+        self.max_connections = max_connections  # Upper bound on simultaneous requests
+        self.scheduler = scheduler  # Optional RequestScheduler for rate limiting and retries
+        self.timeout = timeout  # Per-request timeout in seconds
+        self.client = None  # Shared httpx.AsyncClient, opened in __aenter__
+        self.semaphore = asyncio.Semaphore(max_connections)
+
+    # Create the pooled client; one client for every request so TCP/TLS connections are reused
+    def open(self):
+        self.client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept-Language': 'ar,en;q=0.8',
+            },
+        )
+        return self
+
+    async def close(self):
+        await self.client.aclose()
+        self.client = None
+
+    async def __aenter__(self):
+        return self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # Fetch several detail URLs concurrently, returning (mobile, views) per URL in the same order
+    async def fetch_many(self, urls):
+        return await asyncio.gather(*(self.fetch_details(url) for url in urls))
+
+    # Fetch one detail URL and parse phone and views; (None, None) when the request fails
+    async def fetch_details(self, url):
+        async with self.semaphore:
+            try:
+                if self.scheduler is not None:
+                    response = await self.scheduler.run(lambda: self.client.get(url), f"Fetching {url}")
+                else:
+                    response = await self.client.get(url)
+                response.raise_for_status()
+            except Exception as e:
+                logger.warning(f"HTTP fetch failed for {url}: {e}")
+                metrics.increment('failures', stage='detail_http')
+                return None, None
+        return self.parse_details(response.text, url)
+
+    def parse_details(self, html, url):
+        """
+        Extracts phone and views from the listing's own contact and views
+        blocks, then from the embedded JSON object of the listing whose id
+        ends the URL. Values found anywhere else on the page (the site's
+        number in the header, related listings) are never used: a value that
+        is missing here is None, so the caller falls back to the browser.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+
+        mobile_number = None
+        tel_link = soup.select_one('.flex.gap-3.justify-center a[href^="tel:"]')
+        if tel_link:
+            mobile_number = tel_link['href'][4:]
+
+        views_number = None
+        views_element = soup.select_one(
+            '.flex.items-center.justify-center.gap-1.rounded.bg-whitish-transparent.py-1.px-1\\.5.text-xs.min-w-\\[62px\\] div')
+        if views_element:
+            views_number = views_element.get_text()
+
+        if mobile_number is None or views_number is None:
+            listing = self.find_listing(self.extract_json_state(soup), self.listing_key(url))
+            if listing is not None:
+                if mobile_number is None:
+                    mobile_number = self.find_value(listing, self.PHONE_KEYS)
+                if views_number is None:
+                    views_number = self.find_value(listing, self.VIEW_KEYS)
+
+        return mobile_number, views_number
+
+    # Last path segment of a detail URL, e.g. "90211" for https://www.boshamlan.com/ad/90211
+    def listing_key(self, url):
+        segments = [segment for segment in urlparse(url or '').path.split('/') if segment]
+        return unquote(segments[-1]) if segments else None
+
+    # The object in the embedded state whose id (or slug) equals the listing key; None when there is none
+    def find_listing(self, state, listing_key):
+        if not listing_key:
+            return None
+        stack = [state]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                if any(str(current.get(key)) == listing_key for key in self.ID_KEYS if current.get(key) is not None):
+                    return current
+                stack.extend(reversed(list(current.values())))
+            elif isinstance(current, list):
+                stack.extend(reversed(current))
+        return None
+
+    # Collect JSON payloads embedded in <script> tags (e.g. __NEXT_DATA__)
+    def extract_json_state(self, soup):
+        state = []
+        for script in soup.find_all('script', type='application/json'):
+            try:
+                state.append(json.loads(script.string or ''))
+            except ValueError:
+                continue
+        return state
+
+    # First non-empty scalar under one of the keys in the listing object or its nested objects
+    # (e.g. listing.owner.phone); lists are not searched, as they hold related listings and the like
+    def find_value(self, listing, keys):
+        stack = [listing]
+        while stack:
+            current = stack.pop()
+            for key, value in current.items():
+                if key.lower() in keys and isinstance(value, (str, int)) and not isinstance(value, bool) and str(value).strip():
+                    return str(value)
+            stack.extend(reversed([value for value in current.values() if isinstance(value, dict)]))
+        return None
@@ -0,0 +1,161 @@
+# Import required modules
+import logging  # Module logger
+import sqlite3  # Signatures persist across runs so reposts are found across days
+import zlib  # Stable 32-bit hashes of the text shingles
+from datetime import datetime, timedelta  # Retention of old signatures
+import numpy as np  # Vectorized MinHash
+import CardParsing  # Arabic text normalization and listing IDs
+from Metrics import metrics  # Run-wide timers and counters
+
+logger = logging.getLogger(__name__)
+
+
+# Near-duplicate detection for property listings: a MinHash signature of each listing's normalized
+# title and description is split into LSH bands, so reposts and listings copied into another section
+# are found by bucket lookups instead of comparing every pair. Signatures are kept in SQLite for
+# retention_days, so a repost is recognized across days and sections.
+class DuplicateIndex:
+    PRIME = np.uint64((1 << 61) - 1)  # Mersenne prime of the universal hash family
+    MAX_HASH = np.uint64((1 << 32) - 1)
+    SHINGLE_SIZE = 4  # Characters per shingle
+    MIN_SHINGLES = 8  # Texts shorter than this carry too little to compare
+
+    def __init__(self, path='duplicates.sqlite3', threshold=0.8, phone_threshold=0.5, repost_threshold=0.9,
+                 num_perm=128, bands=32, retention_days=60, seed=1):
+        """
+        threshold is the estimated Jaccard similarity that makes two listings
+        duplicates; phone_threshold applies instead when both share a phone
+        number. repost_threshold is the stricter similarity find_repost uses
+        before any phone is known. num_perm/bands set the LSH shape: with
+        128/32 (4 rows per band) pairs from about 0.45 similarity become
+        candidates, and candidates are then checked against the thresholds.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.phone_threshold = phone_threshold
+        self.repost_threshold = repost_threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)  # Fixed seed: signatures stored on earlier days stay comparable
+        self.a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+        self.entries = {}  # {listing_id: (cluster, phone, signature)}
+        self.buckets = {}  # {(band, band bytes): {listing_id}}
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS signatures (
+                listing_id TEXT PRIMARY KEY,
+                cluster TEXT NOT NULL,
+                section TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                phone TEXT,
+                signature BLOB NOT NULL
+            )"""
+        )
+        cutoff = (datetime.now() - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+        self.connection.execute('DELETE FROM signatures WHERE last_seen < ?', (cutoff,))
+        self.connection.commit()
+        for listing_id, cluster, phone, signature in self.connection.execute(
+                'SELECT listing_id, cluster, phone, signature FROM signatures'):
+            self.remember(listing_id, cluster, phone, np.frombuffer(signature, dtype=np.uint32))
+        logger.info(f"Loaded {len(self.entries)} listing signatures from {path}.")
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    # MinHash signature of a listing's title and description; None when the text is too short
+    def signature(self, title, description):
+        text = CardParsing.normalize_text(f"{title or ''} {description or ''}")
+        shingles = {text[i:i + self.SHINGLE_SIZE] for i in range(len(text) - self.SHINGLE_SIZE + 1)}
+        if len(shingles) < self.MIN_SHINGLES:
+            return None
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64)
+        # One row per permutation: (a * x + b) mod p, truncated to 32 bits, minimum over the shingles.
+        # a * x needs up to 93 bits, so the uint64 products (and the + b) wrap around modulo 2**64 before
+        # the mod p: the hashes are not exactly the universal family, but they are deterministic, which
+        # keeps stored signatures comparable, and still spread well enough for MinHash
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % self.PRIME & self.MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def remember(self, listing_id, cluster, phone, signature):
+        previous = self.entries.get(listing_id)
+        if previous is not None:
+            for key in self.band_keys(previous[2]):
+                self.buckets.get(key, set()).discard(listing_id)
+        self.entries[listing_id] = (cluster, phone, signature)
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, set()).add(listing_id)
+
+    def match(self, listing_id, signature, phone=None, threshold=None):
+        """
+        Best earlier listing (other than listing_id itself) similar enough to
+        the signature: (cluster, matched listing_id, phone, similarity), or None.
+        """
+        candidates = set()
+        for key in self.band_keys(signature):
+            candidates.update(self.buckets.get(key, ()))
+        candidates.discard(listing_id)
+
+        best = None
+        for candidate in candidates:
+            cluster, candidate_phone, candidate_signature = self.entries[candidate]
+            similarity = float(np.mean(candidate_signature == signature))
+            required = threshold if threshold is not None else self.threshold
+            if threshold is None and phone and phone == candidate_phone:
+                required = self.phone_threshold
+            if similarity >= required and (best is None or similarity > best[3]):
+                best = (cluster, candidate, candidate_phone, similarity)
+        return best
+
+    def add(self, listing_id, cluster, section, date, phone, signature):
+        self.remember(listing_id, cluster, phone, signature)
+        self.connection.execute(
+            """INSERT OR REPLACE INTO signatures (listing_id, cluster, section, last_seen, phone, signature)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (listing_id, cluster, section, date, phone, signature.tobytes())
+        )
+
+    async def flag(self, records, section, date):
+        """
+        Passes a stream of PropertyCard records through, setting duplicate_of
+        to the cluster (the listing ID of its earliest member) of every
+        record that duplicates a listing seen before, in this run or on an
+        earlier day, then indexing the record itself.
+        """
+        flagged = 0
+        try:
+            async for record in records:
+                signature = self.signature(record.title, record.description)
+                if signature is not None:
+                    listing_id = CardParsing.listing_id(
+                        {'link': record.link, 'title': record.title, 'image_url': record.image_url}
+                    )
+                    matched = self.match(listing_id, signature, record.mobile_number)
+                    cluster = listing_id
+                    if matched is not None and matched[0] != listing_id:  # A cluster's first listing is not its own duplicate
+                        cluster = matched[0]
+                        record.duplicate_of = cluster
+                        flagged += 1
+                    self.add(listing_id, cluster, section, date, record.mobile_number, signature)
+                yield record
+        finally:
+            self.connection.commit()
+            metrics.increment('duplicates_flagged', flagged, section=section)
+            if flagged:
+                logger.info(f"Flagged {flagged} {section} listings as near-duplicates.")
+
+    # Earlier listing a raw card record reposts, judged from its text alone (its phone is not known
+    # before the detail fetch): (cluster, listing_id, phone, similarity) or None. Text alone does not
+    # show the same owner posted it, so callers should not reuse the earlier listing's phone
+    def find_repost(self, record):
+        signature = self.signature(record.get('title'), record.get('description'))
+        if signature is None:
+            return None
+        return self.match(CardParsing.listing_id(record), signature, threshold=self.repost_threshold)
@@ -0,0 +1,157 @@
+# Import required modules
+import glob  # Partitions on disk
+import logging  # Module logger
+import os  # Partition paths and atomic renames
+import sqlite3  # Listing-ID index of the daily observations
+import pandas as pd  # Snapshots of several sections are concatenated
+import pyarrow.parquet as pq  # Partition files
+import CardParsing  # Listing IDs shared with the seen index
+from CardRecords import frame_from_arrow  # Typed DataFrame of an Arrow table
+from RecordWriters import ParquetWriter  # Row-group writer reused for the partitions
+
+logger = logging.getLogger(__name__)
+
+
+# Local history of every run: one zstd Parquet file per day and section under root/date=YYYY-MM-DD/,
+# plus an SQLite index of each listing's daily views, price and pin status keyed by listing ID,
+# so a listing's history is one indexed lookup instead of a pass over every daily workbook.
+class HistoryStore:
+    def __init__(self, root='history'):
+        self.root = root  # Folder holding the date partitions and the index
+        os.makedirs(root, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(root, 'index.sqlite3'))
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS observations (
+                listing_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                section TEXT NOT NULL,
+                views INTEGER,
+                price REAL,
+                currency TEXT,
+                pin_status TEXT,
+                PRIMARY KEY (listing_id, date, section)
+            ) WITHOUT ROWID"""
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def partition_path(self, date, section):
+        return os.path.join(self.root, f"date={date}", f"{section}.parquet")
+
+    # Writer adding one section of one day to the store; pass it to a MultiWriter next to the output formats
+    def writer(self, date, section):
+        return HistoryWriter(self, date, section)
+
+    # Replace the index rows of a day's section with its new observations
+    def index(self, date, section, observations):
+        with self.connection:
+            self.connection.execute('DELETE FROM observations WHERE date = ? AND section = ?', (date, section))
+            self.connection.executemany(
+                """INSERT OR REPLACE INTO observations (listing_id, date, section, views, price, currency, pin_status)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(listing_id, date, section, *values) for listing_id, *values in observations]
+            )
+
+    def history(self, listing_id):
+        """
+        Daily observations of a listing, oldest first, as dicts with date,
+        section, views, price, currency and pin_status plus day-over-day
+        views_delta and price_delta (None on the first day or when either day
+        lacks the value).
+        """
+        rows = self.connection.execute(
+            """SELECT date, section, views, price, currency, pin_status FROM observations
+               WHERE listing_id = ? ORDER BY date, section""",
+            (listing_id,)
+        ).fetchall()
+        result = []
+        previous = None
+        for date, section, views, price, currency, pin_status in rows:
+            result.append({
+                'date': date,
+                'section': section,
+                'views': views,
+                'price': price,
+                'currency': currency,
+                'pin_status': pin_status,
+                'views_delta': self.delta(previous['views'] if previous else None, views),
+                'price_delta': self.delta(previous['price'] if previous else None, price),
+            })
+            previous = result[-1]
+        return result
+
+    def delta(self, before, after):
+        return None if before is None or after is None else after - before
+
+    # Listing IDs whose views grew the most between two captured days: [(listing_id, views_delta)]
+    def top_movers(self, date, previous_date, limit=20):
+        rows = self.connection.execute(
+            """SELECT today.listing_id, today.views - before.views AS delta
+               FROM observations AS today
+               JOIN observations AS before
+                 ON before.listing_id = today.listing_id AND before.section = today.section AND before.date = ?
+               WHERE today.date = ? AND today.views IS NOT NULL AND before.views IS NOT NULL
+               ORDER BY delta DESC LIMIT ?""",
+            (previous_date, date, limit)
+        )
+        return rows.fetchall()
+
+    # Days present in the store, oldest first
+    def dates(self):
+        rows = self.connection.execute('SELECT DISTINCT date FROM observations ORDER BY date')
+        return [date for (date,) in rows]
+
+    # Full records of one day as a typed DataFrame (every section, or one), with a section column
+    def snapshot(self, date, section=None):
+        sections = [section] if section else [
+            os.path.splitext(os.path.basename(path))[0]
+            for path in sorted(glob.glob(os.path.join(self.root, f"date={date}", '*.parquet')))
+        ]
+        frames = []
+        for name in sections:
+            path = self.partition_path(date, name)
+            if os.path.exists(path):
+                frame = frame_from_arrow(pq.read_table(path))
+                frame.insert(0, 'section', name)
+                frames.append(frame)
+        if not frames:
+            return None
+        # Property and office sections share only some columns; the others are left empty
+        return pd.concat(frames, ignore_index=True)
+
+
+# Writes one day's section into the store: the records go to the date partition (through a temporary
+# file, so an interrupted run never leaves a half-written partition) and their views/price to the index.
+class HistoryWriter(ParquetWriter):
+    def __init__(self, store, date, section):
+        super().__init__(os.path.join(store.root, f"date={date}"), section)
+        self.store = store
+        self.date = date
+        self.section = section
+        self.final_path = self.path
+        self.path = os.path.join(os.path.dirname(self.final_path), f".{section}.parquet.tmp")
+        self.observations = []  # (listing_id, views, price, currency, pin_status) per record
+
+    # The history stays local; nothing here is uploaded with the run's output files
+    def paths(self):
+        return []
+
+    def write(self, row):
+        super().write(row)
+        self.observations.append((
+            CardParsing.listing_id(row),
+            row.get('views_number'),
+            row.get('price_value'),
+            row.get('currency'),
+            row.get('pin_status'),
+        ))
+
+    def close(self):
+        super().close()
+        if self.writer is None:
+            return  # No records: keep whatever the store already holds for this day
+        os.replace(self.path, self.final_path)
+        self.store.index(self.date, self.section, self.observations)
+        logger.info(f"Added {len(self.observations)} {self.section} records of {self.date} to the history store.")
@@ -0,0 +1,255 @@
+# Import required modules
+import asyncio  # For tracking response handlers and polling
+import json  # To build a stable dedup key for listing items
+import logging  # Module logger
+from datetime import datetime  # Epoch timestamps in API items
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse, urljoin  # To rewrite the paging parameter
+from CardParsing import PIN_MARKER  # Text of the pinned-card tag
+
+logger = logging.getLogger(__name__)
+
+
+# Captures the site's listing API (XHR/fetch JSON) responses and pages through the endpoint directly
+class ListingApiCapture:
+    BASE_URL = 'https://www.boshamlan.com'
+
+    # Parameter names that select a page (page number) or an offset (item count)
+    PAGE_PARAMS = ('page', 'p', 'pageNumber', 'page_number', 'pageIndex', 'offset', 'skip', 'start', 'from')
+    OFFSET_PARAMS = {'offset', 'skip', 'start', 'from'}
+
+    # Candidate keys for each listing field, in order of preference
+    ID_KEYS = ('id', '_id', 'postId', 'post_id', 'uuid', 'slug')
+    TITLE_KEYS = ('title', 'name', 'subject')
+    PRICE_KEYS = ('price', 'priceText', 'price_text', 'amount')
+    DATE_KEYS = ('date', 'createdAt', 'created_at', 'publishedAt', 'published_at', 'postDate', 'updatedAt', 'updated_at')
+    DESCRIPTION_KEYS = ('description', 'desc', 'body', 'content', 'details', 'text')
+    IMAGE_KEYS = ('image', 'imageUrl', 'image_url', 'thumbnail', 'cover', 'photo', 'images', 'photos', 'media')
+    LINK_KEYS = ('url', 'link', 'href', 'path')  # A bare slug or ID is not a path, so it is not used as a link
+    PHONE_KEYS = ('phone', 'mobile', 'phoneNumber', 'mobileNumber', 'phone_number', 'mobile_number')
+    VIEW_KEYS = ('views', 'viewsCount', 'views_count', 'viewCount', 'view_count')
+    ADS_KEYS = ('ads', 'adsCount', 'ads_count', 'postsCount', 'posts_count', 'listingsCount')  # An office's ad count
+    STICKY_KEYS = ('sticky', 'isSticky', 'is_sticky', 'pinned', 'isPinned', 'is_pinned', 'featured', 'isFeatured')
+
+    def __init__(self, max_pages=100, scheduler=None):
+        self.max_pages = max_pages  # Upper bound on directly requested pages
+        self.scheduler = scheduler  # Optional RequestScheduler for rate limiting and retries
+        self.payloads = []  # Listing item lists captured from the page, in arrival order
+        self.pending = []  # Response-reading tasks that may still be running
+        self.endpoint = None  # Request details of the first response that carried listings
+
+    # Start listening to the page's responses (call before navigating)
+    def attach(self, page):
+        page.on('response', self.on_response)
+
+    def on_response(self, response):
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        if 'json' not in response.headers.get('content-type', ''):
+            return
+        self.pending.append(asyncio.ensure_future(self.read_response(response)))
+
+    async def read_response(self, response):
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        items = self.find_listing_items(payload)
+        if not items:
+            return
+
+        self.payloads.append(items)
+        if self.endpoint is None:
+            request = response.request
+            try:
+                body = request.post_data_json
+            except Exception:
+                body = None
+            self.endpoint = {'url': request.url, 'method': request.method, 'body': body, 'page_size': len(items)}
+            logger.info(f"Listing API detected: {request.method} {request.url} ({len(items)} items)")
+
+    # Wait until at least one listing payload has been captured
+    async def wait_for_listings(self, timeout=15):
+        for _ in range(int(timeout / 0.25)):
+            if self.pending:
+                await asyncio.gather(*self.pending, return_exceptions=True)
+                self.pending = []
+            if self.payloads:
+                return True
+            await asyncio.sleep(0.25)
+        return False
+
+    # Return the converted records captured so far plus every further page fetched directly.
+    # `convert(item, index)` maps a raw item to a record; `should_stop(new_records)` ends paging early.
+    async def collect(self, request_context, convert, should_stop=None):
+        seen = set()
+        records = []
+
+        def add(items):
+            new_records = []
+            for item in items:
+                key = self.item_key(item)
+                if key in seen:
+                    continue
+                seen.add(key)
+                record = convert(item, len(records))
+                records.append(record)
+                new_records.append(record)
+            return new_records
+
+        for items in self.payloads:
+            add(items)
+        if should_stop and should_stop(records):
+            return records
+
+        paging = self.detect_paging()
+        if paging is None:
+            logger.info("Listing API has no recognizable paging parameter; using captured pages only.")
+            return records
+
+        for page_number in range(1, self.max_pages):
+            items = await self.fetch_page(request_context, paging, page_number)
+            new_records = add(items or [])
+            if not new_records:
+                break
+            if should_stop and should_stop(new_records):
+                break
+        return records
+
+    # Find which query or body parameter pages the endpoint: (location, key, start value, is_offset)
+    def detect_paging(self):
+        if self.endpoint is None:
+            return None
+        query = dict(parse_qsl(urlparse(self.endpoint['url']).query))
+        body = self.endpoint['body'] if isinstance(self.endpoint['body'], dict) else {}
+        for location, params in (('query', query), ('body', body)):
+            for key in self.PAGE_PARAMS:
+                if key in params:
+                    try:
+                        start = int(params[key])
+                    except (TypeError, ValueError):
+                        continue
+                    return location, key, start, key in self.OFFSET_PARAMS
+        return None
+
+    # Request one further page of the endpoint with the page/offset parameter advanced
+    async def fetch_page(self, request_context, paging, page_number):
+        location, key, start, is_offset = paging
+        value = start + page_number * self.endpoint['page_size'] if is_offset else start + page_number
+
+        url = self.endpoint['url']
+        body = self.endpoint['body']
+        if location == 'query':
+            parsed = urlparse(url)
+            query = dict(parse_qsl(parsed.query))
+            query[key] = str(value)
+            url = urlunparse(parsed._replace(query=urlencode(query)))
+        else:
+            body = dict(body, **{key: value})
+
+        def request():
+            if self.endpoint['method'] == 'POST':
+                return request_context.post(url, data=body)
+            return request_context.get(url)
+
+        try:
+            if self.scheduler is not None:
+                response = await self.scheduler.run(request, f"Listing API page {page_number}")
+            else:
+                response = await request()
+            if not response.ok:
+                logger.warning(f"Listing API page {page_number} returned HTTP {response.status}")
+                return None
+            return self.find_listing_items(await response.json())
+        except Exception as e:
+            logger.warning(f"Failed to fetch listing API page {page_number}: {e}")
+            return None
+
+    # Pick the longest list of dicts in the payload that look like listings
+    def find_listing_items(self, payload):
+        listing_keys = set(self.TITLE_KEYS + self.PRICE_KEYS + self.DESCRIPTION_KEYS + self.IMAGE_KEYS + self.DATE_KEYS)
+        best = []
+        stack = [payload]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                stack.extend(current.values())
+            elif isinstance(current, list):
+                dicts = [item for item in current if isinstance(item, dict)]
+                listing_like = [item for item in dicts if len(listing_keys.intersection(item)) >= 2]
+                if dicts and len(listing_like) * 2 >= len(dicts) and len(dicts) > len(best):
+                    best = dicts
+                stack.extend(current)
+        return best
+
+    # Stable identity of an item for de-duplication across overlapping pages
+    def item_key(self, item):
+        item_id = self.first_value(item, self.ID_KEYS)
+        if item_id is not None:
+            return str(item_id)
+        return json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+
+    # Return the first non-empty value stored under one of the keys
+    def first_value(self, item, keys):
+        for key in keys:
+            value = item.get(key)
+            if value not in (None, '', [], {}):
+                return value
+        return None
+
+    # Image fields may be a URL, a list of URLs or objects with a url/src
+    def image_url(self, item):
+        value = self.first_value(item, self.IMAGE_KEYS)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if isinstance(value, dict):
+            value = self.first_value(value, ('url', 'src', 'path', 'original'))
+        return value
+
+    # Build an absolute detail URL from a URL or site path field
+    def link(self, item):
+        value = self.first_value(item, self.LINK_KEYS)
+        if not isinstance(value, str) or not value.startswith(('/', 'http://', 'https://')):
+            return None
+        return urljoin(self.BASE_URL + '/', value)
+
+    # Posting time as text the classifier parses: ISO timestamps are kept whole (so a listing is
+    # judged by its age like the relative card dates), epoch seconds/milliseconds become ISO
+    def date_text(self, item):
+        value = self.first_value(item, self.DATE_KEYS)
+        if value is None:
+            return None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            seconds = value / 1000 if value > 1e11 else value
+            return datetime.fromtimestamp(seconds).isoformat(timespec='seconds')
+        return str(value)
+
+    # Map an API item to the raw card record shape PropertyCardScraper works with
+    def to_property_record(self, item, index):
+        price = self.first_value(item, self.PRICE_KEYS)
+        views = self.first_value(item, self.VIEW_KEYS)
+        phone = self.first_value(item, self.PHONE_KEYS)
+        return {
+            'index': index,
+            'pin_text': PIN_MARKER if self.first_value(item, self.STICKY_KEYS) else None,
+            'title': self.first_value(item, self.TITLE_KEYS),
+            'price': None if price is None else str(price),
+            'relative_date': self.date_text(item),
+            'description': self.first_value(item, self.DESCRIPTION_KEYS),
+            'image_url': self.image_url(item),
+            'detail_url': self.link(item),
+            'mobile_number': None if phone is None else str(phone),
+            'views_number': None if views is None else str(views)
+        }
+
+    # Map an API item to the record shape OfficeCardScraper returns
+    def to_office_record(self, item, index):
+        phone = self.first_value(item, self.PHONE_KEYS)
+        ads = self.first_value(item, self.ADS_KEYS)
+        return {
+            'image': self.image_url(item),
+            'title': self.first_value(item, self.TITLE_KEYS),
+            'description': self.first_value(item, self.DESCRIPTION_KEYS) or "No Description Provided",
+            'ads': None if ads is None else str(ads),
+            'link': self.link(item),
+            'mobile_number': None if phone is None else str(phone)
+        }
@@ -0,0 +1,112 @@
+# Import required modules
+import json  # For the JSON metrics file
+import os  # Atomic replacement of the output files
+import threading  # Drive uploads record metrics from worker threads
+import time  # Monotonic timers
+from contextlib import contextmanager  # For the timer context manager
+from datetime import datetime  # To stamp the metrics snapshot
+
+
+# In-process timers and counters for one run, written out as JSON or a Prometheus textfile
+class Metrics:
+    PREFIX = 'boshamlan'  # Prefix of every Prometheus metric name
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.timers = {}  # {(name, labels): {'count', 'total', 'max'}}
+            self.counters = {}  # {(name, labels): value}
+
+    def key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    # Count something (cards seen, failures, retries...)
+    def increment(self, name, value=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # Add one duration, in seconds, to a timer
+    def observe(self, name, seconds, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            timer = self.timers.setdefault(key, {'count': 0, 'total': 0.0, 'max': 0.0})
+            timer['count'] += 1
+            timer['total'] += seconds
+            timer['max'] = max(timer['max'], seconds)
+
+    # Time the body of a with block; works around awaits too
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'duration_seconds': round(time.time() - self.started, 3),
+                'timers': [
+                    {'name': name, 'labels': dict(labels), 'count': timer['count'],
+                     'total_seconds': round(timer['total'], 6), 'max_seconds': round(timer['max'], 6)}
+                    for (name, labels), timer in sorted(self.timers.items())
+                ],
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+            }
+
+    def write_json(self, path):
+        self.write_atomic(path, json.dumps(self.snapshot(), indent=2, ensure_ascii=False))
+
+    # Text exposition format, for node_exporter's textfile collector
+    def write_prometheus(self, path):
+        lines = []
+        with self.lock:
+            timer_names = sorted({name for name, _ in self.timers})
+            for name in timer_names:
+                metric = f"{self.PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                for (timer_name, labels), timer in sorted(self.timers.items()):
+                    if timer_name == name:
+                        lines.append(f"{metric}_count{self.format_labels(labels)} {timer['count']}")
+                        lines.append(f"{metric}_sum{self.format_labels(labels)} {timer['total']:.6f}")
+            counter_names = sorted({name for name, _ in self.counters})
+            for name in counter_names:
+                metric = f"{self.PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{metric}{self.format_labels(labels)} {value}")
+        self.write_atomic(path, '\n'.join(lines) + '\n')
+
+    def format_labels(self, labels):
+        if not labels:
+            return ''
+        pairs = ','.join(f'{name}="{self.escape(value)}"' for name, value in labels)
+        return '{' + pairs + '}'
+
+    def escape(self, value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    # Write to a temporary file first so readers never see a partial file
+    def write_atomic(self, path, content):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temporary, path)
+
+
+# Registry shared by every module of the run
+metrics = Metrics()
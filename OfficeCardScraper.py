@@ -1,112 +1,257 @@
 # Importing necessary libraries
 import time  # Standard time library, though not actively used in this version
 import asyncio  # Required for async operations
-import json  # For converting Python objects to JSON
-import re  # For regular expressions
-from playwright.async_api import async_playwright  # Asynchronous Playwright for web automation
-from bs4 import BeautifulSoup  # For HTML parsing
-import nest_asyncio  # Allows nested asyncio event loops
+import logging  # Module logger
+from ListingApiCapture import ListingApiCapture  # Reads listings from the site's JSON API responses
+from CardRecords import OfficeCard, NoCardsFound  # Typed output records and scraping errors
+import CardParsing  # Precompiled link pattern
+from OfficeParsers import PARSERS  # Pluggable HTML parser backends (bs4, lxml, selectolax)
+from BrowserPool import BrowserPool  # Warm, recycled browsers shared across sections
+from RequestScheduler import RequestScheduler  # Rate limit and retries for requests to the site
+from Metrics import metrics  # Run-wide timers and counters
 
-# Apply patch for running asyncio in nested environments like Jupyter Notebooks
-nest_asyncio.apply()
+logger = logging.getLogger(__name__)
 
 
 # Define the scraper class
 class OfficeCardScraper:
-    def __init__(self, url):
+    def __init__(self, url, pool=None, capture_api=False, seen_index=None, profile=None, scheduler=None, journal=None,
+                 parser='bs4'):
         self.url = url  # Store the base URL to scrape
-
-    # Main async method to run the scraping process
+        self.pool = pool  # Shared BrowserPool, if Main provides one
+        self.capture_api = capture_api  # Build records from the listing API instead of rendered cards
+        self.seen_index = seen_index  # Optional SeenListingIndex shared across runs
+        self.profile = profile  # Optional BrowserProfile (launch args and request blocking)
+        self.fallback_page = None  # Separate page used only when a card's link must be found by clicking
+        self.scheduler = scheduler or RequestScheduler()  # Shared across sections when passed in by Main
+        self.journal = journal  # Optional CrawlJournal checkpointing this section for --resume
+        self.parser = PARSERS[parser]()  # HTML parser backend for the rendered page
+
+    # Main async method to run the scraping process: collects the whole stream into a list
     async def scrape_cards(self):
-        # Launch a Playwright browser instance
-        async with async_playwright() as p:
-            # Launch Chromium in headless mode
-            browser = await p.chromium.launch(headless=True)
-
-            # Create a new browser context with a desktop user-agent
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            )
-            page = await context.new_page()
+        return [record async for record in self.iter_cards()]
+
+    # Async generator yielding OfficeCard records as each office is resolved
+    async def iter_cards(self):
+        if self.journal is not None:
+            # Replay what a crashed attempt already emitted; a finished section needs no browser at all
+            for card_data in self.journal.cards():
+                metrics.increment('cards_resumed')
+                yield OfficeCard(**card_data)
+            if self.journal.done:
+                return
+
+        if self.pool is not None:
+            # Reuse the shared pool and only open a dedicated context
+            async for record in self.iter_cards_in_context(self.pool):
+                yield record
+            return
+
+        # Start a private pool (one Chromium in headless mode) for this scraper
+        pool = BrowserPool(profile=self.profile)
+        try:
+            async for record in self.iter_cards_in_context(pool):
+                yield record
+        finally:
+            await pool.close()  # Clean up browser session
+
+    # Scrape the offices page inside a new context taken from the pool
+    async def iter_cards_in_context(self, pool):
+        # Create a new browser context with a desktop user-agent (profile applied by the pool)
+        context = await pool.new_context(
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        )
+        page = await context.new_page()
+        self.fallback_page = None
 
-            try:
-                print(f"Navigating to {self.url}...")
-                await page.goto(self.url, wait_until='networkidle', timeout=60000)
+        try:
+            capture = None
+            if self.capture_api:
+                # Listen for the listing API before the first request goes out
+                capture = ListingApiCapture(scheduler=self.scheduler)
+                capture.attach(page)
+
+            logger.info(f"Navigating to {self.url}...")
+            with metrics.timer('navigation'):
+                await self.scheduler.run(
+                    lambda: page.goto(self.url, wait_until='networkidle', timeout=60000), f"Loading {self.url}"
+                )
 
                 # Wait for the main container holding cards
                 await page.wait_for_selector('div.max-w-2xl.mx-auto', timeout=60000)
-                print("Main container found.")
-
-                # Scroll the page to ensure all cards are loaded
+            logger.info("Main container found.")
+
+            # Listings captured on previous runs: {listing_id: content_hash}
+            known_listings = self.seen_index.load(self.url) if self.seen_index is not None else {}
+            seen_entries = []
+
+            if capture is not None:
+                with metrics.timer('api_collect'):
+                    result = await self.collect_api_records(page, context, capture)
+                if result:
+                    metrics.increment('cards_seen', len(result))
+                    if self.seen_index is not None:
+                        entries = [self.index_entry(card_data) for card_data in result]
+                        fresh = [card_data for card_data, (listing_id, content_hash) in zip(result, entries)
+                                 if known_listings.get(listing_id) != content_hash]
+                        metrics.increment('cards_skipped_unchanged', len(result) - len(fresh))
+                        result = fresh
+                        self.seen_index.mark_seen(self.url, entries)
+                    if self.journal is not None:
+                        result = [card_data for card_data in result if not self.journal.processed(self.journal_key(card_data))]
+                        self.journal.add_cards([(self.journal_key(card_data), card_data) for card_data in result])
+                        self.journal.finish()
+                    for card_data in result:
+                        metrics.increment('cards_emitted')
+                        yield OfficeCard(**card_data)
+                    return
+
+            # Scroll the page to ensure all cards are loaded
+            with metrics.timer('scroll'):
                 await self.scroll_to_load_all_cards(page)
 
-                # Get full HTML and parse with BeautifulSoup
-                soup = BeautifulSoup(await page.content(), 'html.parser')
-
-                # Find the container with all cards
-                container = soup.find('div', class_='max-w-2xl mx-auto')
-                if not container:
-                    print("No card container found.")
-                    return "No cards found on this page."
-
-                # Locate all card elements inside the container
-                cards = container.find_all('div', class_=re.compile('relative.*rounded-lg.*flex'))
-                print(f"Found {len(cards)} cards on the page.")
-
-                result = []
-                for index, card in enumerate(cards):
-                    print(f"\nProcessing card {index + 1}/{len(cards)}...")
-
-                    # Extract image, title, description, and ad info
+            # Get full HTML and locate all card elements inside the card container
+            html = await page.content()
+            with metrics.timer('parse', parser=self.parser.name):
+                cards = self.parser.cards(html)
+            if cards is None:
+                logger.info("No card container found.")
+                raise NoCardsFound(self.url)
+            logger.info(f"Found {len(cards)} cards on the page.")
+            metrics.increment('cards_seen', len(cards))
+
+            for index, card in enumerate(cards):
+                logger.debug(f"Processing card {index + 1}/{len(cards)}...")
+
+                # Extract image, title, description, and ad info
+                with metrics.timer('card_extraction'):
                     card_data = self.extract_card_data(card)
 
-                    # Click on the card to get its detailed link
-                    link = await self.get_card_link(page, index)
-
-                    if not link:
-                        print(f"Skipping card {index + 1} due to missing link.")
+                # Offices emitted before a crash were already replayed from the journal
+                if self.journal is not None and self.journal.processed(self.journal_key(card_data)):
+                    continue
+
+                # Offices already captured with the same content need no link resolution
+                if self.seen_index is not None:
+                    entry = self.index_entry(card_data)
+                    if known_listings.get(entry[0]) == entry[1]:
+                        logger.debug(f"Skipping card {index + 1}: unchanged since it was last indexed.")
+                        seen_entries.append(entry)
+                        metrics.increment('cards_skipped_unchanged')
                         continue
 
-                    # Convert relative link to absolute
-                    if link.startswith('/'):
-                        link = f"https://www.boshamlan.com{link}"
-                    card_data['link'] = link
-
-                    # Extract mobile number from the link
-                    mobile_number = self.extract_mobile_number(link)
-                    card_data['mobile'] = mobile_number
+                # Read the link from the already-parsed card; click only as a fallback
+                link = self.parser.extract_link(card)
+                if not link:
+                    logger.debug(f"No href on card {index + 1}, resolving it by clicking in a separate page...")
+                    with metrics.timer('detail_fetch', method='click'):
+                        link = await self.get_card_link(await self.get_fallback_page(context), index)
+
+                if not link:
+                    logger.warning(f"Skipping card {index + 1} due to missing link.")
+                    metrics.increment('failures', stage='office_link')
+                    continue
+
+                # Convert relative link to absolute
+                if link.startswith('/'):
+                    link = f"https://www.boshamlan.com{link}"
+                card_data['link'] = link
+
+                # Extract mobile number from the link
+                card_data['mobile_number'] = self.extract_mobile_number(link)
+
+                if self.seen_index is not None:
+                    seen_entries.append(entry)
+                if self.journal is not None:
+                    self.journal.add_cards([(self.journal_key(card_data), card_data)])
+                metrics.increment('cards_emitted')
+                yield OfficeCard(**card_data)
+
+            if self.seen_index is not None:
+                self.seen_index.mark_seen(self.url, seen_entries)
+            if self.journal is not None:
+                self.journal.finish()
 
-                    result.append(card_data)
-
-                # Return results in JSON format
-                return json.dumps(result, ensure_ascii=False, indent=2)
-
-            except Exception as e:
-                print(f"Error during scraping: {str(e)}")
-                return f"Error: {str(e)}"
+        except Exception as e:
+            logger.error(f"Error during scraping: {str(e)}")
+            metrics.increment('failures', stage='offices')
+            raise
+
+        finally:
+            await pool.release(context)  # Clean up the section context
+
+    # Key of an office in the crawl journal; title and image are known before the link is resolved
+    def journal_key(self, card_data):
+        return f"{card_data['title']}|{card_data['image']}"
+
+    # (listing_id, content_hash) of an office for the seen index.
+    # Offices are identified by title and image so the ID is known before the link is resolved.
+    def index_entry(self, card_data):
+        listing_id = self.seen_index.listing_id({'title': card_data['title'], 'image': card_data['image']})
+        return listing_id, self.seen_index.content_hash(card_data)
+
+    # Build office records from the listing API, paging through it directly.
+    # Returns None when no listing responses were seen so the caller can parse the DOM.
+    async def collect_api_records(self, page, context, capture):
+        if not await capture.wait_for_listings(timeout=5):
+            # The first page may be server-rendered; one scroll triggers the listing request
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            if not await capture.wait_for_listings(timeout=10):
+                logger.info("No listing API responses captured; falling back to the rendered cards.")
+                return None
 
-            finally:
-                await browser.close()  # Clean up browser session
+        result = []
+        for card_data in await capture.collect(context.request, capture.to_office_record):
+            if not card_data['link']:
+                logger.warning(f"Skipping office '{card_data['title']}' due to missing link.")
+                continue
+            if not card_data['mobile_number']:
+                card_data['mobile_number'] = self.extract_mobile_number(card_data['link'])
+            result.append(card_data)
+        logger.info(f"Collected {len(result)} offices from the listing API.")
+        return result
 
     # Method to scroll down the page to load dynamically loaded cards
     async def scroll_to_load_all_cards(self, page):
         last_height = await page.evaluate('document.body.scrollHeight')
         while True:
-            print("Scrolling to load more cards...")
+            logger.debug("Scrolling to load more cards...")
             await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-            await page.wait_for_timeout(2000)  # Wait for new cards to load
+            try:
+                # Return as soon as new cards grow the page; only the last scroll waits the full 2 s
+                await page.wait_for_function(
+                    'height => document.body.scrollHeight > height', arg=last_height, polling='mutation', timeout=2000
+                )
+            except Exception:
+                pass
             new_height = await page.evaluate('document.body.scrollHeight')
             if new_height == last_height:
-                print("No more cards to load.")
+                logger.info("No more cards to load.")
                 break
             last_height = new_height
 
-    # Method to click a card and extract its link (handles modal windows too)
+    # Open the listing once in a separate page (fully scrolled) for click-based link resolution
+    async def get_fallback_page(self, context):
+        if self.fallback_page is None:
+            self.fallback_page = await context.new_page()
+            await self.scheduler.run(
+                lambda: self.fallback_page.goto(self.url, wait_until='networkidle', timeout=60000), f"Loading {self.url}"
+            )
+            await self.scroll_to_load_all_cards(self.fallback_page)
+        return self.fallback_page
+
+    # Method to click a card and extract its link (handles modal windows too).
+    # Runs on the fallback page and restores it with go_back/Escape instead of reloading.
     async def get_card_link(self, page, index):
+        card_selector = 'div.relative.w-full.rounded-lg.bg-main.card-shadow.flex.p-3'
         try:
-            cards = await page.query_selector_all('div.relative.w-full.rounded-lg.bg-main.card-shadow.flex.p-3')
+            cards = await page.query_selector_all(card_selector)
+            if index >= len(cards):
+                # Going back may have dropped lazily loaded cards; load them again once
+                await self.scroll_to_load_all_cards(page)
+                cards = await page.query_selector_all(card_selector)
             if index >= len(cards):
-                print(f"Card index {index} out of range (total cards: {len(cards)})")
+                logger.warning(f"Card index {index} out of range (total cards: {len(cards)})")
                 return None
 
             card = cards[index]
@@ -114,83 +259,57 @@ class OfficeCardScraper:
             await card.wait_for_element_state('visible')
 
             initial_url = page.url
-            print(f"Initial URL for card {index + 1}: {initial_url}")
+            logger.debug(f"Initial URL for card {index + 1}: {initial_url}")
 
+            await self.scheduler.take_token()  # The click may load the office page, so it counts against the rate limit
             await card.click()
-            print(f"Clicked card {index + 1}, waiting for navigation...")
-            await page.wait_for_timeout(3000)
+            logger.debug(f"Clicked card {index + 1}, waiting for navigation...")
+            try:
+                await page.wait_for_function('url => location.href !== url', arg=initial_url, timeout=3000)
+            except Exception:
+                pass
 
             current_url = page.url
-            print(f"Current URL after click for card {index + 1}: {current_url}")
+            logger.debug(f"Current URL after click for card {index + 1}: {current_url}")
 
             if current_url != initial_url:
-                print(f"Valid link found for card {index + 1}: {current_url}")
-                await page.goto(self.url, wait_until='networkidle', timeout=60000)
+                logger.debug(f"Valid link found for card {index + 1}: {current_url}")
+                await page.go_back(wait_until='domcontentloaded')
                 return current_url
 
             # If a modal opens instead of navigation
             modal = await page.query_selector('div[role="dialog"], div.modal, div.popup')
             if modal:
-                print(f"Modal detected for card {index + 1}, attempting to extract link from modal...")
-                modal_content = await modal.inner_html()
-                soup = BeautifulSoup(modal_content, 'html.parser')
-                link_tag = soup.find('a', href=True)
-                if link_tag and link_tag['href']:
-                    print(f"Link found in modal for card {index + 1}: {link_tag['href']}")
-                    await page.goto(self.url, wait_until='networkidle', timeout=60000)
-                    return link_tag['href']
-
-            print(f"No URL change or modal link found for card {index + 1}.")
-            await page.goto(self.url, wait_until='networkidle', timeout=60000)
+                logger.debug(f"Modal detected for card {index + 1}, attempting to extract link from modal...")
+                link = self.parser.modal_link(await modal.inner_html())
+                await page.keyboard.press('Escape')
+                if link:
+                    logger.debug(f"Link found in modal for card {index + 1}: {link}")
+                    return link
+
+            logger.warning(f"No URL change or modal link found for card {index + 1}.")
             return None
 
         except Exception as e:
-            print(f"Error getting link for card {index + 1}: {str(e)}")
-            await page.goto(self.url, wait_until='networkidle', timeout=60000)
+            logger.warning(f"Error getting link for card {index + 1}: {str(e)}")
+            # Start the next fallback from a fresh page
+            self.fallback_page = None
+            try:
+                await page.close()
+            except Exception:
+                pass
             return None
 
-    # Extracts all available data fields from a card block
+    # Extracts all available data fields from a card block with the configured parser backend
     def extract_card_data(self, card):
-        return {
-            'image': self.extract_image(card),
-            'title': self.extract_title(card),
-            'description': self.extract_description(card),
-            'ads': self.extract_ads(card),
-        }
-
-    # Extract the image URL from the card
-    def extract_image(self, card):
-        img_tag = card.find('div', class_=re.compile('shrink-0')).find('img', class_=re.compile('rounded-lg'))
-        return img_tag['src'] if img_tag and img_tag.get('src') else None
-
-    # Extract the title text from the card
-    def extract_title(self, card):
-        title_tag = card.find('div', class_=re.compile('ps-3.*overflow-hidden')).find('div', class_=re.compile('font-bold.*text-lg.*line-clamp-2'))
-        return title_tag.text.strip() if title_tag else None
-
-    # Extract the description from the card
-    def extract_description(self, card):
-        ps_tag = card.find('div', class_=re.compile('ps-3.*overflow-hidden'))
-        if ps_tag:
-            desc_tags = ps_tag.find_all('div', class_=re.compile('line-clamp-2'))
-            if len(desc_tags) > 1:
-                return desc_tags[1].text.strip() if desc_tags[1] else None
-            elif desc_tags:
-                return desc_tags[0].text.strip()
-        return "No Description Provided"
-
-    # Extract additional ad info like price or type
-    def extract_ads(self, card):
-        ad_tag = card.find('div', class_=re.compile('text-base.*text-primary-dark.*font-bold'))
-        return ad_tag.text.strip() if ad_tag else None
+        return self.parser.extract_card_data(card)
 
     # Extract a phone number from the card link assuming the last path part is the number
     def extract_mobile_number(self, link):
         if not link:
-            print("Link is None, cannot extract mobile number.")
+            logger.warning("Link is None, cannot extract mobile number.")
             return None
-        match = re.search(r'/([^/]+)$', link)
+        match = CardParsing.LINK_LAST_SEGMENT.search(link)
         if match:
-            mobile_number = match.group(1)
-            return f"+965{mobile_number}"
+            return CardParsing.normalize_phone(match.group(1))
         return None
@@ -0,0 +1,213 @@
+# Import required modules
+import CardParsing  # Precompiled class patterns of the offices page
+
+# Each backend imports its parser library when first used, so only the chosen one needs to be
+# installed and loading this module (e.g. to validate a backend name) stays cheap.
+
+
+# HTML parser backends for the offices page. Each backend turns the rendered page into card
+# nodes and implements a few node primitives; the field rules are shared so every backend
+# returns the same card data.
+class OfficeParser:
+    name = None
+
+    # CSS equivalents of the class patterns in CardParsing (substring matches, like the regexes)
+    SELECTORS = {
+        'container': 'div.max-w-2xl.mx-auto',
+        'card': 'div[class*="relative"][class*="rounded-lg"][class*="flex"]',
+        'image_box': 'div[class*="shrink-0"]',
+        'image': 'img[class*="rounded-lg"]',
+        'body': 'div[class*="ps-3"][class*="overflow-hidden"]',
+        'title': 'div[class*="font-bold"][class*="text-lg"][class*="line-clamp-2"]',
+        'description': 'div[class*="line-clamp-2"]',
+        'ads': 'div[class*="text-base"][class*="text-primary-dark"][class*="font-bold"]',
+        'anchor': 'a[href]',
+    }
+    LINK_ATTRIBUTES = ('data-href', 'data-url', 'data-link')  # Router attributes carrying the office link
+
+    # Card nodes of a rendered offices page; None when the card container is missing
+    def cards(self, html):
+        container = self.find(self.parse(html), 'container')
+        if container is None:
+            return None
+        return self.find_all(container, 'card')
+
+    # Extracts all available data fields from a card block
+    def extract_card_data(self, card):
+        return {
+            'image': self.extract_image(card),
+            'title': self.extract_title(card),
+            'description': self.extract_description(card),
+            'ads': self.extract_ads(card),
+        }
+
+    def extract_image(self, card):
+        box = self.find(card, 'image_box')
+        image = self.find(box, 'image') if box is not None else None
+        return (self.attribute(image, 'src') if image is not None else None) or None
+
+    def extract_title(self, card):
+        body = self.find(card, 'body')
+        title = self.find(body, 'title') if body is not None else None
+        return self.text(title) if title is not None else None
+
+    # The first line-clamped block is the title, so the description is the second one when present
+    def extract_description(self, card):
+        body = self.find(card, 'body')
+        if body is not None:
+            blocks = self.find_all(body, 'description')
+            if len(blocks) > 1:
+                return self.text(blocks[1])
+            elif blocks:
+                return self.text(blocks[0])
+        return "No Description Provided"
+
+    def extract_ads(self, card):
+        ads = self.find(card, 'ads')
+        return self.text(ads) if ads is not None else None
+
+    # A card's detail link: its enclosing/inner anchor or router data attributes
+    def extract_link(self, card):
+        anchors = self.find_all(card, 'anchor')
+        parent_anchor = self.parent_anchor(card)
+        if parent_anchor is not None:
+            anchors.insert(0, parent_anchor)
+        for anchor in anchors:
+            href = self.attribute(anchor, 'href') or ''
+            if href.startswith('/') or 'boshamlan.com' in href:
+                return href
+
+        for attribute in self.LINK_ATTRIBUTES:
+            if self.attribute(card, attribute):
+                return self.attribute(card, attribute)
+        return None
+
+    # First link inside a modal's HTML
+    def modal_link(self, html):
+        anchor = self.find(self.parse(html), 'anchor')
+        return (self.attribute(anchor, 'href') if anchor is not None else None) or None
+
+    # Node primitives implemented by each backend
+    def parse(self, html):
+        raise NotImplementedError
+
+    def find(self, node, key):
+        raise NotImplementedError
+
+    def find_all(self, node, key):
+        raise NotImplementedError
+
+    def text(self, node):
+        raise NotImplementedError
+
+    def attribute(self, node, name):
+        raise NotImplementedError
+
+    def parent_anchor(self, node):
+        raise NotImplementedError
+
+
+# BeautifulSoup with html.parser, matching classes with the precompiled regexes
+class SoupOfficeParser(OfficeParser):
+    name = 'bs4'
+
+    QUERIES = {
+        'container': ('div', {'class_': 'max-w-2xl mx-auto'}),
+        'card': ('div', {'class_': CardParsing.OFFICE_CARD_CLASS}),
+        'image_box': ('div', {'class_': CardParsing.OFFICE_IMAGE_BOX_CLASS}),
+        'image': ('img', {'class_': CardParsing.OFFICE_IMAGE_CLASS}),
+        'body': ('div', {'class_': CardParsing.OFFICE_BODY_CLASS}),
+        'title': ('div', {'class_': CardParsing.OFFICE_TITLE_CLASS}),
+        'description': ('div', {'class_': CardParsing.OFFICE_DESCRIPTION_CLASS}),
+        'ads': ('div', {'class_': CardParsing.OFFICE_ADS_CLASS}),
+        'anchor': ('a', {'href': True}),
+    }
+
+    def parse(self, html):
+        from bs4 import BeautifulSoup  # Default, pure-Python parser
+        return BeautifulSoup(html, 'html.parser')
+
+    def find(self, node, key):
+        name, attributes = self.QUERIES[key]
+        return node.find(name, **attributes)
+
+    def find_all(self, node, key):
+        name, attributes = self.QUERIES[key]
+        return node.find_all(name, **attributes)
+
+    def text(self, node):
+        return node.text.strip()
+
+    def attribute(self, node, name):
+        return node.get(name)
+
+    def parent_anchor(self, node):
+        return node.find_parent('a', href=True)
+
+
+# lxml.html with the CSS selectors compiled to XPath once per process
+class LxmlOfficeParser(OfficeParser):
+    name = 'lxml'
+
+    compiled = None  # {key: CSSSelector}, shared by every instance once compiled
+
+    def __init__(self):
+        if LxmlOfficeParser.compiled is None:
+            from lxml.cssselect import CSSSelector  # CSS selectors compiled to XPath once
+            LxmlOfficeParser.compiled = {key: CSSSelector(selector) for key, selector in self.SELECTORS.items()}
+
+    def parse(self, html):
+        import lxml.html  # libxml2 parser
+        return lxml.html.fromstring(html)
+
+    def find(self, node, key):
+        matches = self.find_all(node, key)
+        return matches[0] if matches else None
+
+    def find_all(self, node, key):
+        # CSSSelector matches descendant-or-self; only descendants count, as with the other backends
+        return [match for match in self.compiled[key](node) if match is not node]
+
+    def text(self, node):
+        return node.text_content().strip()
+
+    def attribute(self, node, name):
+        return node.get(name)
+
+    def parent_anchor(self, node):
+        for ancestor in node.iterancestors('a'):
+            if ancestor.get('href') is not None:
+                return ancestor
+        return None
+
+
+# selectolax's Lexbor engine, matching the CSS selectors natively
+class SelectolaxOfficeParser(OfficeParser):
+    name = 'selectolax'
+
+    def parse(self, html):
+        from selectolax.lexbor import LexborHTMLParser  # Lexbor parser with native CSS matching
+        return LexborHTMLParser(html)
+
+    def find(self, node, key):
+        return node.css_first(self.SELECTORS[key])
+
+    def find_all(self, node, key):
+        return node.css(self.SELECTORS[key])
+
+    def text(self, node):
+        return node.text().strip()
+
+    def attribute(self, node, name):
+        return node.attributes.get(name)
+
+    def parent_anchor(self, node):
+        parent = node.parent
+        while parent is not None:
+            if parent.tag == 'a' and parent.attributes.get('href') is not None:
+                return parent
+            parent = parent.parent
+        return None
+
+
+PARSERS = {parser.name: parser for parser in (SoupOfficeParser, LxmlOfficeParser, SelectolaxOfficeParser)}
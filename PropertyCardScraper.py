@@ -1,186 +1,501 @@
 # Import required modules
 import asyncio  # For asynchronous programming
-from playwright.async_api import async_playwright  # Asynchronous browser automation using Playwright
-import json  # To serialize results
-from datetime import datetime, timedelta  # To work with card dates
-import nest_asyncio  # To allow nested event loops (important in environments like Jupyter)
+import logging  # Module logger
+from DetailPageFetcher import DetailPageFetcher  # HTTP-only fetcher for detail pages
+from ListingApiCapture import ListingApiCapture  # Reads listings from the site's JSON API responses
+from CardRecords import PropertyCard, UnchangedPropertyCard, NoCardsFound, DetailPagesFailed  # Typed output records and scraping errors
+from CardParsing import CardClassifier  # Shared pinned/old classification and date normalization
+from BrowserPool import BrowserPool  # Warm, recycled browsers shared across sections
+from RequestScheduler import RequestScheduler  # Rate limit and retries for requests to the site
+from Metrics import metrics  # Run-wide timers and counters
 
-# Patch asyncio to allow nested use
-nest_asyncio.apply()
+logger = logging.getLogger(__name__)
 
 # Scraper class to collect property card data from a dynamic listing site
 class PropertyCardScraper:
-    def __init__(self, url):
-        print("Initializing PropertyCardScraper...")
+    # Selector matching every listing card on the search page
+    CARD_SELECTOR = '.relative.w-full.rounded-lg.card-shadow'
+
+    # Reads the fields of every card from position `start` on in a single browser round trip
+    CARD_RECORDS_JS = """(cards, start) => cards.slice(start).map((el, offset) => {
+        const index = start + offset;
+        const text = selector => {
+            const node = el.querySelector(selector);
+            return node ? node.textContent : null;
+        };
+        const pinTag = el.querySelector('div.bg-stickyTag');
+        const image = el.querySelector('img[alt="Post"]');
+        const anchors = [el.closest('a[href]'), ...el.querySelectorAll('a[href]')];
+        const link = anchors.find(a => a && a.href.startsWith(location.origin));
+        return {
+            index: index,
+            pin_text: pinTag ? pinTag.textContent : null,
+            title: text('.font-bold.text-lg.text-dark.line-clamp-2.break-words'),
+            price: text('.rounded.font-bold.text-primary-dark'),
+            relative_date: text('.rounded.text-xs.flex.items-center.gap-1'),
+            description: text('.line-clamp-2:nth-of-type(2)'),
+            image_url: image ? image.getAttribute('src') : null,
+            detail_url: link ? link.href : null
+        };
+    })"""
+
+    # Consecutive already-indexed not-pinned cards after which scrolling stops
+    KNOWN_RUN_LIMIT = 10
+
+    # Cards whose details are fetched together before being streamed out
+    DETAIL_BATCH_SIZE = 20
+
+    def __init__(self, url, pool=None, detail_pool_size=0, http_details=False, capture_api=False,
+                 seen_index=None, profile=None, scheduler=None, journal=None, dedup=None, keep_unchanged=False):
+        logger.debug("Initializing PropertyCardScraper...")
         self.url = url  # The URL to scrape
-        self.browser = None  # Playwright browser instance
+        self.pool = pool  # BrowserPool handing out contexts (shared when passed in by Main)
+        self.owns_pool = pool is None  # Only close the pool if this scraper started it
         self.context = None  # Browser context for isolated sessions
-
-    # Main method to orchestrate scraping logic
+        self.detail_pool_size = detail_pool_size  # Worker pages for detail fetching (0 = click through serially)
+        self.http_details = http_details  # Try plain HTTP for detail pages before using the browser
+        self.capture_api = capture_api  # Build records from the listing API instead of rendered cards
+        self.scanned_records = []  # Classified card records collected while scrolling
+        self.in_pinned = True  # Still inside the leading block of pinned cards
+        self.pinned_streak = 0  # Old pinned cards seen so far
+        self.not_pinned_streak = 0  # Old not-pinned cards seen after the pinned block
+        self.classifier = None  # CardClassifier holding the cutoff, created once per scan
+        self.seen_index = seen_index  # Optional SeenListingIndex shared across runs
+        self.known_listings = {}  # {listing_id: content_hash} loaded from the index for this section
+        self.known_streak = 0  # Consecutive not-pinned cards already in the index
+        self.unchanged_entries = []  # (listing_id, content_hash) of indexed listings skipped this run
+        self.keep_unchanged = keep_unchanged  # Still fetch unchanged listings, emitted as UnchangedPropertyCard, for their views
+        self.profile = profile  # Optional BrowserProfile (launch args and request blocking)
+        self.fetcher = None  # DetailPageFetcher kept open for the whole section when http_details is on
+        self.scheduler = scheduler or RequestScheduler()  # Shared across sections when passed in by Main
+        self.journal = journal  # Optional CrawlJournal checkpointing this section for --resume
+        self.dedup = dedup  # Optional DuplicateIndex; known reposts skip their detail fetch and only link to the earlier listing
+
+    # Main method to orchestrate scraping logic: collects the whole stream into a list
     async def scrape_cards(self):
-        print("Starting scrape_cards...")
-        async with async_playwright() as p:
-            print("Launching browser...")
-            self.browser = await p.chromium.launch(headless=True)  # Headless browser launch
-            self.context = await self.browser.new_context()  # Create a new browser context
-            main_page = await self.context.new_page()  # Open a new tab/page
-
-            try:
-                print(f"Navigating to {self.url} ...")
-                await main_page.goto(self.url)
-                await main_page.wait_for_selector('.relative.min-h-48', timeout=60000)  # Wait for card area to load
-                print("Main page loaded.")
-
-                # Scroll to ensure all cards are loaded
-                print("Scrolling to bottom to load all cards...")
-                await self.scroll_to_bottom(main_page)
-
-                print("Querying all card containers...")
-                posts = await main_page.query_selector_all('.relative.w-full.rounded-lg.card-shadow')  # Select all cards
-                if not posts:
-                    print("No cards found on this page.")
-                    return "No cards found on this page."
-
-                result = []
-                print("Processing all cards for logic...")
-                pinned_done = False
-                not_pinned_done = False
-                consecutive_pinned_old = 0
-                consecutive_not_pinned_old = 0
-
-                # Yesterday’s date for age comparison
-                yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-                for index, post in enumerate(posts):
-                    # Check if the card is pinned (marked as "مميز")
-                    pin_tag = await post.query_selector('div.bg-stickyTag')
-                    is_pinned = False
-                    if pin_tag:
-                        text = await pin_tag.text_content()
-                        if text and "مميز" in text:
-                            is_pinned = True
-
-                    # Get date from card
-                    date_elem = await post.query_selector('.rounded.text-xs.flex.items-center.gap-1')
-                    date_text = (await date_elem.text_content()).strip() if date_elem else ""
-
-                    is_old = False
-                    try:
-                        card_date = datetime.strptime(date_text, "%Y-%m-%d")
-                        if card_date < datetime.strptime(yesterday, "%Y-%m-%d"):
-                            is_old = True
-                    except ValueError:
-                        # If not a standard date format, check for time-related keywords (means it's recent)
-                        if not any(word in date_text for word in ['ساعة', 'دقيقة', 'ثانية']):
-                            is_old = True
-
-                    print(f"Card {index+1}: pinned={is_pinned}, date_text='{date_text}', is_old={is_old}, pinned_done={pinned_done}, not_pinned_done={not_pinned_done}")
-
-                    # Logic to stop after 3 old pinned and 3 old not-pinned cards
-                    if is_pinned and not pinned_done:
-                        if is_old:
-                            consecutive_pinned_old += 1
-                        else:
-                            consecutive_pinned_old = 0
-                        if consecutive_pinned_old >= 3:
-                            pinned_done = True
-                            continue
-                        if is_old:
-                            continue
-                        card_data = await self.scrape_card_data(post, index, main_page)
-                        result.append(card_data)
-
-                    elif not is_pinned and pinned_done and not not_pinned_done:
-                        if is_old:
-                            consecutive_not_pinned_old += 1
-                        else:
-                            consecutive_not_pinned_old = 0
-                        if consecutive_not_pinned_old >= 3:
-                            not_pinned_done = True
-                            continue
-                        if is_old:
-                            continue
-                        card_data = await self.scrape_card_data(post, index, main_page)
-                        result.append(card_data)
-
-                print(f"Total cards collected: {len(result)}")
-                return json.dumps(result, ensure_ascii=False, indent=2)  # Convert to formatted JSON string
+        return [record async for record in self.iter_cards()]
+
+    # Async generator yielding PropertyCard records as soon as their details are known
+    async def iter_cards(self):
+        logger.debug("Starting scrape_cards...")
+        if self.journal is not None:
+            # Replay what a crashed attempt already emitted; a finished section needs no browser at all
+            for card_data in self.journal.cards():
+                metrics.increment('cards_resumed')
+                yield PropertyCard(**card_data)
+            if self.journal.done:
+                return
+
+        if not self.owns_pool:
+            # A shared pool was provided, so only an isolated context is needed
+            async for record in self.iter_cards_in_context():
+                yield record
+            return
+
+        logger.debug("Launching browser...")
+        self.pool = BrowserPool(profile=self.profile)
+        try:
+            async for record in self.iter_cards_in_context():
+                yield record
+        finally:
+            logger.debug("Closing browser...")
+            await self.pool.close()
+            self.pool = None
+
+    # Scrape the listing inside a dedicated context taken from self.pool
+    async def iter_cards_in_context(self):
+        self.context = await self.pool.new_context()  # Create a new browser context (profile applied by the pool)
+        main_page = await self.context.new_page()  # Open a new tab/page
+        if self.http_details:
+            self.fetcher = DetailPageFetcher(
+                max_connections=max(self.detail_pool_size, 1) * 4, scheduler=self.scheduler
+            ).open()
 
-            finally:
-                print("Closing browser...")
-                await self.browser.close()
+        try:
+            capture = None
+            if self.capture_api:
+                # Listen for the listing API before the first request goes out
+                capture = ListingApiCapture(scheduler=self.scheduler)
+                capture.attach(main_page)
+
+            selected, resumed_scan = await self.load_selected_records(main_page, capture)
+
+            if self.journal is not None:
+                selected = [record for record in selected if not self.journal.processed(self.journal_key(record))]
+                if resumed_scan and any(not record['detail_url'] and not record.get('from_api') for record in selected):
+                    # Cards without a URL are resolved by clicking, so they must be loaded in the page again
+                    await self.scroll_to_bottom(main_page)
+
+            # Fetch details over HTTP and/or a bounded page pool in batches, or click through one card at a time
+            use_pool = self.detail_pool_size > 0 or self.http_details or capture is not None
+            batch_size = self.DETAIL_BATCH_SIZE if use_pool else 1
+            total = 0
+            for start in range(0, len(selected), batch_size):
+                batch = selected[start:start + batch_size]
+                if use_pool:
+                    cards = await self.scrape_cards_with_detail_pool(batch, main_page)
+                else:
+                    cards = [await self.scrape_card_data(batch[0], main_page)]
+
+                if self.seen_index is not None:
+                    self.update_seen_index(batch, cards)
+                if self.journal is not None:
+                    self.journal.add_cards([(self.journal_key(record), card_data) for record, card_data in zip(batch, cards)])
+
+                for record, card_data in zip(batch, cards):
+                    total += 1
+                    metrics.increment('cards_emitted')
+                    yield UnchangedPropertyCard(**card_data) if record.get('unchanged') else PropertyCard(**card_data)
+
+            logger.info(f"Total cards collected: {total}")
+            if self.journal is not None:
+                self.journal.finish()
+
+        finally:
+            if self.fetcher is not None:
+                await self.fetcher.close()
+                self.fetcher = None
+            await self.pool.release(self.context)
+
+    # Load the listing, scan it (or reuse the journal's scan) and pick the cards to scrape.
+    # Returns (selected records, whether the scan came from the journal).
+    async def load_selected_records(self, main_page, capture):
+        logger.info(f"Navigating to {self.url} ...")
+        with metrics.timer('navigation'):
+            await self.scheduler.run(lambda: main_page.goto(self.url), f"Loading {self.url}")
+            await main_page.wait_for_selector('.relative.min-h-48', timeout=60000)  # Wait for card area to load
+        logger.info("Main page loaded.")
+
+        # A resumed crawl reuses the scan of the previous attempt instead of scrolling again
+        records = self.journal.scan if self.journal is not None else None
+        resumed_scan = bool(records)
+        if not records and capture is not None:
+            records = await self.collect_api_records(main_page, capture)
+
+        if not records:
+            # Scroll to ensure all cards are loaded; the scan already returns classified records
+            logger.info("Scrolling to bottom to load all cards...")
+            with metrics.timer('scroll'):
+                records = await self.scroll_to_bottom(main_page)
+        if not records:
+            logger.info("No cards found on this page.")
+            raise NoCardsFound(self.url)
+        if self.journal is not None and not resumed_scan:
+            self.journal.save_scan(records)
+
+        logger.info("Processing all cards for logic...")
+        selected = self.select_cards(records)
+        metrics.increment('cards_seen', len(records))
+        metrics.increment('cards_skipped_old', len(records) - len(selected))
+        if self.seen_index is not None:
+            if resumed_scan:
+                # reset_scan, which loads the index for a fresh scan, did not run for a journal scan
+                self.known_listings = self.seen_index.load(self.url)
+            selected = self.drop_unchanged(selected)
+            self.seen_index.mark_seen(self.url, self.unchanged_entries)
+            metrics.increment('cards_skipped_unchanged', len(self.unchanged_entries))
+        return selected, resumed_scan
+
+    async def scan_for_queue(self):
+        """
+        Distributed mode: scans the listing in a context of self.pool and
+        resolves the cards that need no detail fetch (known details, or no URL
+        so they are clicked here). Returns (resolved, queued): resolved is
+        [(position, card_data)], queued is [(position, record, card_data)] for
+        the cards whose detail pages are left to the queue.
+        """
+        self.context = await self.pool.new_context()
+        main_page = await self.context.new_page()
+        try:
+            capture = None
+            if self.capture_api:
+                capture = ListingApiCapture(scheduler=self.scheduler)
+                capture.attach(main_page)
+            selected, _ = await self.load_selected_records(main_page, capture)
+
+            queued, local = [], []
+            for position, record in enumerate(selected):
+                if record['detail_url'] and self.known_details(record) is None:
+                    queued.append((position, record, self.build_card_data(record)))
+                else:
+                    local.append((position, record))
+            cards = await self.scrape_cards_with_detail_pool([record for _, record in local], main_page)
+            metrics.increment('cards_emitted', len(cards))
+            logger.info(f"Resolved {len(local)} cards while scanning; queued {len(queued)} detail pages.")
+            return [(position, card_data) for (position, _), card_data in zip(local, cards)], queued
+        finally:
+            await self.pool.release(self.context)
+
+    # Distributed mode: fetch the detail pages of queued card records; there is no listing page to click on
+    async def scrape_queued_cards(self, records):
+        self.context = await self.pool.new_context()
+        if self.http_details:
+            self.fetcher = DetailPageFetcher(
+                max_connections=max(self.detail_pool_size, 1) * 4, scheduler=self.scheduler
+            ).open()
+        try:
+            cards = await self.scrape_cards_with_detail_pool(records, None)
+            metrics.increment('cards_emitted', len(cards))
+            return cards
+        finally:
+            if self.fetcher is not None:
+                await self.fetcher.close()
+                self.fetcher = None
+            await self.pool.release(self.context)
+
+    # Key of a card in the crawl journal: its detail URL, or its position when it has none
+    def journal_key(self, record):
+        return record['detail_url'] or f"#{record['index']}"
+
+    # Build classified records from the listing API, paging through it directly.
+    # Returns None when no listing responses were seen so the caller can use the DOM.
+    async def collect_api_records(self, page, capture):
+        if not await capture.wait_for_listings(timeout=5):
+            # The first page may be server-rendered; one scroll triggers the listing request
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            if not await capture.wait_for_listings(timeout=10):
+                logger.info("No listing API responses captured; falling back to the rendered cards.")
+                return None
+
+        self.reset_scan()
+        with metrics.timer('api_collect'):
+            records = await capture.collect(self.context.request, capture.to_property_record, should_stop=self.track_records)
+        for record in records:
+            record['from_api'] = True  # Indexes do not map to DOM cards, so never click these
+        logger.info(f"Collected {len(records)} card records from the listing API.")
+        return records
+
+    # Read the cards from index `start` onwards with one evaluate call
+    async def extract_card_records(self, page, start=0):
+        with metrics.timer('card_extraction'):
+            return await page.eval_on_selector_all(self.CARD_SELECTOR, self.CARD_RECORDS_JS, start)
+
+    # Pick the records to scrape: stop after 3 old pinned and 3 old not-pinned cards
+    def select_cards(self, records):
+        selected = []
+        pinned_done = False
+        not_pinned_done = False
+        consecutive_pinned_old = 0
+        consecutive_not_pinned_old = 0
+
+        for record in records:
+            index = record['index']
+            is_pinned = record['is_pinned']
+            is_old = record['is_old']
+            date_text = record['date_text']
+
+            logger.debug(
+                "Card %d: pinned=%s, date_text='%s', is_old=%s, pinned_done=%s, not_pinned_done=%s",
+                index + 1, is_pinned, date_text, is_old, pinned_done, not_pinned_done
+            )
+
+            if is_pinned and not pinned_done:
+                if is_old:
+                    consecutive_pinned_old += 1
+                else:
+                    consecutive_pinned_old = 0
+                if consecutive_pinned_old >= 3:
+                    pinned_done = True
+                    continue
+                if is_old:
+                    continue
+                selected.append(record)
+
+            elif not is_pinned and pinned_done and not not_pinned_done:
+                if is_old:
+                    consecutive_not_pinned_old += 1
+                else:
+                    consecutive_not_pinned_old = 0
+                if consecutive_not_pinned_old >= 3:
+                    not_pinned_done = True
+                    continue
+                if is_old:
+                    continue
+                selected.append(record)
+
+        return selected
 
     # Extract all relevant card fields
-    async def scrape_card_data(self, post, index, main_page):
-        print(f"Scraping data for card {index+1}...")
-        title = await self.scrape_text(post, '.font-bold.text-lg.text-dark.line-clamp-2.break-words')
-        price = await self.scrape_text(post, '.rounded.font-bold.text-primary-dark')
-        relative_date = await self.scrape_text(post, '.rounded.text-xs.flex.items-center.gap-1')
-        description = await self.scrape_description(post)
-        image_url = await self.scrape_image(post)
-        pin_status = await self.scrape_pin_status(post)
-
-        # Visit card to get extra details
-        link, mobile_number, views_number = await self.scrape_link_and_details(post, index, main_page)
-
-        card_data = {
-            'title': title,
-            'price': price,
-            'relative_date': relative_date,
-            'description': description,
-            'image_url': image_url,
-            'link': link,
-            'mobile_number': mobile_number,
-            'views_number': views_number,
-            'pin_status': pin_status
+    async def scrape_card_data(self, record, main_page):
+        card_data = self.build_card_data(record)
+
+        # Visit card to get extra details unless the record already carries them
+        details = self.known_details(record)
+        if details is None:
+            details = await self.click_card_for_details(record['index'], main_page)
+        link, mobile_number, views_number = details
+
+        return self.merge_details(card_data, record['index'], link, mobile_number, views_number)
+
+    # Keep only records that are new or changed since they were last indexed; with keep_unchanged
+    # the others are kept too, flagged 'unchanged', as their views are still wanted for the history
+    def drop_unchanged(self, selected):
+        self.unchanged_entries = []
+        kept = []
+        for record in selected:
+            record['listing_id'] = self.seen_index.listing_id(record)
+            record['content_hash'] = self.seen_index.content_hash(self.build_card_data(record))
+            if self.known_listings.get(record['listing_id']) == record['content_hash']:
+                self.unchanged_entries.append((record['listing_id'], record['content_hash']))
+                if self.keep_unchanged:
+                    record['unchanged'] = True
+                    kept.append(record)
+            else:
+                kept.append(record)
+        if self.keep_unchanged:
+            logger.info(f"Fetching {len(self.unchanged_entries)} unchanged listings for the history store only.")
+        else:
+            logger.info(f"Skipping {len(self.unchanged_entries)} unchanged listings already in the index.")
+        return kept
+
+    # Store emitted listings; cards whose details failed are left for the next run
+    def update_seen_index(self, selected, result):
+        entries = []
+        for record, card_data in zip(selected, result):
+            if card_data['link'] is not None:
+                entries.append((record['listing_id'], record['content_hash']))
+        self.seen_index.mark_seen(self.url, entries)
+
+    # Turn a raw card record into the output dict (detail fields filled in later)
+    def build_card_data(self, record):
+        return {
+            'title': record['title'],
+            'price': record['price'],
+            'relative_date': record['relative_date'],
+            'posted_at': record.get('posted_at'),
+            'description': record['description'],
+            'image_url': record['image_url'],
+            'link': None,
+            'mobile_number': None,
+            'views_number': None,
+            'pin_status': "Pinned" if record['is_pinned'] else "Not pinned",
+            'duplicate_of': record.get('repost_of')
         }
-        print(f"Card {index+1} Data: {card_data}")
+
+    # Details already present on the record (e.g. from the listing API), those of a known repost, or None
+    def known_details(self, record):
+        if record.get('mobile_number') is not None and record.get('views_number') is not None:
+            return record['detail_url'], record['mobile_number'], record['views_number']
+        if self.dedup is not None and record['detail_url'] and 'repost_of' not in record:
+            # Looked up once per record; the result is kept on it for later calls
+            repost = self.dedup.find_repost(record)
+            record['repost_of'] = repost[0] if repost is not None else None
+            if record['repost_of']:
+                metrics.increment('cards_skipped_repost')
+        if record.get('repost_of'):
+            # Similar text does not make it the same owner, so no phone or views are copied from the earlier
+            # listing; the card only links to it through duplicate_of
+            return record['detail_url'], None, None
+        return None
+
+    # Fill the detail-page fields into a card record
+    def merge_details(self, card_data, index, link, mobile_number, views_number):
+        card_data['link'] = link
+        card_data['mobile_number'] = mobile_number
+        card_data['views_number'] = views_number
+        logger.debug("Card %d Data: %s", index + 1, card_data)
         return card_data
 
+    # Scrape the selected cards, fetching detail pages over HTTP and/or in parallel worker pages
+    async def scrape_cards_with_detail_pool(self, selected, main_page):
+        details = [self.known_details(record) for record in selected]
+        if self.fetcher is not None:
+            await self.fetch_details_over_http(selected, details)
+
+        # Queue every card still missing details that exposes a URL; positions keep the card order
+        queue = asyncio.Queue()
+        for position, record in enumerate(selected):
+            if record['detail_url'] and details[position] is None:
+                queue.put_nowait((position, record['detail_url']))
+
+        failed = []  # Detail URLs whose page could not be loaded
+
+        async def worker():
+            page = await self.context.new_page()
+            try:
+                while True:
+                    try:
+                        position, detail_url = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        details[position] = await self.fetch_detail_page(page, detail_url)
+                    except Exception as e:
+                        logger.warning(f"Failed to fetch detail page {detail_url}: {e}")
+                        metrics.increment('failures', stage='detail_page')
+                        failed.append(detail_url)
+            finally:
+                await page.close()
+
+        pool_size = min(max(self.detail_pool_size, 1), queue.qsize())
+        logger.info(f"Fetching {queue.qsize()} detail pages with {pool_size} worker pages...")
+        if pool_size:
+            await asyncio.gather(*(worker() for _ in range(pool_size)))
+        if failed and main_page is None:
+            # Queued detail items have no card to click instead; failing the batch lets the work queue retry it
+            raise DetailPagesFailed(failed)
+
+        result = []
+        for position, record in enumerate(selected):
+            if details[position] is None:
+                if record.get('from_api') or main_page is None:
+                    details[position] = (record['detail_url'], None, None)
+                else:
+                    # No usable href on the card (or the fetch failed): fall back to clicking it
+                    details[position] = await self.click_card_for_details(record['index'], main_page)
+            link, mobile_number, views_number = details[position]
+            result.append(self.merge_details(self.build_card_data(record), record['index'], link, mobile_number, views_number))
+        return result
+
+    # Fill details for every card whose detail page yields both fields over plain HTTP
+    async def fetch_details_over_http(self, selected, details):
+        positions = [position for position, record in enumerate(selected) if record['detail_url'] and details[position] is None]
+        logger.info(f"Fetching {len(positions)} detail pages over HTTP...")
+        with metrics.timer('detail_fetch', method='http'):
+            fetched = await self.fetcher.fetch_many([selected[position]['detail_url'] for position in positions])
+
+        for position, (mobile_number, views_number) in zip(positions, fetched):
+            # Only trust the fast path when it found everything; otherwise use the browser
+            if mobile_number is not None and views_number is not None:
+                details[position] = (selected[position]['detail_url'], mobile_number, views_number)
+        resolved = sum(details[position] is not None for position in positions)
+        logger.info(f"HTTP fast path resolved {resolved}/{len(positions)} detail pages.")
+
+    # Re-query the card handle by index and click through to its detail page
+    async def click_card_for_details(self, index, main_page):
+        posts = await main_page.query_selector_all(self.CARD_SELECTOR)
+        if index >= len(posts):
+            logger.warning(f"Card {index+1} is no longer on the page (total cards: {len(posts)})")
+            metrics.increment('failures', stage='card_missing')
+            return None, None, None
+        with metrics.timer('detail_fetch', method='click'):
+            return await self.scrape_link_and_details(posts[index], index, main_page)
+
+    # Open a detail URL in a worker page and extract phone and views; errors propagate to the caller
+    async def fetch_detail_page(self, page, detail_url):
+        with metrics.timer('detail_fetch', method='page'):
+            await self.scheduler.run(lambda: page.goto(detail_url), f"Loading {detail_url}")
+            mobile_number, views_number = await self.scrape_detail_fields(page)
+        return detail_url, mobile_number, views_number
+
     # Visit the card detail page and extract link, phone, and views
     async def scrape_link_and_details(self, post, index, main_page):
-        print(f"Clicking card {index+1} to get link and details (in-place navigation)...")
+        logger.debug(f"Clicking card {index+1} to get link and details (in-place navigation)...")
         try:
             old_url = main_page.url
 
             await post.scroll_into_view_if_needed()
+            await self.scheduler.take_token()  # The click loads a detail page, so it counts against the rate limit
+            await post.click(force=True)
 
+            # Wait until URL changes (event-driven instead of polling)
             try:
-                await asyncio.wait_for(main_page.wait_for_navigation(), timeout=5)
+                await main_page.wait_for_url(lambda url: url != old_url, wait_until='commit', timeout=6000)
             except Exception:
                 pass
-            await post.click(force=True)
-
-            # Wait until URL changes
-            for _ in range(30):
-                if main_page.url != old_url:
-                    break
-                await asyncio.sleep(0.2)
             detail_url = main_page.url
 
-            # Extract phone number (tel:)
-            mobile_number = None
-            try:
-                await main_page.wait_for_selector('.flex.gap-3.justify-center a', timeout=5000)
-                mobile_element = await main_page.query_selector('.flex.gap-3.justify-center a')
-                if mobile_element:
-                    mobile_href = await mobile_element.get_attribute('href')
-                    if mobile_href and mobile_href.startswith('tel:'):
-                        mobile_number = mobile_href[4:]
-            except Exception as e:
-                print(f"Failed to get mobile: {e}")
-
-            # Extract view count
-            views_number = None
-            try:
-                await main_page.wait_for_selector(
-                    '.flex.items-center.justify-center.gap-1.rounded.bg-whitish-transparent.py-1.px-1\\.5.text-xs.min-w-\\[62px\\] div', timeout=5000)
-                views_element = await main_page.query_selector(
-                    '.flex.items-center.justify-center.gap-1.rounded.bg-whitish-transparent.py-1.px-1\\.5.text-xs.min-w-\\[62px\\] div')
-                if views_element:
-                    views_number = await views_element.text_content()
-            except Exception as e:
-                print(f"Failed to get views: {e}")
+            mobile_number, views_number = await self.scrape_detail_fields(main_page)
 
             # Return to main listing page
             await main_page.go_back()
@@ -189,60 +504,51 @@ class PropertyCardScraper:
             return detail_url, mobile_number, views_number
 
         except Exception as e:
-            print(f"Failed to click/get details for card {index+1}: {e}")
+            logger.warning(f"Failed to click/get details for card {index+1}: {e}")
+            metrics.increment('failures', stage='detail_click')
             try:
-                await main_page.goto(self.url)
+                await self.scheduler.run(lambda: main_page.goto(self.url), f"Reloading {self.url}")
                 await main_page.wait_for_selector('.relative.min-h-48', timeout=15000)
             except Exception as ee:
-                print(f"Failed to recover main page: {ee}")
+                logger.warning(f"Failed to recover main page: {ee}")
             return None, None, None
 
-    # Generic method to extract text from a selector
-    async def scrape_text(self, post, selector):
+    # Extract phone number and view count from an opened detail page
+    async def scrape_detail_fields(self, page):
+        # Extract phone number (tel:)
+        mobile_number = None
         try:
-            element = await post.query_selector(selector)
-            if element:
-                text = await element.text_content()
-                return text
+            await page.wait_for_selector('.flex.gap-3.justify-center a', timeout=5000)
+            mobile_element = await page.query_selector('.flex.gap-3.justify-center a')
+            if mobile_element:
+                mobile_href = await mobile_element.get_attribute('href')
+                if mobile_href and mobile_href.startswith('tel:'):
+                    mobile_number = mobile_href[4:]
         except Exception as e:
-            print(f"Failed to scrape {selector}: {e}")
-        return None
+            logger.warning(f"Failed to get mobile: {e}")
+            metrics.increment('failures', stage='mobile')
 
-    # Description is the 2nd occurrence of line-clamp-2
-    async def scrape_description(self, post):
+        # Extract view count
+        views_number = None
         try:
-            description_element = await post.query_selector('.line-clamp-2:nth-of-type(2)')
-            if description_element:
-                return await description_element.text_content()
+            await page.wait_for_selector(
+                '.flex.items-center.justify-center.gap-1.rounded.bg-whitish-transparent.py-1.px-1\\.5.text-xs.min-w-\\[62px\\] div', timeout=5000)
+            views_element = await page.query_selector(
+                '.flex.items-center.justify-center.gap-1.rounded.bg-whitish-transparent.py-1.px-1\\.5.text-xs.min-w-\\[62px\\] div')
+            if views_element:
+                views_number = await views_element.text_content()
         except Exception as e:
-            print(f"Failed to scrape description: {e}")
-        return None
+            logger.warning(f"Failed to get views: {e}")
+            metrics.increment('failures', stage='views')
 
-    # Extract image from post
-    async def scrape_image(self, post):
-        try:
-            img_element = await post.query_selector('img[alt="Post"]')
-            if img_element:
-                return await img_element.get_attribute('src')
-        except Exception as e:
-            print(f"Failed to scrape image: {e}")
-        return None
+        return mobile_number, views_number
 
-    # Identify if card is pinned
-    async def scrape_pin_status(self, post):
-        try:
-            pin_tag = await post.query_selector('div.bg-stickyTag')
-            if pin_tag:
-                text = await pin_tag.text_content()
-                if text and "مميز" in text:
-                    return "Pinned"
-        except Exception as e:
-            print(f"Failed to check pin status: {e}")
-        return "Not pinned"
-
-    # Scrolls page to load more cards and stop when enough old ones are found
+    # Scrolls page to load more cards and stop when enough old ones are found.
+    # Only newly appended cards are read on each pass; returns all classified records.
     async def scroll_to_bottom(self, page):
-        print("Starting scroll_to_bottom...")
+        logger.info("Starting scroll_to_bottom...")
+        self.reset_scan()
+
         button_selector = (
             'button.text-base.shrink-0.select-none.whitespace-nowrap.transition-colors.'
             'disabled\\:opacity-50.h-12.font-bold.bg-primary.text-on-primary.active\\:bg-active-primary.'
@@ -254,48 +560,100 @@ class PropertyCardScraper:
             if button:
                 is_disabled = await button.get_property('disabled')
                 if not is_disabled:
+                    loaded = await self.count_cards(page)
                     await button.click()
-                    await asyncio.sleep(10)
+                    await self.wait_for_more_cards(page, loaded, timeout=10000)
         except Exception as e:
-            print(f"Could not click 'Show More' button: {e}")
+            logger.warning(f"Could not click 'Show More' button: {e}")
 
         max_scrolls = 30
+        max_idle_scrolls = 3  # Stop once this many scrolls in a row load nothing new
+        idle_scrolls = 0
         for scroll_count in range(max_scrolls):
+            loaded = len(self.scanned_records)
             await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-            await asyncio.sleep(2)
-            posts = await page.query_selector_all('.relative.w-full.rounded-lg.card-shadow')
-
-            if posts and len(posts) >= 10:
-                pinned_streak = 0
-                not_pinned_streak = 0
-                yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-                in_pinned = True
-
-                for i, post in enumerate(posts):
-                    pin_tag = await post.query_selector('div.bg-stickyTag')
-                    is_pinned = bool(pin_tag and "مميز" in (await pin_tag.text_content() or ""))
-                    if not is_pinned:
-                        in_pinned = False
-
-                    date_elem = await post.query_selector('.rounded.text-xs.flex.items-center.gap-1')
-                    date_text = (await date_elem.text_content()).strip() if date_elem else ""
-                    is_old = False
-                    try:
-                        card_date = datetime.strptime(date_text, "%Y-%m-%d")
-                        if card_date < datetime.strptime(yesterday, "%Y-%m-%d"):
-                            is_old = True
-                    except ValueError:
-                        if not any(word in date_text for word in ['ساعة', 'دقيقة', 'ثانية']):
-                            is_old = True
-
-                    if is_pinned and is_old and in_pinned:
-                        pinned_streak += 1
-                    elif not is_pinned and is_old and not in_pinned:
-                        not_pinned_streak += 1
-
-                    if pinned_streak >= 3 and not_pinned_streak >= 3:
-                        return
+            await self.wait_for_more_cards(page, loaded)
+
+            if await self.scan_new_cards(page) == 0:
+                idle_scrolls += 1
+                if idle_scrolls >= max_idle_scrolls:
+                    logger.info("No new cards after several scrolls.")
+                    return self.scanned_records
             else:
-                print(f"Not enough cards loaded yet ({len(posts) if posts else 0}). Continuing scroll...")
-        print("Reached max scrolls or detected enough cards.")
+                idle_scrolls = 0
 
+            if len(self.scanned_records) >= 10:
+                if self.scan_complete():
+                    return self.scanned_records
+            else:
+                logger.debug(f"Not enough cards loaded yet ({len(self.scanned_records)}). Continuing scroll...")
+        logger.info("Reached max scrolls or detected enough cards.")
+
+        # Pick up anything appended after the last pass
+        await self.scan_new_cards(page)
+        return self.scanned_records
+
+    # Clear the scan state before a new pass over the listing
+    def reset_scan(self):
+        self.scanned_records = []
+        self.in_pinned = True
+        self.pinned_streak = 0
+        self.not_pinned_streak = 0
+        self.classifier = CardClassifier()
+        self.known_streak = 0
+        if self.seen_index is not None:
+            self.known_listings = self.seen_index.load(self.url)
+
+    # Read and classify only the cards appended since the previous pass; returns how many were new
+    async def scan_new_cards(self, page):
+        new_records = await self.extract_card_records(page, start=len(self.scanned_records))
+        self.track_records(new_records)
+        return len(new_records)
+
+    # Classify new records and update the old-card streaks; True once enough old cards were seen
+    def track_records(self, new_records):
+        self.classifier.classify_many(new_records)  # Pinned/old status and absolute posting date
+        for record in new_records:
+            if not record['is_pinned']:
+                self.in_pinned = False
+
+            if record['is_pinned'] and record['is_old'] and self.in_pinned:
+                self.pinned_streak += 1
+            elif not record['is_pinned'] and record['is_old'] and not self.in_pinned:
+                self.not_pinned_streak += 1
+
+            # Pinned cards stay at the top every day, so only not-pinned ones count towards the known run
+            if self.seen_index is not None and not record['is_pinned']:
+                if self.seen_index.listing_id(record) in self.known_listings:
+                    self.known_streak += 1
+                else:
+                    self.known_streak = 0
+        self.scanned_records.extend(new_records)
+        return len(self.scanned_records) >= 10 and self.scan_complete()
+
+    # True once enough old cards, or a long enough run of already-indexed cards, were seen
+    def scan_complete(self):
+        if self.seen_index is not None and self.known_streak >= self.KNOWN_RUN_LIMIT:
+            logger.info(f"Reached {self.known_streak} consecutive already-indexed cards.")
+            return True
+        return self.pinned_streak >= 3 and self.not_pinned_streak >= 3
+
+    # Count the cards currently in the DOM
+    async def count_cards(self, page):
+        return await page.eval_on_selector_all(self.CARD_SELECTOR, 'cards => cards.length')
+
+    # Wait on DOM mutations until more than `loaded` cards exist, falling back to network idle
+    async def wait_for_more_cards(self, page, loaded, timeout=5000):
+        try:
+            await page.wait_for_function(
+                '([selector, loaded]) => document.querySelectorAll(selector).length > loaded',
+                arg=[self.CARD_SELECTOR, loaded],
+                polling='mutation',
+                timeout=timeout
+            )
+        except Exception:
+            # Nothing new appeared in time; let any in-flight requests settle before the next pass
+            try:
+                await page.wait_for_load_state('networkidle', timeout=timeout)
+            except Exception:
+                pass
@@ -0,0 +1,257 @@
+# Import required modules
+import csv  # For the CSV writer
+import json  # To spool records as JSON Lines
+import os  # For output paths
+import time  # To time the writes
+from datetime import datetime  # Timestamps are written to JSON as ISO 8601
+from Metrics import metrics  # Run-wide timers and counters
+
+# pyarrow, openpyxl and pandas are imported by the writers that use them, so picking the
+# CSV/JSON Lines formats (or only validating format names) does not load them.
+
+
+# Base class for writers that consume a stream of scraped records
+class RecordWriter:
+    extension = None  # File extension written by the subclass
+
+    def __init__(self, folder, name):
+        self.path = os.path.join(folder, f"{name}.{self.extension}")  # Final output file
+        self.count = 0  # Records written so far
+        self.record_type = None  # Record class of the stream, known once the first record arrives
+
+    # Write every record of an async iterable, closing the writer even if the stream fails.
+    # Only the time spent writing is recorded, not the time spent waiting for the scraper.
+    async def consume(self, records):
+        elapsed = 0.0
+        self.open()
+        try:
+            async for record in records:
+                start = time.perf_counter()
+                if self.record_type is None:
+                    self.set_record_type(type(record))
+                self.write(record.to_dict())
+                elapsed += time.perf_counter() - start
+                self.count += 1
+        finally:
+            start = time.perf_counter()
+            try:
+                self.close()
+            finally:
+                metrics.observe('write', elapsed + time.perf_counter() - start, format=self.extension)
+                metrics.increment('records_written', self.count)
+        return self.count
+
+    def set_record_type(self, record_type):
+        self.record_type = record_type
+
+    # Output files produced by this writer
+    def paths(self):
+        return [self.path]
+
+    def make_folder(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+    def open(self):
+        raise NotImplementedError
+
+    def write(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+# JSON form of values json cannot encode natively (posting timestamps)
+def json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to JSON")
+
+
+# Writes one JSON object per line, flushed as records arrive.
+# The file is created with the first record, so an empty or failed section leaves no file behind.
+class JsonLinesWriter(RecordWriter):
+    extension = 'jsonl'
+
+    def open(self):
+        self.file = None
+
+    def write(self, row):
+        if self.file is None:
+            self.make_folder()
+            self.file = open(self.path, 'w', encoding='utf-8')
+        self.file.write(json.dumps(row, ensure_ascii=False, default=json_value) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# Writes a CSV file with a header taken from the first record (UTF-8 with BOM so Excel reads Arabic).
+# Like the JSON Lines writer, it only creates the file once a record arrives.
+class CsvWriter(RecordWriter):
+    extension = 'csv'
+
+    def open(self):
+        self.file = None
+        self.writer = None
+
+    def write(self, row):
+        if self.writer is None:
+            self.make_folder()
+            self.file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+            self.writer = csv.DictWriter(self.file, fieldnames=list(row))
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# Writes compressed Parquet in row groups with the record type's schema (inferred from the first batch for plain rows)
+class ParquetWriter(RecordWriter):
+    extension = 'parquet'
+    ROW_GROUP_SIZE = 5000  # Records buffered before a row group is flushed
+
+    def open(self):
+        self.make_folder()
+        self.rows = []
+        self.writer = None
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        import pyarrow as pa  # Columnar batches for Parquet
+        import pyarrow.parquet as pq  # Parquet file writer
+        if self.writer is None:
+            if self.record_type is not None:
+                schema = self.record_type.arrow_schema()
+            else:
+                table = pa.Table.from_pylist(self.rows)
+                # Columns that were all empty in the first batch are stored as strings, not nulls
+                schema = pa.schema([
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+                ])
+            self.writer = pq.ParquetWriter(self.path, schema, compression='zstd')
+        table = pa.Table.from_pylist(self.rows, schema=self.writer.schema)
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Streams rows into a write-only openpyxl workbook so memory stays flat for large sections
+class StreamingExcelWriter(RecordWriter):
+    extension = 'xlsx'
+
+    def open(self):
+        from openpyxl import Workbook  # Write-only workbook
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE  # Control characters openpyxl refuses to store
+        self.illegal_characters = ILLEGAL_CHARACTERS_RE
+        self.make_folder()
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Sheet1')
+        self.header = None
+
+    def write(self, row):
+        if self.header is None:
+            self.header = list(row)
+            self.sheet.append(self.header)
+        self.sheet.append([self.cell_value(row.get(column)) for column in self.header])
+
+    def cell_value(self, value):
+        if isinstance(value, str):
+            return self.illegal_characters.sub('', value)
+        return value
+
+    def close(self):
+        if self.count:
+            self.workbook.save(self.path)
+        self.workbook.close()
+
+
+# Spools records to a Parquet file while scraping, then builds the Excel sheet with pandas from its typed columns
+class ExcelWriter(RecordWriter):
+    extension = 'xlsx'
+
+    def __init__(self, folder, name):
+        super().__init__(folder, name)
+        self.spool = ParquetWriter(folder, f".{name}.spool")  # Rows reach disk in row groups while scraping
+
+    def set_record_type(self, record_type):
+        super().set_record_type(record_type)
+        self.spool.set_record_type(record_type)
+
+    def open(self):
+        self.spool.open()
+
+    def write(self, row):
+        self.spool.write(row)
+
+    def close(self):
+        self.spool.close()
+        try:
+            if self.count:
+                import pyarrow.parquet as pq  # Reads the spool back
+                from CardRecords import frame_from_arrow  # Typed DataFrame of an Arrow table
+                df = frame_from_arrow(pq.read_table(self.spool.path))
+                df.to_excel(self.path, index=False, engine='openpyxl')
+        finally:
+            if os.path.exists(self.spool.path):
+                os.remove(self.spool.path)
+
+
+# Output formats selectable by name
+WRITERS = {
+    'xlsx': StreamingExcelWriter,
+    'xlsx-pandas': ExcelWriter,
+    'parquet': ParquetWriter,
+    'csv': CsvWriter,
+    'jsonl': JsonLinesWriter,
+}
+
+
+# Sends every record to several writers so formats can be produced alongside each other
+class MultiWriter(RecordWriter):
+    def __init__(self, folder, name, formats):
+        self.writers = [WRITERS[output_format](folder, name) for output_format in formats]
+        self.extension = '+'.join(formats)  # Label for the write timer
+        self.count = 0
+        self.record_type = None
+
+    def paths(self):
+        return [path for writer in self.writers for path in writer.paths()]
+
+    def set_record_type(self, record_type):
+        super().set_record_type(record_type)
+        for writer in self.writers:
+            writer.set_record_type(record_type)
+
+    def open(self):
+        for writer in self.writers:
+            writer.open()
+
+    def write(self, row):
+        for writer in self.writers:
+            writer.write(row)
+            writer.count += 1
+
+    def close(self):
+        errors = []
+        for writer in self.writers:
+            try:
+                writer.close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
@@ -0,0 +1,120 @@
+# Import required modules
+import asyncio  # Concurrency cap and waiting for tokens
+import logging  # Module logger
+import random  # Jitter for retry delays
+import time  # Token refill clock
+from collections import deque  # Sliding window of recent outcomes
+import httpx  # Timeout/transport errors of the HTTP fast path
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError  # Browser request errors
+from Metrics import metrics  # Run-wide timers and counters
+
+logger = logging.getLogger(__name__)
+
+
+# Raised inside the scheduler when a response carries a retryable status code
+class RetryableStatus(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+# Central scheduler for requests to the site: a token bucket caps the request rate, a semaphore
+# caps concurrent requests, timeouts and 429/5xx are retried with jittered exponential backoff,
+# and the rate is halved whenever the recent error rate rises above error_threshold.
+class RequestScheduler:
+    RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, rate=5.0, burst=10, max_concurrency=8, max_retries=3, base_delay=1.0, max_delay=30.0,
+                 error_window=50, error_threshold=0.2, min_rate=0.5):
+        self.max_rate = rate  # Requests per second when the site is healthy
+        self.rate = rate  # Current (adaptive) requests per second
+        self.min_rate = min_rate  # Floor for the adaptive rate
+        self.burst = burst  # Bucket size: requests that may go out back to back
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.outcomes = deque(maxlen=error_window)  # True for failures, over the last error_window requests
+        self.error_threshold = error_threshold
+        self.lock = asyncio.Lock()
+
+    # Wait until the bucket holds a token, then take it
+    async def take_token(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def is_retryable(self, error):
+        if isinstance(error, RetryableStatus):
+            return True
+        if isinstance(error, (PlaywrightTimeoutError, asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError)):
+            return True
+        # Dropped connections surface as generic Playwright errors with a net:: code
+        return isinstance(error, PlaywrightError) and 'net::' in str(error)
+
+    # Status code of a Playwright Response/APIResponse or an httpx response, if any
+    def check_status(self, result):
+        status = getattr(result, 'status', None)
+        if not isinstance(status, int):
+            status = getattr(result, 'status_code', None)
+        if isinstance(status, int) and status in self.RETRY_STATUSES:
+            headers = getattr(result, 'headers', None) or {}
+            retry_after = headers.get('retry-after') if hasattr(headers, 'get') else None
+            raise RetryableStatus(status, float(retry_after) if retry_after and retry_after.isdigit() else None)
+
+    # Record an outcome and adapt the rate: halve it when errors pile up, creep back when healthy
+    def record(self, failed):
+        self.outcomes.append(failed)
+        if failed:
+            failures = sum(self.outcomes)
+            if len(self.outcomes) >= 10 and failures / len(self.outcomes) > self.error_threshold and self.rate > self.min_rate:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.outcomes.clear()
+                logger.warning(f"Error rate above {self.error_threshold:.0%}; slowing down to {self.rate:.2f} requests/s.")
+                metrics.increment('rate_backoffs')
+        elif self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.02)
+
+    def retry_delay(self, attempt, error):
+        if isinstance(error, RetryableStatus) and error.retry_after:
+            return min(error.retry_after, self.max_delay)
+        return min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def run(self, call, description='request'):
+        """
+        Runs `await call()` under the rate limit and concurrency cap, retrying
+        timeouts, dropped connections and retryable status codes.
+        Returns the call's result; re-raises the last error once retries are exhausted.
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self.semaphore:
+                await self.take_token()
+                try:
+                    result = await call()
+                    self.check_status(result)
+                except Exception as e:
+                    retryable = self.is_retryable(e)
+                    if retryable:
+                        self.record(True)
+                    # Other errors (bad selectors, aborted navigations) say nothing about the site's load, so they are not recorded
+                    if not retryable or attempt == self.max_retries:
+                        if isinstance(e, RetryableStatus):
+                            return result  # Out of retries: hand the failing response back to the caller
+                        raise
+                    error = e
+                else:
+                    self.record(False)
+                    return result
+            delay = self.retry_delay(attempt, error)
+            logger.warning(f"{description} failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            metrics.increment('retries', stage='site')
+            await asyncio.sleep(delay)
@@ -1,27 +1,114 @@
 # Import standard and Google API libraries
 import os
 import json
+import hashlib  # Local MD5 to compare with Drive's md5Checksum
+import logging  # Module logger
+import random  # Jitter for retry backoff
+import threading  # Per-thread HTTP connections for the shared service
+import time  # Sleeping between retries
+from concurrent.futures import ThreadPoolExecutor  # Concurrent uploads and copies
+import httplib2  # HTTP transport used by the Drive client
 from google.oauth2.service_account import Credentials  # For authentication using service account
-from googleapiclient.discovery import build  # To create Google Drive service
+from google_auth_httplib2 import AuthorizedHttp  # Authorized transport bound to the service account
+from googleapiclient.discovery import build, build_from_document  # To create Google Drive service
+from googleapiclient.discovery_cache import get_static_doc  # Bundled Drive discovery document
+from googleapiclient.errors import HttpError  # Raised on non-2xx Drive responses
 from googleapiclient.http import MediaFileUpload  # For uploading files
 from datetime import datetime, timedelta  # For handling folder names based on date
+from Metrics import metrics  # Run-wide timers and counters
+
+logger = logging.getLogger(__name__)
 
 # Class to manage saving files to Google Drive using a service account
 class SavingOnDrive:
-    def __init__(self, credentials_dict):
+    # Target parent folders for the daily uploads
+    PARENT_FOLDER_IDS = [
+        '17WpAimIo-q6xMhlnUfQ_t6NMnAICQrVw',  # First folder
+        '1lL8iWCaCSFqHtsPdm35H8MC1WqQMjaPc'   # Second folder
+    ]
+
+    # Status codes worth retrying: rate limits and server-side failures
+    RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, credentials_dict, api_endpoint=None, max_workers=4, max_retries=5,
+                 chunk_size=8 * 1024 * 1024, link_mode='copy', folder_cache_path='drive_folders.json'):
         """
         Initializes the class with a dictionary of service account credentials.
+        api_endpoint points the client at another Drive-compatible server
+        (e.g. a local fake for tests); credentials may then be None.
+        max_workers uploads run at once, each retried up to max_retries times
+        with exponential backoff, sending chunk_size bytes per resumable chunk.
+        link_mode ('copy' or 'shortcut') is how files reach every parent after
+        the first, so their bytes are only uploaded once.
+        folder_cache_path is a JSON file remembering the ID of each
+        (parent, folder name) pair resolved before; None keeps it in memory.
         """
         self.credentials_dict = credentials_dict  # Service account JSON content (already parsed)
         self.scopes = ['https://www.googleapis.com/auth/drive']  # Scope for full access to Google Drive
         self.service = None  # Google Drive API client will be initialized later
+        self.credentials = None
+        self.api_endpoint = api_endpoint
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.chunk_size = chunk_size
+        self.link_mode = link_mode
+        self.local = threading.local()  # httplib2 connections are not thread-safe, so each thread gets its own
+        self.folder_cache_path = folder_cache_path
+        self.folder_cache = self.load_folder_cache()  # {"parent_id/folder_name": folder_id}
 
     def authenticate(self):
         """
         Authenticates using the service account JSON and initializes the Drive service.
         """
-        creds = Credentials.from_service_account_info(self.credentials_dict, scopes=self.scopes)
-        self.service = build('drive', 'v3', credentials=creds)  # Build Google Drive API client
+        if self.credentials_dict:
+            self.credentials = Credentials.from_service_account_info(self.credentials_dict, scopes=self.scopes)
+
+        if self.api_endpoint:
+            # Media uploads use the discovery document's rootUrl, so rewrite it rather than the client options
+            document = json.loads(get_static_doc('drive', 'v3'))
+            document['rootUrl'] = self.api_endpoint.rstrip('/') + '/'
+            self.service = build_from_document(document, http=self.thread_http())
+        else:
+            self.service = build('drive', 'v3', credentials=self.credentials)  # Build Google Drive API client
+
+    def ensure_authenticated(self):
+        if self.service is None:
+            self.authenticate()
+
+    def thread_http(self):
+        """
+        Returns this thread's HTTP connection for the shared service.
+        """
+        http = getattr(self.local, 'http', None)
+        if http is None:
+            http = httplib2.Http(timeout=120)
+            if self.credentials is not None:
+                http = AuthorizedHttp(self.credentials, http=http)
+            self.local.http = http
+        return http
+
+    def should_retry(self, error):
+        if isinstance(error, HttpError):
+            return error.resp.status in self.RETRY_STATUSES
+        return isinstance(error, (OSError, httplib2.HttpLib2Error))  # Dropped connections and timeouts
+
+    def with_retry(self, call):
+        """
+        Runs call(), retrying transient failures with exponential backoff and jitter.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not self.should_retry(e):
+                    raise
+                delay = min(2 ** attempt, 32) + random.random()
+                logger.warning(f"Drive request failed ({e}); retrying in {delay:.1f}s")
+                metrics.increment('retries', stage='drive')
+                time.sleep(delay)
+
+    def execute(self, request):
+        return self.with_retry(lambda: request.execute(http=self.thread_http()))
 
     def create_folder(self, folder_name, parent_folder_id=None):
         """
@@ -36,34 +123,218 @@ class SavingOnDrive:
             file_metadata['parents'] = [parent_folder_id]  # Set parent folder if provided
 
         # Create the folder and return its ID
-        folder = self.service.files().create(body=file_metadata, fields='id').execute()
+        folder = self.execute(self.service.files().create(body=file_metadata, fields='id'))
         return folder.get('id')
 
-    def upload_file(self, file_name, folder_id):
+    def load_folder_cache(self):
+        if self.folder_cache_path and os.path.exists(self.folder_cache_path):
+            try:
+                with open(self.folder_cache_path, encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable Drive folder cache {self.folder_cache_path}: {e}")
+        return {}
+
+    def save_folder_cache(self):
+        if self.folder_cache_path:
+            with open(self.folder_cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.folder_cache, f, indent=2)
+
+    def quote(self, value):
+        """
+        Escapes a value for use inside a Drive search query string.
+        """
+        return value.replace('\\', '\\\\').replace("'", "\\'")
+
+    def find_folder(self, folder_name, parent_folder_id):
+        """
+        Returns the ID of the oldest non-trashed folder with this name in the parent, or None.
+        """
+        query = (
+            f"name = '{self.quote(folder_name)}' and '{self.quote(parent_folder_id)}' in parents "
+            "and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
+        )
+        request = self.service.files().list(q=query, orderBy='createdTime', pageSize=1, fields='files(id)')
+        folders = self.execute(request).get('files', [])
+        return folders[0]['id'] if folders else None
+
+    def folder_exists(self, folder_id):
+        try:
+            folder = self.execute(self.service.files().get(fileId=folder_id, fields='id, trashed'))
+        except HttpError as e:
+            if e.resp.status == 404:
+                return False
+            raise
+        return not folder.get('trashed')
+
+    def find_or_create_folder(self, folder_name, parent_folder_id):
+        """
+        Returns the ID of the folder with this name in the parent, creating it only if it does not exist.
+        Resolved IDs are cached locally; a cached folder that was deleted is looked up again.
+        """
+        key = f"{parent_folder_id}/{folder_name}"
+        folder_id = self.folder_cache.get(key)
+        if folder_id and self.folder_exists(folder_id):
+            return folder_id
+
+        folder_id = self.find_folder(folder_name, parent_folder_id)
+        if folder_id:
+            logger.info(f"Found folder '{folder_name}' with ID: {folder_id} in parent folder ID: {parent_folder_id}")
+        else:
+            folder_id = self.create_folder(folder_name, parent_folder_id)
+            logger.info(f"Created folder '{folder_name}' with ID: {folder_id} in parent folder ID: {parent_folder_id}")
+
+        self.folder_cache[key] = folder_id
+        self.save_folder_cache()
+        return folder_id
+
+    def list_folder(self, folder_id):
         """
-        Uploads a single file to the specified folder on Google Drive.
+        Returns {name: file} for the non-trashed files in a folder, with their checksum and shortcut target.
         """
-        file_metadata = {'name': file_name, 'parents': [folder_id]}  # File name and destination folder
-        media = MediaFileUpload(file_name, resumable=True)  # Prepare file for upload
-        file = self.service.files().create(body=file_metadata, media_body=media, fields='id').execute()
-        return file.get('id')  # Return the uploaded file ID
+        files = {}
+        page_token = None
+        while True:
+            request = self.service.files().list(
+                q=f"'{self.quote(folder_id)}' in parents and trashed = false",
+                fields='nextPageToken, files(id, name, md5Checksum, shortcutDetails)',
+                pageSize=1000,
+                pageToken=page_token
+            )
+            response = self.execute(request)
+            for file in response.get('files', []):
+                files.setdefault(file['name'], file)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def file_md5(self, file_name):
+        md5 = hashlib.md5()
+        with open(file_name, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(block)
+        return md5.hexdigest()
+
+    def upload_file(self, file_name, folder_id, existing_id=None):
+        """
+        Uploads a single file to the specified folder on Google Drive,
+        replacing the content of existing_id in place when given.
+        The upload is resumable: a failed chunk is retried from where it stopped.
+        """
+        media = MediaFileUpload(file_name, chunksize=self.chunk_size, resumable=True)  # Prepare file for upload
+        if existing_id:
+            request = self.service.files().update(fileId=existing_id, media_body=media, fields='id')
+        else:
+            file_metadata = {'name': file_name, 'parents': [folder_id]}  # File name and destination folder
+            request = self.service.files().create(body=file_metadata, media_body=media, fields='id')
+        response = None
+        while response is None:
+            _, response = self.with_retry(lambda: request.next_chunk(http=self.thread_http()))
+        return response.get('id')  # Return the uploaded file ID
+
+    def link_file(self, file_id, file_name, folder_id):
+        """
+        Places an already uploaded file in another folder without sending its bytes again.
+        """
+        if self.link_mode == 'shortcut':
+            body = {
+                'name': file_name,
+                'mimeType': 'application/vnd.google-apps.shortcut',
+                'parents': [folder_id],
+                'shortcutDetails': {'targetId': file_id}
+            }
+            request = self.service.files().create(body=body, fields='id')
+        else:
+            request = self.service.files().copy(fileId=file_id, body={'name': file_name, 'parents': [folder_id]}, fields='id')
+        return self.execute(request).get('id')
+
+    def is_current(self, existing, file_id, checksum):
+        """
+        Whether a file already in a folder matches what would be uploaded or linked there.
+        """
+        if existing is None:
+            return False
+        if 'shortcutDetails' in existing:
+            return self.link_mode == 'shortcut' and existing['shortcutDetails'].get('targetId') == file_id
+        return existing.get('md5Checksum') == checksum
+
+    def upload_to_folders(self, file_name, folder_ids, folder_contents):
+        """
+        Uploads a file to the first folder, then copies or links it into the others.
+        Files whose content is already on Drive are skipped, changed ones are replaced.
+        Returns the Drive file ID in each folder.
+        """
+        checksum = self.file_md5(file_name)
+
+        existing = folder_contents[0].get(file_name)
+        if existing is not None and 'shortcutDetails' in existing:
+            # A shortcut has no content to update, so the file is uploaded in its place
+            self.execute(self.service.files().delete(fileId=existing['id']))
+            existing = None
+        if self.is_current(existing, None, checksum):
+            file_id = existing['id']
+            logger.info(f"Skipped {file_name}: unchanged in folder ID: {folder_ids[0]}.")
+        else:
+            with metrics.timer('upload'):
+                file_id = self.upload_file(file_name, folder_ids[0], existing_id=existing and existing['id'])
+            metrics.increment('files_uploaded')
+            logger.info(f"Uploaded {file_name} to Google Drive in folder ID: {folder_ids[0]}.")
+        file_ids = [file_id]
+
+        for folder_id, contents in zip(folder_ids[1:], folder_contents[1:]):
+            existing = contents.get(file_name)
+            if self.is_current(existing, file_id, checksum):
+                file_ids.append(existing['id'])
+                logger.info(f"Skipped {file_name}: unchanged in folder ID: {folder_id}.")
+                continue
+            if existing is not None:
+                # Copies and shortcuts cannot be re-pointed, so the stale one is replaced
+                self.execute(self.service.files().delete(fileId=existing['id']))
+            with metrics.timer('upload_link'):
+                file_ids.append(self.link_file(file_id, file_name, folder_id))
+            logger.info(f"Added {file_name} to Google Drive in folder ID: {folder_id}.")
+        return file_ids
+
+    def upload_files(self, files, folder_name, parent_folder_ids=None):
+        """
+        Uploads files concurrently into a folder named folder_name under each parent.
+        Safe to re-run: existing folders are reused and unchanged files are skipped.
+        Returns {file_name: [file ID per parent]} for the files that succeeded.
+        """
+        self.ensure_authenticated()
+        parent_folder_ids = parent_folder_ids or self.PARENT_FOLDER_IDS
+
+        folder_ids = []
+        folder_contents = []
+        for parent_folder_id in parent_folder_ids:
+            try:
+                folder_id = self.find_or_create_folder(folder_name, parent_folder_id)
+                folder_contents.append(self.list_folder(folder_id))
+                folder_ids.append(folder_id)
+            except Exception as e:
+                logger.warning(f"Error resolving folder in parent folder ID {parent_folder_id}: {e}")
+                metrics.increment('failures', stage='drive_folder')
+        if not folder_ids:
+            return {}
+
+        uploaded = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.upload_to_folders, file_name, folder_ids, folder_contents): file_name for file_name in files}
+            for future, file_name in futures.items():
+                try:
+                    uploaded[file_name] = future.result()
+                except Exception as e:
+                    logger.error(f"Error uploading {file_name} to Google Drive: {e}")
+                    metrics.increment('failures', stage='upload')
+        return uploaded
 
     def save_files(self, files):
         """
         Uploads a list of files to two predefined parent folders on Google Drive.
         Each file set is saved inside a subfolder named after yesterday's date.
         """
-        parent_folder_ids = [
-            '17WpAimIo-q6xMhlnUfQ_t6NMnAICQrVw',  # Example parent folder 1
-            '1lL8iWCaCSFqHtsPdm35H8MC1WqQMjaPc'   # Example parent folder 2
-        ]
-        
         # Generate folder name as yesterday's date
         yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        # For each parent folder, create a dated folder and upload files
-        for parent_folder_id in parent_folder_ids:
-            folder_id = self.create_folder(yesterday, parent_folder_id)
-            for file_name in files:
-                self.upload_file(file_name, folder_id)
-            print(f"Files uploaded successfully to folder '{yesterday}' in parent folder ID '{parent_folder_id}' on Google Drive.")
+
+        uploaded = self.upload_files(files, yesterday)
+        logger.info(f"{len(uploaded)} of {len(files)} files uploaded successfully to folder '{yesterday}' on Google Drive.")
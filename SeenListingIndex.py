@@ -0,0 +1,58 @@
+# Import required modules
+import hashlib  # For listing IDs and content hashes
+import json  # To serialize the hashed fields deterministically
+import sqlite3  # Local persistent storage for the index
+from datetime import datetime  # To stamp first/last seen dates
+import CardParsing  # Listing IDs shared with the history store
+
+
+# Persistent index of listings captured on previous runs, keyed by section and listing ID
+class SeenListingIndex:
+    # Fields whose change means the listing should be captured again (views change daily, so excluded)
+    HASH_FIELDS = ('title', 'price', 'ads', 'description', 'image_url', 'image', 'pin_status')
+
+    def __init__(self, path='seen_listings.sqlite3'):
+        self.path = path  # SQLite database file
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS listings (
+                section TEXT NOT NULL,
+                listing_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                PRIMARY KEY (section, listing_id)
+            )"""
+        )
+        self.connection.commit()
+
+    # Stable ID for a record: its detail URL when known, otherwise a hash of its identifying fields
+    def listing_id(self, record):
+        return CardParsing.listing_id(record)
+
+    # Hash of the fields that matter for change detection
+    def content_hash(self, record):
+        content = json.dumps({field: record.get(field) for field in self.HASH_FIELDS}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    # Load every known listing of a section as {listing_id: content_hash}
+    def load(self, section):
+        rows = self.connection.execute(
+            'SELECT listing_id, content_hash FROM listings WHERE section = ?', (section,)
+        )
+        return dict(rows.fetchall())
+
+    # Record the given (listing_id, content_hash) pairs as seen today
+    def mark_seen(self, section, entries):
+        today = datetime.now().strftime('%Y-%m-%d')
+        self.connection.executemany(
+            """INSERT INTO listings (section, listing_id, content_hash, first_seen, last_seen)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (section, listing_id)
+               DO UPDATE SET content_hash = excluded.content_hash, last_seen = excluded.last_seen""",
+            [(section, listing_id, content_hash, today, today) for listing_id, content_hash in entries]
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
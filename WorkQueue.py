@@ -0,0 +1,183 @@
+# Import required modules
+import json  # Item payloads and results are stored as JSON
+import logging  # Module logger
+import sqlite3  # Durable queue shared by the coordinator and its workers
+import time  # Lease expiry
+from collections import Counter  # Item counts per status
+from contextlib import contextmanager  # Write transactions
+from dataclasses import dataclass  # Leased items
+
+logger = logging.getLogger(__name__)
+
+
+# One queued unit of work handed to a worker
+@dataclass
+class WorkItem:
+    id: int
+    run: str  # Dated folder of the run the item belongs to
+    kind: str  # 'section' (scan a section) or 'detail' (fetch one card's detail page)
+    section: str
+    position: int  # Place of the card in the section output; 0 for section items
+    payload: dict
+    attempts: int
+
+
+# Durable work queue in SQLite: the coordinator queues the sections of a run, workers lease items,
+# scrape them and acknowledge them with their results (a property section queues its detail pages).
+# Leases expire, so the items of a crashed worker go back to the others. Workers on several hosts
+# need the database on a filesystem with working locks.
+class WorkQueue:
+    LEASE_SECONDS = {'section': 1800, 'detail': 600}  # How long an item stays with a worker before it is handed out again
+
+    def __init__(self, path='work_queue.sqlite3', max_attempts=3):
+        self.path = path  # SQLite database file
+        self.max_attempts = max_attempts  # Leases an item gets before it is marked failed
+        # Autocommit mode; writes that must be atomic use explicit BEGIN IMMEDIATE transactions
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                section TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                UNIQUE (run, kind, section, position)
+            )"""
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS items_status ON items (status, kind)')
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def transaction(self):
+        self.connection.execute('BEGIN IMMEDIATE')  # Take the write lock up front so two leases never race
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    # Queue items as (run, kind, section, position, payload); items already queued are left as they are
+    def put(self, items, connection=None):
+        (connection or self.connection).executemany(
+            'INSERT OR IGNORE INTO items (run, kind, section, position, payload) VALUES (?, ?, ?, ?, ?)',
+            [(run, kind, section, position, json.dumps(payload, ensure_ascii=False))
+             for run, kind, section, position, payload in items]
+        )
+
+    def lease(self, owner, limit=1):
+        """
+        Leases the next items to `owner`: one section item, or up to `limit`
+        detail items of the same section. Section items go first because they
+        produce the detail items. Returns [] when nothing is available.
+        """
+        now = time.time()
+        with self.transaction() as connection:
+            # Items whose lease ran out after their last attempt are given up on
+            connection.execute(
+                "UPDATE items SET status = 'failed', error = 'lease expired' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            available = "(status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+            first = connection.execute(
+                f"SELECT kind, run, section FROM items WHERE {available} "
+                "ORDER BY CASE kind WHEN 'section' THEN 0 ELSE 1 END, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if first is None:
+                return []
+            kind, run, section = first
+            rows = connection.execute(
+                f"SELECT id, run, kind, section, position, payload, attempts FROM items "
+                f"WHERE {available} AND kind = ? AND run = ? AND section = ? ORDER BY position LIMIT ?",
+                (now, kind, run, section, 1 if kind == 'section' else limit)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE items SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                [(owner, now + self.LEASE_SECONDS[kind], row[0]) for row in rows]
+            )
+        return [
+            WorkItem(id=row[0], run=row[1], kind=row[2], section=row[3], position=row[4],
+                     payload=json.loads(row[5]), attempts=row[6] + 1)
+            for row in rows
+        ]
+
+    def ack(self, owner, results, follow_up=()):
+        """
+        Marks leased items done with their results ([(item, result)]) and
+        queues the follow-up items in the same transaction. Items whose lease
+        was meanwhile handed to another worker are left to that worker.
+        """
+        with self.transaction() as connection:
+            acknowledged = 0
+            for item, result in results:
+                cursor = connection.execute(
+                    "UPDATE items SET status = 'done', result = ?, error = NULL "
+                    "WHERE id = ? AND owner = ? AND status = 'leased'",
+                    (json.dumps(result, ensure_ascii=False), item.id, owner)
+                )
+                acknowledged += cursor.rowcount
+            if acknowledged:
+                self.put(follow_up, connection)
+        return acknowledged
+
+    # Return failed items to the queue, or mark them failed once they used up their attempts
+    def fail(self, owner, items, error):
+        with self.transaction() as connection:
+            connection.executemany(
+                "UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "owner = NULL, lease_expires = NULL, error = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                [(self.max_attempts, str(error), item.id, owner) for item in items]
+            )
+
+    # {status: count} of a run's items, or of every run
+    def progress(self, run=None):
+        if run is None:
+            rows = self.connection.execute('SELECT status, COUNT(*) FROM items GROUP BY status')
+        else:
+            rows = self.connection.execute('SELECT status, COUNT(*) FROM items WHERE run = ? GROUP BY status', (run,))
+        return Counter(dict(rows.fetchall()))
+
+    # True once nothing of the run (or of any run) is waiting or being worked on
+    def drained(self, run=None):
+        progress = self.progress(run)
+        return not progress['pending'] and not progress['leased']
+
+    # Sections of a run whose scan failed for good, with the last error
+    def failed_sections(self, run):
+        rows = self.connection.execute(
+            "SELECT section, error FROM items WHERE run = ? AND kind = 'section' AND status = 'failed'", (run,)
+        )
+        return rows.fetchall()
+
+    def section_cards(self, run, section):
+        """
+        The card dicts of a section in output order: those resolved while
+        scanning plus one per detail item. Detail items that failed for good
+        keep the card's listing fields and link, without phone and views.
+        """
+        cards = []
+        rows = self.connection.execute(
+            "SELECT kind, position, payload, status, result FROM items WHERE run = ? AND section = ?", (run, section)
+        )
+        for kind, position, payload, status, result in rows:
+            if kind == 'section':
+                if status == 'done':
+                    cards.extend((card_position, card) for card_position, card in json.loads(result))
+            elif status == 'done':
+                cards.append((position, json.loads(result)))
+            elif status == 'failed':
+                payload = json.loads(payload)
+                cards.append((position, dict(payload['card'], link=payload['record']['detail_url'])))
+        cards.sort(key=lambda entry: entry[0])
+        return [card for _, card in cards]
@@ -0,0 +1,67 @@
+# Benchmark: bytes downloaded and wall time per section, default browser vs BrowserProfile.
+# Usage: python benchmarks/browser_profile.py [--scrolls 5] [--sections sale rent]
+import argparse  # Command-line options
+import asyncio  # For asynchronous programming
+import os  # To locate the repository root
+import sys  # To import the scraper modules from the repository root
+import time  # Wall-clock timing
+from playwright.async_api import async_playwright  # Asynchronous browser automation using Playwright
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BrowserProfile import BrowserProfile  # noqa: E402
+from main import Main  # noqa: E402
+
+
+# Load one section, scroll it a few times and report bytes, requests and wall time
+async def measure_section(p, url, profile, scrolls):
+    launch_options = profile.launch_options() if profile else {'headless': True}
+    browser = await p.chromium.launch(**launch_options)
+    context = await browser.new_context()
+    if profile:
+        await profile.apply(context)
+    page = await context.new_page()
+
+    transferred = {'bytes': 0, 'requests': 0}
+    pending = []
+
+    async def record(request):
+        try:
+            sizes = await request.sizes()
+            transferred['bytes'] += sizes['responseBodySize'] + sizes['responseHeadersSize']
+        except Exception:
+            pass
+        transferred['requests'] += 1
+
+    page.on('requestfinished', lambda request: pending.append(asyncio.ensure_future(record(request))))
+
+    start = time.perf_counter()
+    try:
+        await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+        await page.wait_for_selector('div.max-w-2xl.mx-auto, .relative.min-h-48', timeout=60000)
+        for _ in range(scrolls):
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            await page.wait_for_load_state('networkidle', timeout=15000)
+    finally:
+        elapsed = time.perf_counter() - start
+        await asyncio.gather(*pending, return_exceptions=True)
+        await browser.close()
+    return elapsed, transferred['bytes'], transferred['requests']
+
+
+async def run(sections, scrolls):
+    async with async_playwright() as p:
+        print(f"{'section':<10} {'mode':<8} {'time (s)':>9} {'MB':>8} {'requests':>9} {'blocked':>8}")
+        for section in sections:
+            url = Main.SECTIONS[section]
+            for mode, profile in (('default', None), ('profile', BrowserProfile())):
+                elapsed, size, requests = await measure_section(p, url, profile, scrolls)
+                blocked = profile.blocked_requests if profile else 0
+                print(f"{section:<10} {mode:<8} {elapsed:>9.2f} {size / 1e6:>8.2f} {requests:>9} {blocked:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the default browser with BrowserProfile per section.')
+    parser.add_argument('--scrolls', type=int, default=5, help='Scrolls per section after the first load')
+    parser.add_argument('--sections', nargs='+', default=list(Main.SECTIONS), choices=list(Main.SECTIONS))
+    args = parser.parse_args()
+    asyncio.run(run(args.sections, args.scrolls))
@@ -0,0 +1,194 @@
+# Local HTTP server replaying boshamlan search, offices and detail pages from the templates in fixtures/.
+# Listings are generated deterministically, so every run sees the same cards.
+import os  # To locate the fixture templates
+import threading  # The server runs in a background thread
+from collections import Counter  # Requests served per kind
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Minimal threaded HTTP server
+from string import Template  # $-placeholders leave the page's JavaScript braces alone
+from urllib.parse import urlparse, parse_qs  # Paging parameters of the scroll requests
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+AREAS = ['السالمية', 'حولي', 'الجابرية', 'مشرف', 'صباح السالم', 'الفنطاس', 'المنقف', 'الرميثية']
+KINDS = ['شقة', 'بيت', 'أرض', 'عمارة', 'دور']
+
+
+def load_template(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return Template(f.read())
+
+
+# The cards of one property section, laid out the way the scraper's stop logic expects:
+# recent pinned cards, 3 old pinned ones, recent regular cards, then 3 old regular ones.
+class PropertySection:
+    PINNED_RECENT = 5
+    OLD_RUN = 3
+
+    def __init__(self, section_type, cards):
+        self.section_type = section_type
+        self.cards = max(cards, self.PINNED_RECENT + 2 * self.OLD_RUN + 1)
+
+    def listing_id(self, index):
+        return self.section_type * 1000000 + index
+
+    def card(self, index):
+        pinned_end = self.PINNED_RECENT + self.OLD_RUN
+        is_pinned = index < pinned_end
+        is_old = self.PINNED_RECENT <= index < pinned_end or index >= self.cards - self.OLD_RUN
+        area, kind = AREAS[index % len(AREAS)], KINDS[index % len(KINDS)]
+        return {
+            'listing_id': self.listing_id(index),
+            'pin_tag': '<div class="bg-stickyTag">مميز</div>' if is_pinned else '',
+            'title': f"{kind} في {area} رقم {index + 1}",
+            'description': f"{kind} في {area} مساحة {200 + index % 800} م² قريب من الخدمات",
+            'price': f"{(50 + index % 850) * 1000:,} د.ك",
+            'relative_date': '2024-01-01' if is_old else f"منذ {1 + index % 23} ساعة",
+            'views': str(index * 7 % 5000),
+            'mobile': str(50000000 + index),
+        }
+
+    def find(self, listing_id):
+        index = listing_id - self.section_type * 1000000
+        return self.card(index) if 0 <= index < self.cards else None
+
+
+# Office listings: all rendered on one page, each linking to /offices/<mobile>
+class OfficesSection:
+    def __init__(self, cards):
+        self.cards = cards
+
+    def card(self, index):
+        area = AREAS[index % len(AREAS)]
+        return {
+            'office_id': index,
+            'title': f"مكتب {area} العقاري {index + 1}",
+            'description': f"بيع وشراء وتأجير العقارات في {area}",
+            'ads': str(index % 120),
+            'mobile': str(60000000 + index),
+        }
+
+
+class FixtureServer:
+    PAGE_SIZE = 20  # Cards per initial render and per scroll request
+
+    def __init__(self, cards=200, office_cards=60, host='127.0.0.1', port=0):
+        self.sections = {section_type: PropertySection(section_type, cards) for section_type in (1, 2, 3)}
+        self.offices = OfficesSection(office_cards)
+        self.templates = {name: load_template(f"{name}.html") for name in ('search', 'card', 'detail', 'offices', 'office_card')}
+        self.requests = Counter()  # {'search': n, 'fragment': n, 'detail': n, ...}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # URLs mirroring Main.SECTIONS
+    def section_urls(self):
+        urls = {name: f"{self.base_url}/search?c=1&t={t}" for name, t in (('sale', 1), ('rent', 2), ('exchange', 3))}
+        urls['offices'] = f"{self.base_url}/offices"
+        return urls
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, kind):
+        with self.lock:
+            self.requests[kind] += 1
+
+    def render_cards(self, section, start, stop):
+        return '\n'.join(self.templates['card'].substitute(section.card(i)) for i in range(start, min(stop, section.cards)))
+
+    def search_page(self, query):
+        section = self.sections.get(int(query.get('t', ['1'])[0]))
+        if section is None:
+            return None
+        return self.templates['search'].substitute(
+            cards=self.render_cards(section, 0, self.PAGE_SIZE),
+            loaded=self.PAGE_SIZE,
+            page_size=self.PAGE_SIZE,
+            query=f"?t={section.section_type}"
+        )
+
+    def fragment(self, query):
+        section = self.sections.get(int(query.get('t', ['1'])[0]))
+        if section is None:
+            return None
+        offset = int(query.get('offset', ['0'])[0])
+        return self.render_cards(section, offset, offset + self.PAGE_SIZE)
+
+    def detail_page(self, listing_id):
+        section = self.sections.get(listing_id // 1000000)
+        card = section.find(listing_id) if section else None
+        return self.templates['detail'].substitute(card) if card else None
+
+    def offices_page(self):
+        cards = '\n'.join(self.templates['office_card'].substitute(self.offices.card(i)) for i in range(self.offices.cards))
+        return self.templates['offices'].substitute(cards=cards)
+
+    # Route a request path to (kind, body); body is None for a 404
+    def route(self, path):
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+        if url.path == '/search':
+            return 'search', self.search_page(query)
+        if url.path == '/fragment':
+            return 'fragment', self.fragment(query)
+        if url.path == '/offices':
+            return 'offices', self.offices_page()
+        if len(parts) == 2 and parts[0] == 'ad' and parts[1].isdigit():
+            return 'detail', self.detail_page(int(parts[1]))
+        if parts and parts[0] == 'images':
+            return 'image', None
+        return 'other', None
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                kind, body = server.route(self.path)
+                server.count(kind)
+                if body is None:
+                    self.send_error(404)
+                    return
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse  # Command-line options when serving the fixtures by hand
+    parser = argparse.ArgumentParser(description='Serve the boshamlan fixtures locally.')
+    parser.add_argument('--cards', type=int, default=200, help='Cards per property section')
+    parser.add_argument('--office-cards', type=int, default=60, help='Cards on the offices page')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    server = FixtureServer(cards=args.cards, office_cards=args.office_cards, port=args.port)
+    for name, url in server.section_urls().items():
+        print(f"{name:<10} {url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,54 @@
+# Benchmark: parse-and-extract time of each offices page parser backend on one large page.
+# Usage: python benchmarks/office_parsers.py [--page saved_offices.html] [--office-cards 2000] [--repeat 5]
+# Without --page the offices page of the fixture server is rendered with --office-cards cards.
+import argparse  # Command-line options
+import os  # To locate the repository root
+import statistics  # Median over the repeats
+import sys  # To import the parser module from the repository root
+import time  # Wall-clock timing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OfficeParsers import PARSERS  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+
+# Everything OfficeCardScraper reads from the page before resolving links by clicking
+def parse_and_extract(parser, html):
+    cards = parser.cards(html) or []
+    return [dict(parser.extract_card_data(card), link=parser.extract_link(card)) for card in cards]
+
+
+def run(args):
+    if args.page:
+        with open(args.page, encoding='utf-8') as f:
+            html = f.read()
+    else:
+        html = FixtureServer(office_cards=args.office_cards).offices_page()
+    print(f"Page: {len(html) / 1024:.0f} KiB")
+
+    print(f"{'parser':<11} {'cards':>6} {'best (ms)':>10} {'median (ms)':>12} {'cards/ms':>9} {'same as bs4':>12}")
+    reference = None
+    for name in args.parsers:
+        parser = PARSERS[name]()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            records = parse_and_extract(parser, html)
+            timings.append(time.perf_counter() - start)
+        if name == 'bs4':
+            reference = records
+        best = min(timings) * 1000
+        same = '-' if reference is None else ('yes' if records == reference else 'NO')
+        print(
+            f"{name:<11} {len(records):>6} {best:>10.1f} {statistics.median(timings) * 1000:>12.1f} "
+            f"{len(records) / best if best else 0.0:>9.1f} {same:>12}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the offices page parser backends.')
+    parser.add_argument('--page', help='Saved offices page (HTML); defaults to a rendered fixture page')
+    parser.add_argument('--office-cards', type=int, default=2000, help='Cards on the rendered fixture page')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per backend')
+    parser.add_argument('--parsers', nargs='+', default=list(PARSERS), choices=list(PARSERS))
+    run(parser.parse_args())
@@ -0,0 +1,141 @@
+# Benchmark: cards/sec, peak RSS, HTTP hits and Playwright calls of both scrapers against the local fixture server.
+# Usage: python benchmarks/offline.py [--cards 200] [--office-cards 60] [--scenarios property offices]
+#        [--detail-pool-size 4] [--http-details]
+# Each scenario runs in its own process so peak RSS is not carried over between them.
+# The fixture pages are synthetic: hand-built from the selectors the scrapers use, with generated
+# listings, not recorded from the live site, so the numbers compare code paths rather than predict
+# timings against boshamlan.com. Needs a Playwright browser (python -m playwright install chromium).
+import argparse  # Command-line options
+import asyncio  # For asynchronous programming
+import functools  # To wrap the Playwright methods that are counted
+import inspect  # To find the Playwright methods that talk to the browser
+import json  # Results are passed from the scenario process as JSON
+import os  # To locate the repository root
+import resource  # Peak RSS of this process and its (browser) children
+import subprocess  # One process per scenario
+import sys  # To import the scraper modules from the repository root
+import time  # Wall-clock timing
+from collections import Counter  # Playwright calls per method
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fixture_server import FixtureServer  # noqa: E402
+
+SCENARIOS = ('property', 'offices')
+
+
+def count_browser_calls():
+    """
+    Counts the Playwright calls that make a round trip to the browser: every
+    coroutine method of the page-level API classes is wrapped in place for
+    the rest of this (scenario) process. Returns {"Class.method": calls}.
+    HTTP hits on the fixture server are counted separately, by the server.
+    """
+    from playwright.async_api import BrowserContext, ElementHandle, Frame, JSHandle, Keyboard, Locator, Mouse, Page
+
+    calls = Counter()
+
+    def counted(name, method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            calls[f"{type(self).__name__}.{name}"] += 1
+            return await method(self, *args, **kwargs)
+        return wrapper
+
+    for cls in (Page, Frame, JSHandle, ElementHandle, Locator, Mouse, Keyboard, BrowserContext):
+        # Only methods defined on the class itself, so inherited ones (ElementHandle from JSHandle) are wrapped once
+        for name, method in list(vars(cls).items()):
+            if not name.startswith('_') and inspect.iscoroutinefunction(method):
+                setattr(cls, name, counted(name, method))
+    return calls
+
+
+# Scrape one section from the fixture server and return the measurements
+async def measure(scenario, server, detail_pool_size, http_details):
+    from OfficeCardScraper import OfficeCardScraper
+    from PropertyCardScraper import PropertyCardScraper
+
+    browser_calls = count_browser_calls()
+    urls = server.section_urls()
+    if scenario == 'offices':
+        scraper = OfficeCardScraper(urls['offices'])
+    else:
+        scraper = PropertyCardScraper(urls['sale'], detail_pool_size=detail_pool_size, http_details=http_details)
+
+    start = time.perf_counter()
+    cards = await scraper.scrape_cards()
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux; children only count once they have exited (the browser has by now)
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        'scenario': scenario,
+        'cards': len(cards),
+        'seconds': elapsed,
+        'cards_per_second': len(cards) / elapsed if elapsed else 0.0,
+        'peak_rss_mb': self_rss,
+        'peak_child_rss_mb': child_rss,
+        'round_trips': dict(server.requests),
+        'browser_calls': dict(browser_calls),
+    }
+
+
+def run_scenario(args):
+    with FixtureServer(cards=args.cards, office_cards=args.office_cards) as server:
+        result = asyncio.run(measure(args.scenario, server, args.detail_pool_size, args.http_details))
+    print(json.dumps(result))
+
+
+# The exception line of a scenario's traceback: the first line after its last (indented) frame
+def failure_reason(stderr):
+    lines = stderr.strip().splitlines()
+    frames = [position for position, line in enumerate(lines) if line.startswith('  ')]
+    rest = lines[frames[-1] + 1:] if frames else lines
+    return rest[0] if rest else None
+
+
+def run_all(args):
+    print(
+        f"{'scenario':<10} {'cards':>6} {'time (s)':>9} {'cards/s':>8} {'RSS MB':>7} {'browser MB':>11} "
+        f"{'HTTP hits':>10} {'browser calls':>14}"
+    )
+    for scenario in args.scenarios:
+        command = [
+            sys.executable, os.path.abspath(__file__), '--scenario', scenario,
+            '--cards', str(args.cards), '--office-cards', str(args.office_cards),
+            '--detail-pool-size', str(args.detail_pool_size)
+        ]
+        if args.http_details:
+            command.append('--http-details')
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            # Show why the scenario failed (e.g. no browser installed) instead of a bare CalledProcessError
+            print(f"{scenario:<10} failed: {failure_reason(completed.stderr) or f'exit status {completed.returncode}'}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        round_trips = result['round_trips']
+        browser_calls = result['browser_calls']
+        print(
+            f"{scenario:<10} {result['cards']:>6} {result['seconds']:>9.2f} {result['cards_per_second']:>8.1f} "
+            f"{result['peak_rss_mb']:>7.0f} {result['peak_child_rss_mb']:>11.0f} {sum(round_trips.values()):>10} "
+            f"{sum(browser_calls.values()):>14}"
+        )
+        print(f"{'':<10} HTTP: {', '.join(f'{kind}={count}' for kind, count in sorted(round_trips.items()))}")
+        # The most frequent Playwright calls show where the per-card IPC goes
+        busiest = sorted(browser_calls.items(), key=lambda entry: -entry[1])[:8]
+        print(f"{'':<10} Playwright: {', '.join(f'{name}={count}' for name, count in busiest)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the scrapers against the local fixture server.')
+    parser.add_argument('--cards', type=int, default=200, help='Cards per property section')
+    parser.add_argument('--office-cards', type=int, default=60, help='Cards on the offices page')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument('--detail-pool-size', type=int, default=4, help='Worker pages for property detail pages')
+    parser.add_argument('--http-details', action='store_true', help='Fetch property detail pages over plain HTTP first')
+    parser.add_argument('--scenario', choices=SCENARIOS, help=argparse.SUPPRESS)  # Internal: run one scenario
+    args = parser.parse_args()
+    if args.scenario:
+        run_scenario(args)
+    else:
+        run_all(args)
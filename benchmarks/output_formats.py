@@ -0,0 +1,65 @@
+# Benchmark: write time and file size per output format on synthetic property records.
+# Usage: python benchmarks/output_formats.py [--rows 50000] [--formats xlsx parquet]
+import argparse  # Command-line options
+import asyncio  # The writers consume async record streams
+import os  # File sizes and the repository root
+import random  # Synthetic field values
+import sys  # To import the writer modules from the repository root
+import tempfile  # Scratch folder for the output files
+import time  # Wall-clock timing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from CardRecords import PropertyCard  # noqa: E402
+from RecordWriters import WRITERS  # noqa: E402
+
+
+# Property records shaped like the real scraper output, with Arabic text
+def synthetic_cards(rows, seed=0):
+    rng = random.Random(seed)
+    areas = ['السالمية', 'حولي', 'الجابرية', 'مشرف', 'صباح السالم', 'الفنطاس', 'المنقف']
+    kinds = ['شقة', 'بيت', 'أرض', 'عمارة', 'دور']
+    cards = []
+    for i in range(rows):
+        area, kind = rng.choice(areas), rng.choice(kinds)
+        cards.append(PropertyCard(
+            title=f"{kind} للبيع في {area}",
+            price=f"{rng.randrange(50, 900) * 1000:,} د.ك",
+            relative_date=f"{rng.randrange(1, 24)} ساعة",
+            description=f"{kind} في {area} مساحة {rng.randrange(200, 1000)} م² " * rng.randrange(1, 4),
+            image_url=f"https://images.boshamlan.com/{i}.jpg",
+            link=f"https://www.boshamlan.com/ad/{100000 + i}",
+            mobile_number=f"965{rng.randrange(50000000, 99999999)}",
+            views_number=str(rng.randrange(0, 5000)),
+            pin_status=rng.choice(['Pinned', 'Not pinned'])
+        ))
+    return cards
+
+
+async def stream(cards):
+    for card in cards:
+        yield card
+
+
+async def measure(output_format, folder, cards):
+    writer = WRITERS[output_format](folder, f"bench-{output_format}")
+    start = time.perf_counter()
+    await writer.consume(stream(cards))
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(os.path.getsize(path) for path in writer.paths())
+
+
+async def run(rows, formats):
+    cards = synthetic_cards(rows)
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'format':<12} {'rows':>8} {'time (s)':>9} {'MB':>8} {'rows/s':>10}")
+        for output_format in formats:
+            elapsed, size = await measure(output_format, folder, cards)
+            print(f"{output_format:<12} {rows:>8} {elapsed:>9.2f} {size / 1e6:>8.2f} {rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare write time and file size of the output formats.')
+    parser.add_argument('--rows', type=int, default=50000, help='Synthetic records per format')
+    parser.add_argument('--formats', nargs='+', default=list(WRITERS), choices=list(WRITERS))
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.formats))
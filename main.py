@@ -1,154 +1,767 @@
+import argparse
 import asyncio
 import json
+import logging
 import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
 from datetime import datetime, timedelta
-import pandas as pd
-from OfficeCardScraper import OfficeCardScraper  # Scraper for office listings
-from PropertyCardScraper import PropertyCardScraper  # Scraper for property listings
-from SavingOnDrive import SavingOnDrive  # Google Drive upload handler
+from CrawlJournal import CrawlJournal, unfinished_runs  # Per-section checkpoints for --resume
+from OfficeParsers import PARSERS  # HTML parser backends of the offices page
+from SeenListingIndex import SeenListingIndex  # Persistent index for incremental crawls
+from BrowserProfile import BrowserProfile  # Lightweight launch args and request blocking
+from WorkQueue import WorkQueue  # Durable queue of coordinator/worker runs
+from RecordWriters import MultiWriter, WRITERS  # Streams scraped records into the section's output files
+from Metrics import metrics  # Run-wide timers and counters
+
+# Playwright, pandas, pyarrow, numpy, BeautifulSoup and the Google client are imported where they
+# are used, so the export and upload commands start in a fraction of a second without a browser.
+
+logger = logging.getLogger(__name__)
 
 
 class Main:
-    def __init__(self, credentials_dict):
-        """Initialize with Google Drive credentials."""
+    # URLs to scrape for each section
+    SECTIONS = {
+        'sale': 'https://www.boshamlan.com/search?c=1&t=1',
+        'rent': 'https://www.boshamlan.com/search?c=1&t=2',
+        'exchange': 'https://www.boshamlan.com/search?c=1&t=3',
+        'offices': 'https://www.boshamlan.com/المكاتب'
+    }
+
+    def __init__(self, credentials_dict, max_concurrency=None, detail_pool_size=0, http_details=False,
+                 capture_api=False, seen_index=None, profile=None, output_formats=('xlsx',),
+                 upload_workers=4, pool=None, scheduler=None, resume=False, office_parser='bs4', history=None,
+                 dedup=None, skip_repost_details=False, sections=None, date=None):
+        """
+        Initialize with Google Drive credentials (None skips the upload).
+        When max_concurrency is set, sections are scraped in parallel with at
+        most that many sections running at a time.
+        detail_pool_size is the number of worker pages each property section
+        uses to fetch detail pages (0 keeps the click-through crawl), and
+        http_details tries plain HTTP for those pages before the browser.
+        capture_api builds records from the site's listing API responses,
+        falling back to the rendered cards when none are seen.
+        seen_index (a SeenListingIndex) makes the run incremental: listings
+        captured before with unchanged content are left out of the output
+        files (and, without a history store, not fetched at all).
+        profile (a BrowserProfile) sets the launch args and the request
+        blocking applied to every browser and context of the run.
+        output_formats lists the files written per section (names from
+        RecordWriters.WRITERS: xlsx, xlsx-pandas, parquet, csv, jsonl).
+        upload_workers is the number of files uploaded to Drive at once.
+        pool (a BrowserPool) is kept open across runs when given; otherwise
+        each run starts its own pool, so every section shares warm browsers.
+        scheduler (a RequestScheduler) rate-limits and retries the requests
+        of every section together; a default one is created when omitted.
+        Every section is checkpointed to a journal in the dated folder; with
+        resume, a run continues from those journals instead of starting over.
+        office_parser names the HTML parser backend of the offices page
+        (OfficeParsers.PARSERS: bs4, lxml, selectolax).
+        history (a HistoryStore) also keeps every section's records in a
+        local, queryable per-day history, including the daily views of the
+        unchanged listings the seen index keeps out of the output files.
+        dedup (a DuplicateIndex) flags near-duplicate property listings in
+        the output (duplicate_of); with skip_repost_details, cards it knows as
+        reposts of an earlier listing skip their detail fetch and are saved
+        without phone and views, linked to that listing by duplicate_of.
+        sections limits a run to some of the SECTIONS (default: all of them).
+        date fixes the dated folder of every run (see run_date).
+        """
         self.credentials_dict = credentials_dict
+        self.max_concurrency = max_concurrency
+        self.detail_pool_size = detail_pool_size
+        self.http_details = http_details
+        self.capture_api = capture_api
+        self.seen_index = seen_index
+        self.profile = profile
+        self.output_formats = list(output_formats)
+        self.upload_workers = upload_workers
+        self.pool = pool
+        self.scheduler = scheduler  # Created with the first scraper when omitted
+        self.resume = resume
+        self.date = date
+        self.office_parser = office_parser
+        self.history = history
+        self.dedup = dedup
+        self.skip_repost_details = skip_repost_details
+        unknown = [f for f in self.output_formats if f not in WRITERS]
+        if unknown:
+            raise ValueError(f"Unknown output formats {unknown}; choose from {list(WRITERS)}")
+        extensions = [WRITERS[f].extension for f in self.output_formats]
+        if len(set(extensions)) < len(extensions):
+            # Two writers of one file would overwrite each other and upload the same path twice
+            raise ValueError(f"Output formats {self.output_formats} write the same file type more than once")
+        if office_parser not in PARSERS:
+            raise ValueError(f"Unknown office parser {office_parser!r}; choose from {list(PARSERS)}")
+        unknown = [section for section in sections or () if section not in self.SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown sections {unknown}; choose from {list(self.SECTIONS)}")
+        self.sections = {section: self.SECTIONS[section] for section in sections or self.SECTIONS}
 
         # Set the date for folder naming (yesterday's date)
-        self.yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        self.yesterday = self.run_date()
 
-        # Initialize the Google Drive saving helper
-        self.drive_saver = SavingOnDrive(credentials_dict)
+        # Google Drive saving helper, created on the first upload
+        self.drive_saver = None
 
-        # List to collect file paths of Excel files to be uploaded
-        self.excel_files = []
+        # List to collect file paths of output files to be uploaded
+        self.output_files = []
 
     async def scrape_and_save(self):
         """
-        Coordinates scraping of all sections, saves them to Excel files,
-        and uploads to Google Drive.
-        """
-        print("Starting scraping process...")
-
-        # URLs to scrape for each section
-        sections = {
-            'sale': 'https://www.boshamlan.com/search?c=1&t=1',
-            'rent': 'https://www.boshamlan.com/search?c=1&t=2',
-            'exchange': 'https://www.boshamlan.com/search?c=1&t=3',
-            'offices': 'https://www.boshamlan.com/المكاتب'
-        }
-
-        # Reset list of Excel files to avoid duplicates if reused
-        self.excel_files = []
-
-        # Scrape each property section (sale, rent, exchange)
-        for section, url in sections.items():
-            if section != 'offices':
-                print(f"\nScraping {section} properties...")
-                scraper = PropertyCardScraper(url)
-                data = await scraper.scrape_cards()
-                file_path = self.save_to_excel(data, section)
-                if file_path:
-                    self.excel_files.append(file_path)
-
-        # Scrape the offices section separately using a different scraper
-        print(f"\nScraping offices...")
-        scraper = OfficeCardScraper(sections['offices'])
-        data = await scraper.scrape_cards()
-        file_path = self.save_to_excel(data, 'offices')
-        if file_path:
-            self.excel_files.append(file_path)
-
-        # Upload collected Excel files to Google Drive
+        Coordinates scraping of the run's sections, saves them in the
+        configured output formats, and uploads to Google Drive.
+        """
+        from BrowserPool import BrowserPool  # Warm browsers shared by every section
+        logger.info("Starting scraping process...")
+
+        sections = self.sections
+
+        # Reset list of output files to avoid duplicates if reused, and date this run
+        self.output_files = []
+        self.yesterday = self.run_date()
+
+        pool = self.pool or BrowserPool(profile=self.profile)
+        try:
+            if self.max_concurrency:
+                # Scrape every section in parallel, each in its own context of the pool
+                file_paths = await self.scrape_sections_concurrently(sections, pool)
+            else:
+                # Scrape each section (sale, rent, exchange, offices) one after another
+                file_paths = []
+                for section, url in sections.items():
+                    file_paths.append(await self.scrape_section(section, url, pool))
+        finally:
+            if pool is not self.pool:
+                await pool.close()
+
+        self.output_files = [file_path for section_paths in file_paths for file_path in section_paths]
+
+        # Upload collected output files to Google Drive
         self.upload_to_drive()
 
-        print("Scraping and upload process completed.")
+        logger.info("Scraping and upload process completed.")
+
+    async def run_forever(self, interval_hours, after_run=None):
+        """
+        Daemon mode: runs scrape_and_save every interval_hours with the same
+        browser pool, so Chromium starts once instead of once per run.
+        after_run is called after each run (e.g. to write and reset metrics).
+        """
+        while True:
+            started = time.monotonic()
+            try:
+                await self.scrape_and_save()
+            except Exception as e:
+                logger.error(f"Scheduled run failed: {e}")
+            if after_run is not None:
+                after_run()
+            self.resume = False  # Only the first run picks up an interrupted one
+            delay = max(0.0, interval_hours * 3600 - (time.monotonic() - started))
+            logger.info(f"Next run in {delay / 3600:.2f} hours.")
+            await asyncio.sleep(delay)
 
-    def save_to_excel(self, data, file_name):
+    def run_date(self):
         """
-        Converts JSON data to a DataFrame and saves it as an Excel file.
-        Returns the file path if successful, None otherwise.
+        Folder name for the current run: the given date, else yesterday's
+        date. A resumed run continues the latest run with an unfinished
+        journal started yesterday or today instead, so a crawl interrupted
+        before midnight and resumed after it still finds its checkpoints;
+        older unfinished runs are left alone.
         """
-        if data == "No cards found on this page.":
-            print(f"No data found for {file_name}. Skipping Excel export.")
-            return None
+        if self.date:
+            return self.date
+        yesterday = datetime.now() - timedelta(days=1)
+        if self.resume:
+            recent = {yesterday.strftime('%Y-%m-%d'), (yesterday - timedelta(days=1)).strftime('%Y-%m-%d')}
+            unfinished = [date for date in unfinished_runs() if date in recent]
+            if unfinished:
+                logger.info(f"Resuming the unfinished run of {unfinished[-1]}.")
+                return unfinished[-1]
+        return yesterday.strftime('%Y-%m-%d')
 
+    async def scrape_section(self, section, url, pool):
+        """
+        Scrapes one section with a checkpoint journal and saves its records.
+        Returns the saved file paths.
+        """
+        logger.info(f"Scraping {section}...")
+        journal = CrawlJournal(os.path.join(self.yesterday, '.journal'), section, resume=self.resume)
         try:
-            # Parse JSON string into Python dict/list
-            parsed_data = json.loads(data)
+            scraper = self.create_scraper(section, url, pool=pool, journal=journal)
+            return await self.save_records(scraper.iter_cards(), section, journal=journal)
+        finally:
+            journal.close()
 
-            # Flatten nested fields and create a DataFrame
-            df = pd.json_normalize(parsed_data)
+    def create_scraper(self, section, url, pool=None, journal=None):
+        """
+        Builds the scraper for a section with this run's settings,
+        optionally taking its context from a shared browser pool.
+        """
+        if self.scheduler is None:
+            from RequestScheduler import RequestScheduler  # One rate limit and retry policy for every request
+            self.scheduler = RequestScheduler()
+        if section == 'offices':
+            from OfficeCardScraper import OfficeCardScraper  # Scraper for office listings
+            return OfficeCardScraper(
+                url,
+                pool=pool,
+                capture_api=self.capture_api,
+                seen_index=self.seen_index,
+                profile=self.profile,
+                scheduler=self.scheduler,
+                journal=journal,
+                parser=self.office_parser
+            )
+        from PropertyCardScraper import PropertyCardScraper  # Scraper for property listings
+        return PropertyCardScraper(
+            url,
+            pool=pool,
+            detail_pool_size=self.detail_pool_size,
+            http_details=self.http_details,
+            capture_api=self.capture_api,
+            seen_index=self.seen_index,
+            profile=self.profile,
+            scheduler=self.scheduler,
+            journal=journal,
+            dedup=self.dedup if self.skip_repost_details else None,
+            keep_unchanged=self.history is not None
+        )
 
-            # Create a folder with the name as the date (yesterday)
-            folder_name = self.yesterday
-            os.makedirs(folder_name, exist_ok=True)
+    async def scrape_sections_concurrently(self, sections, pool):
+        """
+        Scrapes all sections in parallel, each in its own context of the
+        browser pool, limited by self.max_concurrency.
+        Returns the saved file paths for each section, in order.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-            # Define full path for the Excel file
-            file_path = os.path.join(folder_name, f"{file_name}.xlsx")
+        async def scrape_section(section, url):
+            async with semaphore:
+                return await self.scrape_section(section, url, pool)
 
-            # Save to Excel
-            df.to_excel(file_path, index=False, engine='openpyxl')
-            print(f"Data for {file_name} saved to {file_path}")
-            return file_path
+        # save_records handles its own errors, so one broken section does not drop the others
+        return await asyncio.gather(*(scrape_section(section, url) for section, url in sections.items()))
 
+    async def save_records(self, records, file_name, journal=None):
+        """
+        Streams records from a scraper into one file per output format in the
+        dated folder, writing them to disk as they arrive.
+        The section's journal, if given, is finished when the section turns
+        out empty and removed when it fails, so neither is resumed later.
+        Returns the paths of the files that were saved (empty if no records).
+        """
+        from CardRecords import NoCardsFound  # Raised for empty sections
+        writer = MultiWriter(self.yesterday, file_name, self.output_formats)
+        if self.dedup is not None and file_name != 'offices':
+            records = self.dedup.flag(records, file_name, self.yesterday)
+        if self.history is not None:
+            history_writer = self.history.writer(self.yesterday, file_name)
+            writer.writers.append(history_writer)
+            records = self.split_unchanged(records, history_writer)
+        try:
+            with metrics.timer('section', section=file_name):
+                count = await writer.consume(records)
+        except NoCardsFound:
+            logger.info(f"No data found for {file_name}. Skipping export.")
+            if journal is not None:
+                journal.finish()
+            return []
         except Exception as e:
-            print(f"Error while saving data to Excel for {file_name}: {e}")
-            return None
+            # Records streamed before the failure are still written by the writers
+            logger.error(f"Error while scraping or saving {file_name}: {e}")
+            metrics.increment('failures', stage='section', section=file_name)
+            if journal is not None:
+                journal.discard()
+            count = writer.count
 
-    def upload_to_drive(self):
+        file_paths = [path for path in writer.paths() if os.path.exists(path)]
+        if not count or not file_paths:
+            logger.info(f"No data found for {file_name}. Skipping export.")
+            return []
+        for path in file_paths:
+            logger.info(f"Data for {file_name} saved to {path}")
+        return file_paths
+
+    # Pass records on to the writers, except unchanged listings: those only go to the history writer
+    async def split_unchanged(self, records, history_writer):
+        from CardRecords import UnchangedPropertyCard  # Listings fetched only for their views
+        async for record in records:
+            if isinstance(record, UnchangedPropertyCard):
+                if history_writer.record_type is None:
+                    history_writer.set_record_type(type(record))
+                history_writer.write(record.to_dict())
+            else:
+                yield record
+
+    async def coordinate(self, queue, workers=0, poll_interval=5.0):
         """
-        Uploads all collected Excel files to two separate parent folders
-        on Google Drive under a dated subfolder (yesterday's date).
+        Coordinator mode: queues every section of this run in the work queue,
+        starts `workers` local worker processes (workers on other hosts may
+        join through the same queue), waits until the queue is drained, then
+        writes each section's merged cards and uploads them like scrape_and_save.
+        Running it again for the same day picks up where the queue left off.
         """
-        if not self.excel_files:
-            print("No Excel files to upload.")
-            return
+        self.output_files = []
+        self.yesterday = self.run_date()
+        run = self.yesterday
+        queue.put([(run, 'section', section, 0, {'url': url}) for section, url in self.sections.items()])
+        logger.info(f"Queued {len(self.sections)} sections for {run} in {queue.path}.")
 
-        # Validate that credentials exist in environment
-        if 'BOSHAMLAN_GCLOUD_KEY_JSON' not in os.environ:
-            raise EnvironmentError("BOSHAMLAN_GCLOUD_KEY_JSON not found.")
+        processes = [
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), 'scrape', '--role', 'worker', '--queue', queue.path]
+            )
+            for _ in range(workers)
+        ]
+        try:
+            while not queue.drained(run):
+                logger.info(f"Queue progress: {dict(queue.progress(run))}")
+                await asyncio.sleep(poll_interval)
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+        for process in processes:
+            await asyncio.to_thread(process.wait)  # Workers exit on their own once the queue stays empty
 
-        # Load credentials again for upload step
-        credentials_json = os.environ['BOSHAMLAN_GCLOUD_KEY_JSON']
-        credentials_dict = json.loads(credentials_json)
+        for section, error in queue.failed_sections(run):
+            logger.error(f"Section {section} failed: {error}")
+            metrics.increment('failures', stage='section', section=section)
 
-        # Authenticate with Google Drive
-        drive_saver = SavingOnDrive(credentials_dict)
-        drive_saver.authenticate()
+        file_paths = []
+        for section in self.sections:
+            cards = queue.section_cards(run, section)
+            file_paths.extend(await self.save_records(self.card_records(section, cards), section))
+        self.output_files = file_paths
+        self.upload_to_drive()
+        logger.info("Coordinated run completed.")
+
+    # Records of a section built from stored card dicts (work queue results or saved files), in order
+    async def card_records(self, section, cards):
+        from CardRecords import OfficeCard, PropertyCard  # Output records
+        record_type = OfficeCard if section == 'offices' else PropertyCard
+        for card_data in cards:
+            yield record_type(**card_data)
 
-        # Target parent folders to upload to
-        parent_folder_ids = [
-            '17WpAimIo-q6xMhlnUfQ_t6NMnAICQrVw',  # First folder
-            '1lL8iWCaCSFqHtsPdm35H8MC1WqQMjaPc'   # Second folder
+    async def work(self, queue, worker_id=None, idle_timeout=30.0, poll_interval=2.0):
+        """
+        Worker mode: leases items from the work queue, scrapes them with this
+        process's browser pool and acknowledges them with their cards, until
+        the queue has been empty for idle_timeout seconds.
+        A property section item scans the listing and queues its detail pages;
+        detail items are leased in batches of DETAIL_BATCH_SIZE.
+        """
+        from BrowserPool import BrowserPool  # Warm browsers shared by every leased item
+        from PropertyCardScraper import PropertyCardScraper  # For the detail batch size
+        owner = worker_id or default_worker_id()
+        pool = self.pool or BrowserPool(profile=self.profile)
+        idle_since = None
+        try:
+            while True:
+                items = queue.lease(owner, limit=PropertyCardScraper.DETAIL_BATCH_SIZE)
+                if not items:
+                    if not queue.drained():
+                        idle_since = None  # Items leased elsewhere may still queue detail pages
+                    elif idle_since is None:
+                        idle_since = time.monotonic()
+                    elif time.monotonic() - idle_since >= idle_timeout:
+                        logger.info(f"Worker {owner}: queue drained, exiting.")
+                        return
+                    await asyncio.sleep(poll_interval)
+                    continue
+
+                idle_since = None
+                try:
+                    with metrics.timer('queue_item', kind=items[0].kind):
+                        results, follow_up = await self.process_items(items, pool)
+                    queue.ack(owner, results, follow_up)
+                    metrics.increment('queue_items_done', len(items), kind=items[0].kind)
+                except Exception as e:
+                    logger.error(f"Worker {owner}: {items[0].kind} item of {items[0].section} failed: {e}")
+                    metrics.increment('failures', stage='queue', kind=items[0].kind)
+                    queue.fail(owner, items, e)
+        finally:
+            if pool is not self.pool:
+                await pool.close()
+
+    async def process_items(self, items, pool):
+        """
+        Scrapes leased items (one section item, or detail items of one section).
+        Returns ([(item, result)], follow-up items to queue).
+        """
+        from CardRecords import NoCardsFound  # Raised for empty sections
+        first = items[0]
+        url = self.SECTIONS[first.section]
+        scraper = self.create_scraper(first.section, url, pool=pool)
+        if first.kind == 'detail':
+            cards = await scraper.scrape_queued_cards([item.payload['record'] for item in items])
+            return list(zip(items, cards)), []
+
+        logger.info(f"Scanning {first.section} for the work queue...")
+        try:
+            if first.section == 'offices':
+                cards = [record.to_dict() async for record in scraper.iter_cards()]
+                return [(first, list(enumerate(cards)))], []
+            resolved, queued = await scraper.scan_for_queue()
+        except NoCardsFound:
+            logger.info(f"No data found for {first.section}.")
+            return [(first, [])], []
+        follow_up = [
+            (first.run, 'detail', first.section, position, {'record': record, 'card': card_data})
+            for position, record, card_data in queued
         ]
+        return [(first, resolved)], follow_up
 
-        # Upload each file to a newly created subfolder in each parent folder
-        for parent_folder_id in parent_folder_ids:
-            try:
-                folder_id = drive_saver.create_folder(self.yesterday, parent_folder_id)
-                print(f"Created folder '{self.yesterday}' with ID: {folder_id} in parent folder ID: {parent_folder_id}")
+    def upload_to_drive(self):
+        """
+        Uploads all collected output files to two separate parent folders
+        on Google Drive under a dated subfolder (yesterday's date),
+        several files at a time.
+        """
+        if not self.output_files:
+            logger.info("No output files to upload.")
+            return
+        if self.credentials_dict is None:
+            logger.info("No Google Drive credentials given; skipping upload.")
+            return
 
-                for file in self.excel_files:
-                    drive_saver.upload_file(file, folder_id)
-                    print(f"Uploaded {file} to Google Drive in folder ID: {folder_id}.")
+        if self.drive_saver is None:
+            from SavingOnDrive import SavingOnDrive  # Google Drive upload handler
+            self.drive_saver = SavingOnDrive(self.credentials_dict, max_workers=self.upload_workers)
 
-            except Exception as e:
-                print(f"Error uploading to parent folder ID {parent_folder_id}: {e}")
+        # The client is reused across runs; each file is uploaded once and copied into the second parent
+        with metrics.timer('upload_total'):
+            uploaded = self.drive_saver.upload_files(self.output_files, self.yesterday)
+
+        # Once every file is on Drive the run is complete, and its checkpoints are no longer needed
+        if len(uploaded) == len(self.output_files):
+            shutil.rmtree(os.path.join(self.yesterday, '.journal'), ignore_errors=True)
+
+    async def export(self, date):
+        """
+        Writes the records already saved in a dated folder in this run's
+        output formats, without scraping. Each section is read from its
+        Parquet or JSON Lines output, else from its crawl journal.
+        Returns the paths of the written files.
+        """
+        self.yesterday = date
+        self.output_files = []
+        for section in self.sections:
+            # Read in full first: a writer of the same format truncates its source file when it opens
+            cards = self.stored_cards(date, section)
+            if not cards:
                 continue
+            self.output_files.extend(await self.save_records(self.card_records(section, cards), section))
+        return self.output_files
 
+    # Card dicts of a section saved in a dated folder; [] when nothing was saved
+    def stored_cards(self, date, section):
+        parquet_path = os.path.join(date, f"{section}.parquet")
+        if os.path.exists(parquet_path):
+            import pyarrow.parquet as pq  # Parquet output of the section
+            return pq.read_table(parquet_path).to_pylist()
+        jsonl_path = os.path.join(date, f"{section}.jsonl")
+        if os.path.exists(jsonl_path):
+            with open(jsonl_path, encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        journal_folder = os.path.join(date, '.journal')
+        if os.path.exists(os.path.join(journal_folder, f"{section}.journal.jsonl")):
+            journal = CrawlJournal(journal_folder, section, resume=True)
+            journal.close()
+            return journal.cards()
+        logger.info(f"No saved records of {section} in {date}.")
+        return []
 
-# Entry point when the script is run directly
-if __name__ == "__main__":
+    def upload_folder(self, date):
+        """
+        Uploads the output files already saved in a dated folder (every
+        output format found there) to Google Drive, as that day's run would.
+        """
+        if not os.path.isdir(date):
+            raise FileNotFoundError(f"No output folder {date}")
+        extensions = {f".{writer.extension}" for writer in WRITERS.values()}
+        self.yesterday = date
+        # Journals and spool files are hidden, so only the output files themselves are picked up
+        self.output_files = sorted(
+            os.path.join(date, name) for name in os.listdir(date)
+            if not name.startswith('.') and os.path.splitext(name)[1] in extensions
+        )
+        self.upload_to_drive()
+
+
+# Benchmark scripts runnable through the benchmark command (the fixture server is a helper)
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+BENCHMARKS = sorted(
+    os.path.splitext(name)[0] for name in os.listdir(BENCHMARKS_DIR)
+    if name.endswith('.py') and name != 'fixture_server.py'
+) if os.path.isdir(BENCHMARKS_DIR) else []
+
+
+def load_credentials():
+    """
+    Google Drive service account credentials from BOSHAMLAN_GCLOUD_KEY_JSON;
+    exits when they are missing or invalid.
+    """
     try:
-        # Check and load Google Drive credentials from environment
         if 'BOSHAMLAN_GCLOUD_KEY_JSON' not in os.environ:
             raise EnvironmentError("BOSHAMLAN_GCLOUD_KEY_JSON environment variable not set.")
         credentials_json = os.environ['BOSHAMLAN_GCLOUD_KEY_JSON']
-        credentials_dict = json.loads(credentials_json)
+        return json.loads(credentials_json)
     except Exception as e:
-        print(f"Error loading credentials from environment variable: {e}")
-        exit(1)
+        logger.error(f"Error loading credentials from environment variable: {e}")
+        sys.exit(1)
+
+
+# Comma-separated output formats written per section, e.g. "xlsx,parquet"
+def output_formats_setting(value=None):
+    value = value if value is not None else os.environ.get('BOSHAMLAN_OUTPUT_FORMATS', 'xlsx')
+    return [f.strip() for f in value.split(',') if f.strip()]
+
+
+# Files uploaded to Google Drive at the same time
+def upload_workers_setting():
+    return int(os.environ.get('BOSHAMLAN_UPLOAD_WORKERS', '4'))
+
+
+# Owner name of a queue worker process: host and process ID
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# A metrics file of one worker, e.g. metrics.json -> metrics.host-1234.json; the path itself otherwise
+def metrics_path(path, worker_id=None):
+    if worker_id is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{worker_id.replace(':', '-').replace(os.sep, '-')}{extension}"
+
+
+def write_metrics(worker_id=None):
+    # Timers and counters of the run; the Prometheus textfile is only written when a path is set.
+    # Workers write their own files so they do not overwrite the coordinator's or each other's.
+    metrics.write_json(metrics_path(os.environ.get('BOSHAMLAN_METRICS_FILE', 'metrics.json'), worker_id))
+    prometheus_file = os.environ.get('BOSHAMLAN_PROMETHEUS_FILE')
+    if prometheus_file:
+        metrics.write_prometheus(metrics_path(prometheus_file, worker_id))
+
+
+def write_and_reset_metrics():
+    write_metrics()
+    metrics.reset()
+
+
+def scrape_command(args):
+    """
+    Scrapes the chosen sections (all by default), saves them and uploads
+    them, in this process or as the coordinator/worker of a queued run.
+    """
+    from BrowserPool import BrowserPool  # Warm browsers shared by every section (and every run in daemon mode)
+    from RequestScheduler import RequestScheduler  # One rate limit and retry policy for every request to the site
+
+    # Workers only scrape and the coordinator uploads; --no-upload keeps the files local
+    credentials_dict = None if args.role == 'worker' or args.no_upload else load_credentials()
+
+    # The defaults keep the site's load close to a single browser session; raise them to opt in to parallel crawling
+
+    # Number of sections scraped in parallel (0 runs them one after another)
+    max_concurrency = int(os.environ.get('BOSHAMLAN_MAX_CONCURRENCY', '1'))
+
+    # Worker pages per property section for detail pages (0 clicks through cards serially)
+    detail_pool_size = int(os.environ.get('BOSHAMLAN_DETAIL_POOL_SIZE', '1'))
+
+    # Read phone/views from detail pages over plain HTTP first (set to 1 to enable)
+    http_details = os.environ.get('BOSHAMLAN_HTTP_DETAILS', '0') == '1'
+
+    # Read listings from the site's JSON API responses instead of rendered cards (set to 1 to enable)
+    capture_api = os.environ.get('BOSHAMLAN_CAPTURE_API', '0') == '1'
+
+    # Path of the persistent seen-listing index; unset keeps full (non-incremental) crawls
+    seen_index_path = os.environ.get('BOSHAMLAN_SEEN_INDEX')
+    seen_index = SeenListingIndex(seen_index_path) if seen_index_path and args.role == 'standalone' else None
+    if seen_index_path and seen_index is None:
+        logger.warning("The seen-listing index only applies to standalone runs; crawling every listing.")
+
+    # Abort images, fonts, media and trackers in every context (set to 0 to load everything)
+    profile = BrowserProfile(block_resources=os.environ.get('BOSHAMLAN_BLOCK_RESOURCES', '1') != '0')
+
+    # Folder of the local history store (date-partitioned Parquet plus a listing index); unset keeps no history
+    history_dir = os.environ.get('BOSHAMLAN_HISTORY_DIR')
+    history = None
+    if history_dir:
+        from HistoryStore import HistoryStore  # Local Parquet history of every run with a listing-ID index
+        history = HistoryStore(history_dir)
+
+    # SQLite file of the near-duplicate index; unset disables duplicate flagging
+    dedup_path = os.environ.get('BOSHAMLAN_DEDUP_INDEX')
+    dedup = None
+    if dedup_path:
+        from DuplicateIndex import DuplicateIndex  # MinHash/LSH index of near-duplicate listings
+        dedup = DuplicateIndex(dedup_path)
+
+    # Skip the detail fetch of cards the duplicate index recognizes as reposts (set to 1 to enable)
+    skip_repost_details = os.environ.get('BOSHAMLAN_SKIP_REPOST_DETAILS', '0') == '1'
+
+    # HTML parser backend of the offices page: bs4, lxml or selectolax
+    office_parser = os.environ.get('BOSHAMLAN_OFFICE_PARSER', 'bs4')
+
+    # Pages a pooled browser may open before it is replaced, capping memory growth (0 = never)
+    pool = BrowserPool(profile=profile, max_pages=int(os.environ.get('BOSHAMLAN_BROWSER_MAX_PAGES', '500')))
+
+    # Requests per second to the site (halved automatically while errors pile up) and requests in flight
+    scheduler = RequestScheduler(
+        rate=float(os.environ.get('BOSHAMLAN_REQUESTS_PER_SECOND', '10')),
+        burst=20,
+        max_concurrency=int(os.environ.get('BOSHAMLAN_MAX_REQUESTS', '16'))
+    )
+
+    # Hours between runs in daemon mode; unset or 0 runs once and exits
+    daemon_interval = float(os.environ.get('BOSHAMLAN_DAEMON_INTERVAL_HOURS', '0'))
 
     # Initialize and run the main process
-    main = Main(credentials_dict)
-    asyncio.run(main.scrape_and_save())
+    main = Main(
+        credentials_dict,
+        max_concurrency=max_concurrency,
+        detail_pool_size=detail_pool_size,
+        http_details=http_details,
+        capture_api=capture_api,
+        seen_index=seen_index,
+        profile=profile,
+        output_formats=output_formats_setting(),
+        upload_workers=upload_workers_setting(),
+        pool=pool,
+        scheduler=scheduler,
+        resume=args.resume,
+        date=args.date,
+        office_parser=office_parser,
+        history=history,
+        dedup=dedup,
+        skip_repost_details=skip_repost_details,
+        sections=args.sections
+    )
+
+    queue = WorkQueue(args.queue) if args.role != 'standalone' else None
+    worker_id = default_worker_id() if args.role == 'worker' else None
+
+    async def run():
+        async with pool:
+            if args.role == 'coordinator':
+                await main.coordinate(queue, workers=args.workers)
+            elif args.role == 'worker':
+                await main.work(queue, worker_id=worker_id)
+            elif daemon_interval > 0:
+                await main.run_forever(daemon_interval, after_run=write_and_reset_metrics)
+            else:
+                await main.scrape_and_save()
+
+    try:
+        asyncio.run(run())
+    finally:
+        if seen_index is not None:
+            seen_index.close()
+        if queue is not None:
+            queue.close()
+        if history is not None:
+            history.close()
+        if dedup is not None:
+            dedup.close()
+        if daemon_interval <= 0:
+            write_metrics(worker_id)  # Daemon runs write their own metrics after each run
+    return 0
+
+
+def export_command(args):
+    """
+    Rewrites the records saved for a day in other output formats, without a
+    browser or Drive credentials.
+    """
+    main = Main(None, output_formats=output_formats_setting(args.formats), sections=args.sections)
+    file_paths = asyncio.run(main.export(args.date))
+    logger.info(f"Exported {len(file_paths)} files for {args.date}.")
+    return 0 if file_paths else 1
+
+
+def upload_command(args):
+    """
+    Uploads the output files of an existing dated folder to Google Drive.
+    """
+    main = Main(load_credentials(), upload_workers=upload_workers_setting())
+    try:
+        main.upload_folder(args.date)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+def benchmark_command(args):
+    """
+    Runs one of the benchmark scripts in its own process with the remaining arguments.
+    """
+    return subprocess.call([sys.executable, os.path.join(BENCHMARKS_DIR, f"{args.name}.py"), *args.args])
+
+
+def parse_args(argv):
+    """
+    Parses the command line. Without a command (e.g. plain `python main.py`
+    or `python main.py --resume`) the full scrape is run, as before.
+    """
+    parser = argparse.ArgumentParser(description='Scrape boshamlan.com and upload the results to Google Drive.')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    scrape = commands.add_parser('scrape', help='Scrape sections, save them and upload the files (the default)')
+    scrape.add_argument('sections', nargs='*', metavar='section',
+                        help=f"Sections to scrape: {', '.join(Main.SECTIONS)} (default: all)")
+    scrape.add_argument('--resume', action='store_true',
+                        help='Continue from the checkpoints of the latest unfinished run (or of --date)')
+    scrape.add_argument('--date', help="Dated output folder of the run, e.g. 2024-01-31 (default: yesterday)")
+    scrape.add_argument(
+        '--role', choices=('standalone', 'coordinator', 'worker'), default='standalone',
+        help='standalone scrapes in this process; coordinator queues the run for workers and merges their results'
+    )
+    scrape.add_argument('--queue', default=os.environ.get('BOSHAMLAN_QUEUE', 'work_queue.sqlite3'),
+                        help='SQLite work queue shared by the coordinator and its workers')
+    scrape.add_argument('--workers', type=int, default=0, help='Local worker processes started by the coordinator')
+    scrape.add_argument('--no-upload', action='store_true', help='Keep the files local instead of uploading them')
+    scrape.set_defaults(handler=scrape_command)
+
+    export = commands.add_parser('export', help="Write a day's saved records in other output formats")
+    export.add_argument('date', help='Dated output folder, e.g. 2024-01-31')
+    export.add_argument('sections', nargs='*', metavar='section', help='Sections to export (default: all)')
+    export.add_argument('--formats', help='Comma-separated output formats (default: BOSHAMLAN_OUTPUT_FORMATS)')
+    export.set_defaults(handler=export_command)
+
+    upload = commands.add_parser('upload', help='Upload the files of an existing dated folder to Google Drive')
+    upload.add_argument('date', help='Dated output folder, e.g. 2024-01-31')
+    upload.set_defaults(handler=upload_command)
+
+    benchmark = commands.add_parser('benchmark', help='Run a benchmark script')
+    benchmark.add_argument('name', choices=BENCHMARKS)
+    benchmark.add_argument('args', nargs=argparse.REMAINDER, help='Arguments passed on to the benchmark')
+    benchmark.set_defaults(handler=benchmark_command)
+
+    if not argv or (argv[0] not in commands.choices and argv[0] not in ('-h', '--help')):
+        argv = ['scrape', *argv]
+    args = parser.parse_args(argv)
+    # Checked here rather than with choices=, which rejects an empty list of sections
+    unknown = [section for section in getattr(args, 'sections', ()) if section not in Main.SECTIONS]
+    if unknown:
+        parser.error(f"unknown sections {', '.join(unknown)}; choose from {', '.join(Main.SECTIONS)}")
+    return args
+
+
+# Entry point when the script is run directly
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+
+    # DEBUG adds per-card lines; WARNING keeps only problems
+    logging.basicConfig(
+        level=os.environ.get('BOSHAMLAN_LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+
+    sys.exit(args.handler(args))
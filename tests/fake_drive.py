@@ -0,0 +1,192 @@
+# Local HTTP server speaking the small part of the Drive v3 API that SavingOnDrive uses:
+# files.list/get/create/copy/delete and resumable media create/update.
+import hashlib  # md5Checksum of stored content
+import itertools  # File IDs
+import json  # Request and response bodies
+import re  # Parsing the search query
+import threading  # The server runs in a background thread
+from collections import Counter  # Requests served per kind
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Minimal threaded HTTP server
+from urllib.parse import urlparse, parse_qs  # Query parameters
+
+FOLDER = 'application/vnd.google-apps.folder'
+SHORTCUT = 'application/vnd.google-apps.shortcut'
+QUOTED = r"'((?:[^'\\]|\\.)*)'"
+
+
+def unquote(value):
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+class FakeDrive:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.files = {}  # {id: file resource, plus 'content' bytes for uploaded files}
+        self.sessions = {}  # {upload session: (file id or None, metadata, bytes received so far)}
+        self.ids = itertools.count(1)
+        self.requests = Counter()  # {'create': n, 'upload': n, 'update': n, 'copy': n, ...}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add(self, name, parent=None, mime_type=None, content=None, target=None):
+        """
+        Stores a new file and returns its resource (used by the handler and to seed tests).
+        """
+        file = {'id': f"file{next(self.ids)}", 'name': name, 'parents': [parent] if parent else [],
+                'mimeType': mime_type or 'application/octet-stream', 'trashed': False}
+        if target is not None:
+            file['mimeType'] = SHORTCUT
+            file['shortcutDetails'] = {'targetId': target}
+        if content is not None:
+            self.set_content(file, content)
+        self.files[file['id']] = file
+        return file
+
+    def set_content(self, file, content):
+        file['content'] = content
+        file['md5Checksum'] = hashlib.md5(content).hexdigest()
+
+    def children(self, parent):
+        return [file for file in self.files.values() if parent in file['parents'] and not file['trashed']]
+
+    def resource(self, file):
+        return {key: value for key, value in file.items() if key != 'content'}
+
+    # files.list, for the two query shapes SavingOnDrive sends
+    def search(self, query):
+        parent = re.search(QUOTED + r' in parents', query)
+        name = re.search(r'name = ' + QUOTED, query)
+        mime_type = re.search(r'mimeType = ' + QUOTED, query)
+        files = self.children(unquote(parent.group(1))) if parent else list(self.files.values())
+        if name:
+            files = [file for file in files if file['name'] == unquote(name.group(1))]
+        if mime_type:
+            files = [file for file in files if file['mimeType'] == unquote(mime_type.group(1))]
+        return {'files': [self.resource(file) for file in files]}
+
+    def copy(self, file_id, body):
+        source = self.files[file_id]
+        copy = self.add(body.get('name', source['name']), (body.get('parents') or [None])[0], source['mimeType'], source.get('content'))
+        return self.resource(copy)
+
+    # Start a resumable upload; returns the session URL the content is PUT to
+    def start_upload(self, file_id, metadata):
+        session = f"session{next(self.ids)}"
+        self.sessions[session] = (file_id, metadata, b'')
+        return f"{self.base_url}/upload/session/{session}"
+
+    # Store a chunk; returns the finished file, or the number of bytes received so far
+    def upload_chunk(self, session, content_range, data):
+        file_id, metadata, received = self.sessions[session]
+        received += data
+        total = content_range.rsplit('/', 1)[-1]
+        if total == '*' or len(received) < int(total):
+            self.sessions[session] = (file_id, metadata, received)
+            return len(received)
+        del self.sessions[session]
+        if file_id is None:
+            self.requests['upload'] += 1
+            file = self.add(metadata['name'], (metadata.get('parents') or [None])[0], content=received)
+        else:
+            self.requests['update'] += 1
+            file = self.files[file_id]
+            self.set_content(file, received)
+        return self.resource(file)
+
+    def handle(self, method, path, headers, body):
+        """
+        Returns (status, JSON payload or None, extra headers) for one request.
+        """
+        url = urlparse(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        data = json.loads(body) if body and headers.get('Content-Type', '').startswith('application/json') else None
+
+        with self.lock:
+            if parts[:2] == ['upload', 'session']:
+                result = self.upload_chunk(parts[2], headers.get('Content-Range', ''), body)
+                if isinstance(result, int):
+                    return 308, None, {'Range': f"bytes=0-{result - 1}"}
+                return 200, result, {}
+
+            if parts[:3] == ['upload', 'drive', 'v3'] and parts[3] == 'files':
+                file_id = parts[4] if len(parts) > 4 else None
+                if file_id is not None and file_id not in self.files:
+                    return 404, {'error': {'code': 404, 'message': 'File not found'}}, {}
+                if file_id is not None and self.files[file_id]['mimeType'] in (FOLDER, SHORTCUT):
+                    return 400, {'error': {'code': 400, 'message': 'Cannot upload content to this item'}}, {}
+                return 200, None, {'Location': self.start_upload(file_id, data or {})}
+
+            if parts[:3] != ['drive', 'v3', 'files']:
+                return 404, {'error': {'code': 404, 'message': 'Not found'}}, {}
+            file_id = parts[3] if len(parts) > 3 else None
+            if file_id is not None and file_id not in self.files:
+                return 404, {'error': {'code': 404, 'message': 'File not found'}}, {}
+
+            if method == 'GET' and file_id is None:
+                self.requests['list'] += 1
+                return 200, self.search(query.get('q', '')), {}
+            if method == 'GET':
+                self.requests['get'] += 1
+                return 200, self.resource(self.files[file_id]), {}
+            if method == 'POST' and file_id is None:
+                kind = 'create_shortcut' if data.get('mimeType') == SHORTCUT else 'create_folder'
+                self.requests[kind] += 1
+                target = (data.get('shortcutDetails') or {}).get('targetId')
+                file = self.add(data['name'], (data.get('parents') or [None])[0], data.get('mimeType'), target=target)
+                return 200, self.resource(file), {}
+            if method == 'POST' and parts[4:] == ['copy']:
+                self.requests['copy'] += 1
+                return 200, self.copy(file_id, data or {}), {}
+            if method == 'DELETE':
+                self.requests['delete'] += 1
+                del self.files[file_id]
+                return 204, None, {}
+        return 405, {'error': {'code': 405, 'message': 'Method not allowed'}}, {}
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, as httplib2 expects
+
+            def respond(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status, payload, headers = server.handle(self.command, self.path, self.headers, body)
+                data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if payload is not None:
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = respond
+
+            def log_message(self, format, *args):
+                pass  # Keep test output clean
+
+        return Handler
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import CardParsing
+from CardParsing import CardClassifier, normalize_phone, parse_count, parse_date, parse_price
+
+NOW = datetime(2024, 2, 1, 12, 0)
+
+
+@pytest.mark.parametrize('text, ago, unit', [
+    ('منذ ثانية', timedelta(seconds=1), 'second'),
+    ('منذ 30 ثانية', timedelta(seconds=30), 'second'),
+    ('منذ دقيقة', timedelta(minutes=1), 'minute'),
+    ('منذ دقيقتين', timedelta(minutes=2), 'minute'),
+    ('منذ 5 دقائق', timedelta(minutes=5), 'minute'),
+    ('منذ ساعة', timedelta(hours=1), 'hour'),
+    ('منذ ساعتين', timedelta(hours=2), 'hour'),
+    ('منذ 3 ساعات', timedelta(hours=3), 'hour'),
+    ('منذ ٣ ساعات', timedelta(hours=3), 'hour'),
+    ('منذ 3ساعات', timedelta(hours=3), 'hour'),
+    ('منذ يوم', timedelta(days=1), 'day'),
+    ('منذ يومين', timedelta(days=2), 'day'),
+    ('منذ ٤ أيام', timedelta(days=4), 'day'),
+    ('منذ اسبوع', timedelta(weeks=1), 'week'),
+    ('منذ أسبوعين', timedelta(weeks=2), 'week'),
+    ('منذ شهرين', timedelta(days=60), 'month'),
+    ('منذ سنة', timedelta(days=365), 'year'),
+    ('الآن', timedelta(0), 'second'),
+    ('أمس', timedelta(days=1), 'day'),
+])
+def test_parse_relative_dates(text, ago, unit):
+    assert parse_date(text, NOW) == (NOW - ago, unit)
+
+
+def test_parse_today_is_not_a_day_ago():
+    assert parse_date('اليوم', NOW) == (datetime(2024, 2, 1), 'today')
+    assert parse_date('نشر اليوم', NOW) == (datetime(2024, 2, 1), 'today')
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2024-01-15', datetime(2024, 1, 15)),
+    ('٢٠٢٤-٠١-١٥', datetime(2024, 1, 15)),
+    ('نشر 2024-1-5', datetime(2024, 1, 5)),
+])
+def test_parse_absolute_dates(text, expected):
+    assert parse_date(text, NOW) == (expected, 'absolute')
+
+
+@pytest.mark.parametrize('text', [None, '', 'hello', 'الخامس', 'يومية', '2024-13-40'])
+def test_parse_unrecognized_dates(text):
+    assert parse_date(text, NOW) == (None, None)
+
+
+def test_normalize_dates():
+    assert CardParsing.normalize_dates(['منذ ساعة', 'غير معروف'], NOW) == [NOW - timedelta(hours=1), None]
+
+
+@pytest.mark.parametrize('text, is_old', [
+    ('منذ 5 دقائق', False),
+    ('منذ 3 ساعات', False),
+    ('اليوم', False),
+    ('الآن', False),
+    ('منذ يوم', True),
+    ('أمس', True),
+    ('منذ أسبوع', True),
+    ('2024-01-31', False),  # The cutoff is yesterday at midnight
+    ('2024-01-30', True),
+    ('', True),
+    ('غير معروف', True),
+])
+def test_classifier_is_old(text, is_old):
+    record = CardClassifier(NOW).classify({'relative_date': text})
+    assert record['is_old'] is is_old
+
+
+def test_classifier_fields():
+    record = CardClassifier(NOW).classify({'relative_date': ' منذ ساعتين ', 'pin_text': 'إعلان مميز'})
+    assert record['is_pinned'] is True
+    assert record['date_text'] == 'منذ ساعتين'
+    assert record['posted_at'] == '2024-02-01T10:00:00'
+
+    record = CardClassifier(NOW).classify({'relative_date': 'اليوم', 'pin_text': None})
+    assert record['is_pinned'] is False
+    assert record['posted_at'] == '2024-02-01T00:00:00'
+
+    record = CardClassifier(NOW).classify({'relative_date': 'غير معروف'})
+    assert record['posted_at'] is None
+
+
+def test_classifier_cutoff():
+    assert CardClassifier(NOW).cutoff == datetime(2024, 1, 31)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('150,000 د.ك', (150000.0, 'KWD')),
+    ('٢٥٠ د.ك', (250.0, 'KWD')),
+    ('١٬٥٠٠٫٥ دينار', (1500.5, 'KWD')),
+    ('1200', (1200.0, 'KWD')),
+    ('$300', (300.0, 'USD')),
+    (450, (450.0, 'KWD')),
+    ('على السوم', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('50000000', '+96550000000'),
+    ('٥٠٠٠٠٠٠٠', '+96550000000'),
+    ('tel:+965 5000 0000', '+96550000000'),
+    ('0096550000000', '+96550000000'),
+    ('96550000000', '+96550000000'),
+    ('لا يوجد', None),
+    (None, None),
+])
+def test_normalize_phone(value, expected):
+    assert normalize_phone(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1,234', 1234),
+    ('٣٤', 34),
+    ('١٬٢٣٤ مشاهدة', 1234),
+    (17, 17),
+    ('', None),
+    ('لا يوجد', None),
+    (None, None),
+])
+def test_parse_count(value, expected):
+    assert parse_count(value) == expected
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from CardRecords import NoCardsFound
+from CrawlJournal import CrawlJournal, unfinished_runs
+from main import Main
+
+
+def journal(root, date, section, finish):
+    entry = CrawlJournal(os.path.join(root, date, '.journal'), section)
+    entry.save_scan([{'index': 0}])
+    entry.add_cards([('a', {'title': 'x'})])
+    if finish:
+        entry.finish()
+    entry.close()
+    return entry
+
+
+def test_resume_replays_the_journal(tmp_path):
+    journal(str(tmp_path), '2024-01-31', 'rent', finish=False)
+    resumed = CrawlJournal(os.path.join(str(tmp_path), '2024-01-31', '.journal'), 'rent', resume=True)
+    assert resumed.scan == [{'index': 0}]
+    assert resumed.cards() == [{'title': 'x'}]
+    assert resumed.processed('a') and not resumed.done
+    resumed.close()
+
+
+def test_finished(tmp_path):
+    done = journal(str(tmp_path), '2024-01-31', 'sale', finish=True)
+    running = journal(str(tmp_path), '2024-01-31', 'rent', finish=False)
+    assert CrawlJournal.finished(done.path)
+    assert not CrawlJournal.finished(running.path)
+
+
+def test_unfinished_runs(tmp_path):
+    root = str(tmp_path)
+    journal(root, '2024-01-30', 'sale', finish=False)
+    journal(root, '2024-01-31', 'sale', finish=True)
+    journal(root, '2024-01-31', 'rent', finish=False)
+    journal(root, '2024-02-01', 'sale', finish=True)
+    os.makedirs(os.path.join(root, 'history', '.journal'))
+    assert unfinished_runs(root) == ['2024-01-30', '2024-01-31']
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def test_resumed_run_keeps_the_date_of_the_interrupted_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal('.', days_ago(2), 'rent', finish=False)  # Started before midnight yesterday
+    assert Main(None, resume=True).run_date() == days_ago(2)
+    assert Main(None, resume=True, date='2024-01-15').run_date() == '2024-01-15'
+    assert Main(None).run_date() == days_ago(1)  # A fresh run is dated yesterday
+
+
+def test_resume_without_unfinished_runs_uses_yesterday(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal('.', days_ago(1), 'rent', finish=True)
+    assert Main(None, resume=True).run_date() == days_ago(1)
+
+
+def test_resume_ignores_old_unfinished_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal('.', days_ago(3), 'rent', finish=False)
+    journal('.', '2024-01-31', 'sale', finish=False)
+    assert Main(None, resume=True).run_date() == days_ago(1)
+
+
+async def empty_section():
+    raise NoCardsFound('https://www.boshamlan.com/search')
+    yield
+
+
+async def broken_section():
+    yield {'title': 'x'}
+    raise RuntimeError('browser crashed')
+
+
+def test_empty_section_finishes_its_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main = Main(None, output_formats=['jsonl'], date='2024-01-31')
+    entry = CrawlJournal(os.path.join('2024-01-31', '.journal'), 'rent')
+    assert asyncio.run(main.save_records(empty_section(), 'rent', journal=entry)) == []
+    assert CrawlJournal.finished(entry.path) and unfinished_runs() == []
+
+
+def test_failed_section_removes_its_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main = Main(None, output_formats=['jsonl'], date='2024-01-31')
+    entry = journal('.', '2024-01-31', 'rent', finish=False)
+    asyncio.run(main.save_records(broken_section(), 'rent', journal=entry))
+    assert not os.path.exists(entry.path) and unfinished_runs() == []
+
+
+class StubDrive:
+    def __init__(self, failed=()):
+        self.failed = failed
+
+    def upload_files(self, files, folder_name):
+        return {file_name: ['id'] for file_name in files if file_name not in self.failed}
+
+
+def test_successful_upload_removes_the_journals(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal('.', '2024-01-31', 'rent', finish=True)
+    main = Main({}, date='2024-01-31')
+    main.drive_saver = StubDrive(failed={'2024-01-31/sale.csv'})
+    main.output_files = ['2024-01-31/rent.csv', '2024-01-31/sale.csv']
+    main.upload_to_drive()
+    assert os.path.isdir(os.path.join('2024-01-31', '.journal'))
+    main.drive_saver = StubDrive()
+    main.upload_to_drive()
+    assert not os.path.exists(os.path.join('2024-01-31', '.journal'))
@@ -0,0 +1,40 @@
+import json
+
+from DetailPageFetcher import DetailPageFetcher
+
+URL = 'https://www.boshamlan.com/ad/90211'
+
+
+def page(body='', state=None):
+    script = f'<script type="application/json">{json.dumps(state)}</script>' if state is not None else ''
+    return f'<html><body><header><a href="tel:22223333">Call us</a></header>{body}{script}</body></html>'
+
+
+def test_contact_block_and_views():
+    html = page(
+        '<div class="flex gap-3 justify-center"><a href="tel:99887766">Call</a></div>'
+        '<div class="flex items-center justify-center gap-1 rounded bg-whitish-transparent py-1 px-1.5 text-xs min-w-[62px]">'
+        '<span>eye</span><div>1,234</div></div>'
+    )
+    mobile, views = DetailPageFetcher().parse_details(html, URL)
+    assert (mobile, views) == ('99887766', '1,234')
+
+
+def test_header_phone_is_not_the_listing_phone():
+    assert DetailPageFetcher().parse_details(page(), URL) == (None, None)
+
+
+def test_state_of_the_listing_object():
+    state = {'props': {'post': {'id': 90211, 'views': 57, 'user': {'phone': '55443322'}},
+                       'related': [{'id': 1, 'phone': '11112222', 'views': 9}]}}
+    assert DetailPageFetcher().parse_details(page(state=state), URL) == ('55443322', '57')
+
+
+def test_state_of_other_listings_is_ignored():
+    state = {'props': {'site': {'phone': '22223333'}, 'related': [{'id': 1, 'phone': '11112222', 'views': 9}]}}
+    assert DetailPageFetcher().parse_details(page(state=state), URL) == (None, None)
+
+
+def test_related_listings_inside_the_listing_are_ignored():
+    state = {'post': {'id': '90211', 'similar': [{'id': 2, 'phone': '11112222', 'views': 3}]}}
+    assert DetailPageFetcher().parse_details(page(state=state), URL + '/') == (None, None)
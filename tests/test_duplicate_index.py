@@ -0,0 +1,52 @@
+import asyncio
+
+from CardRecords import PropertyCard
+from DuplicateIndex import DuplicateIndex
+from PropertyCardScraper import PropertyCardScraper
+
+TITLE = 'شقة للإيجار في السالمية'
+DESCRIPTION = 'ثلاث غرف وصالة ومطبخ وحمامين قريبة من البحر والخدمات مع موقف سيارة'
+
+
+def card(listing, phone):
+    return PropertyCard(title=TITLE, description=DESCRIPTION, link=f"https://www.boshamlan.com/ad/{listing}",
+                        mobile_number=phone)
+
+
+async def stream(*cards):
+    for record in cards:
+        yield record
+
+
+def flagged(index, *cards):
+    async def collect():
+        return [record async for record in index.flag(stream(*cards), 'rent', '2024-01-31')]
+    return asyncio.run(collect())
+
+
+def test_signatures_are_stable(tmp_path):
+    first = DuplicateIndex(str(tmp_path / 'a.sqlite3'))
+    second = DuplicateIndex(str(tmp_path / 'b.sqlite3'))
+    assert (first.signature(TITLE, DESCRIPTION) == second.signature(TITLE, DESCRIPTION)).all()
+    assert first.signature('شقة', None) is None
+    first.close()
+    second.close()
+
+
+def test_repost_is_flagged(tmp_path):
+    index = DuplicateIndex(str(tmp_path / 'dedup.sqlite3'))
+    original, repost = flagged(index, card(1, '50000001'), card(2, '50000001'))
+    assert original.duplicate_of is None
+    assert repost.duplicate_of == 'https://www.boshamlan.com/ad/1'
+    index.close()
+
+
+def test_repost_skips_details_without_taking_the_phone(tmp_path):
+    index = DuplicateIndex(str(tmp_path / 'dedup.sqlite3'))
+    flagged(index, card(1, '50000001'))
+    scraper = PropertyCardScraper('https://www.boshamlan.com/search', dedup=index)
+    record = {'index': 0, 'detail_url': 'https://www.boshamlan.com/ad/2', 'title': TITLE, 'description': DESCRIPTION,
+              'price': None, 'relative_date': 'منذ ساعة', 'image_url': None, 'is_pinned': False}
+    assert scraper.known_details(record) == ('https://www.boshamlan.com/ad/2', None, None)
+    assert scraper.build_card_data(record)['duplicate_of'] == 'https://www.boshamlan.com/ad/1'
+    index.close()
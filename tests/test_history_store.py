@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+
+from CardRecords import PropertyCard, UnchangedPropertyCard
+from HistoryStore import HistoryStore
+from main import Main
+from PropertyCardScraper import PropertyCardScraper
+from SeenListingIndex import SeenListingIndex
+
+DATE = '2024-01-31'
+
+
+def card(record_type, listing, views):
+    return record_type(title=f"شقة {listing}", price='150,000 د.ك', link=f"https://www.boshamlan.com/ad/{listing}",
+                       views_number=str(views), pin_status='Not pinned')
+
+
+async def section():
+    yield card(PropertyCard, 1, 10)
+    yield card(UnchangedPropertyCard, 2, 20)
+
+
+def test_unchanged_listings_only_reach_the_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = HistoryStore('history')
+    main = Main(None, output_formats=['jsonl'], date=DATE, history=history)
+    paths = asyncio.run(main.save_records(section(), 'sale'))
+    with open(paths[0], encoding='utf-8') as f:
+        assert [json.loads(line)['link'] for line in f] == ['https://www.boshamlan.com/ad/1']
+    assert [row['views'] for row in history.history('https://www.boshamlan.com/ad/2')] == [20]
+    assert len(history.snapshot(DATE)) == 2
+    history.close()
+
+
+def record(listing):
+    return {'index': listing, 'detail_url': f"https://www.boshamlan.com/ad/{listing}", 'title': f"شقة {listing}",
+            'price': '150,000 د.ك', 'relative_date': 'منذ ساعة', 'description': 'd', 'image_url': None, 'is_pinned': False}
+
+
+def scraper(tmp_path, keep_unchanged):
+    index = SeenListingIndex(str(tmp_path / 'seen.sqlite3'))
+    scraper = PropertyCardScraper('https://www.boshamlan.com/search', seen_index=index, keep_unchanged=keep_unchanged)
+    index.mark_seen(scraper.url, [(index.listing_id(record(1)), index.content_hash(scraper.build_card_data(record(1))))])
+    scraper.known_listings = index.load(scraper.url)
+    return scraper
+
+
+def test_unchanged_listings_are_skipped_without_history(tmp_path):
+    kept = scraper(tmp_path, keep_unchanged=False).drop_unchanged([record(1), record(2)])
+    assert [r['index'] for r in kept] == [2]
+
+
+def test_unchanged_listings_are_kept_for_the_history(tmp_path):
+    kept = scraper(tmp_path, keep_unchanged=True).drop_unchanged([record(1), record(2)])
+    assert [(r['index'], r.get('unchanged', False)) for r in kept] == [(1, True), (2, False)]
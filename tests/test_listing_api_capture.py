@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from urllib.parse import parse_qsl, urlparse
+
+import pytest
+
+from CardParsing import CardClassifier, PIN_MARKER
+from ListingApiCapture import ListingApiCapture
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'api')
+SEARCH_URL = 'https://www.boshamlan.com/api/search?c=1&t=2&page=1'
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Stand-ins for the Playwright request/response objects the capture reads
+class StubRequest:
+    def __init__(self, url, method='GET', body=None):
+        self.url = url
+        self.method = method
+        self.post_data_json = body
+        self.resource_type = 'fetch'
+
+
+class StubResponse:
+    def __init__(self, payload, request=None, status=200):
+        self.payload = payload
+        self.request = request
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = {'content-type': 'application/json'}
+
+    async def json(self):
+        return self.payload
+
+
+# APIRequestContext returning a fixture per page number (query string or JSON body)
+class StubRequestContext:
+    def __init__(self, pages, param='page'):
+        self.pages = pages  # {page value: payload}
+        self.param = param
+        self.calls = []
+
+    async def get(self, url):
+        self.calls.append(url)
+        value = int(dict(parse_qsl(urlparse(url).query))[self.param])
+        return self.respond(value)
+
+    async def post(self, url, data=None):
+        self.calls.append(data)
+        return self.respond(int(data[self.param]))
+
+    def respond(self, value):
+        if value not in self.pages:
+            return StubResponse(None, status=404)
+        return StubResponse(self.pages[value])
+
+
+def captured(payload, url=SEARCH_URL, method='GET', body=None):
+    capture = ListingApiCapture()
+    asyncio.run(capture.read_response(StubResponse(payload, StubRequest(url, method, body))))
+    return capture
+
+
+def test_find_listing_items_picks_the_listing_array():
+    capture = ListingApiCapture()
+    items = capture.find_listing_items(load('search_page1.json'))
+    assert [item['id'] for item in items] == [90211, 90207, 90190]  # Not the longer filters list
+
+
+def test_find_listing_items_offices():
+    items = ListingApiCapture().find_listing_items(load('offices.json'))
+    assert [item['id'] for item in items] == [12, 13]
+
+
+@pytest.mark.parametrize('payload', [load('settings.json'), load('search_page3.json'), {}, [], 'text', None])
+def test_find_listing_items_without_listings(payload):
+    assert ListingApiCapture().find_listing_items(payload) == []
+
+
+def test_read_response_records_the_endpoint():
+    capture = captured(load('search_page1.json'))
+    assert len(capture.payloads) == 1
+    assert capture.endpoint == {'url': SEARCH_URL, 'method': 'GET', 'body': None, 'page_size': 3}
+    assert capture.detect_paging() == ('query', 'page', 1, False)
+
+
+def test_read_response_ignores_other_json():
+    capture = captured(load('settings.json'))
+    assert capture.payloads == [] and capture.endpoint is None
+
+
+def test_to_property_record():
+    capture = ListingApiCapture()
+    items = capture.find_listing_items(load('search_page1.json'))
+    assert capture.to_property_record(items[0], 0) == {
+        'index': 0,
+        'pin_text': PIN_MARKER,
+        'title': 'شقة للإيجار في السالمية',
+        'price': '350 د.ك',
+        'relative_date': '2024-02-01T09:00:00',
+        'description': '3 غرف وصالة، الدور الثالث مع مصعد',
+        'image_url': 'https://images.boshamlan.com/90211/1.jpg',
+        'detail_url': 'https://www.boshamlan.com/ad/90211',
+        'mobile_number': '50000001',
+        'views_number': '42',
+    }
+    record = capture.to_property_record(items[1], 1)
+    assert record['pin_text'] is None
+    assert record['price'] == '900'
+    assert record['detail_url'] == 'https://www.boshamlan.com/ad/90207'
+    record = capture.to_property_record(items[2], 2)
+    assert record['image_url'] is None
+    assert record['mobile_number'] is None and record['views_number'] is None
+
+
+def test_to_property_record_links_and_dates():
+    capture = ListingApiCapture()
+    items = capture.find_listing_items(load('search_page2.json'))
+    record = capture.to_property_record(items[1], 0)
+    assert record['image_url'] == 'https://images.boshamlan.com/90188/1.jpg'
+    assert record['relative_date'] == datetime.fromtimestamp(1706600000).isoformat(timespec='seconds')
+    record = capture.to_property_record(items[2], 1)
+    assert record['detail_url'] is None  # A slug alone is not a detail URL
+    assert record['relative_date'] == '2024-01-20T10:00:00Z'
+
+
+def test_api_dates_are_classified_like_card_dates():
+    # Listings under a day old are recent, as "منذ ... ساعات" cards are; a day or more is old, as "منذ يوم" is
+    capture = ListingApiCapture()
+    classifier = CardClassifier(datetime(2024, 2, 1, 12, 0))
+    items = capture.find_listing_items(load('search_page1.json'))
+    records = classifier.classify_many([capture.to_property_record(item, i) for i, item in enumerate(items)])
+    assert [record['is_old'] for record in records] == [False, True, False]
+    assert records[1]['posted_at'] == '2024-01-31T08:30:00'
+    assert classifier.classify({'relative_date': 'منذ يوم'})['is_old'] is True
+
+
+def test_to_office_record():
+    capture = ListingApiCapture()
+    items = capture.find_listing_items(load('offices.json'))
+    assert capture.to_office_record(items[0], 0) == {
+        'image': 'https://images.boshamlan.com/offices/12.png',
+        'title': 'مكتب الوسيط العقاري',
+        'description': 'بيع وشراء وتأجير العقارات',
+        'ads': '25',
+        'link': 'https://www.boshamlan.com/المكاتب/50001234',
+        'mobile_number': '50001234',
+    }
+    record = capture.to_office_record(items[1], 1)
+    assert record['description'] == 'No Description Provided'
+    assert record['ads'] == '0'
+    assert record['link'] is None
+    assert record['image'] is None
+    assert record['mobile_number'] == '+965 5000 5678'
+
+
+def test_collect_pages_through_the_query_parameter():
+    capture = captured(load('search_page1.json'))
+    context = StubRequestContext({2: load('search_page2.json'), 3: load('search_page3.json')})
+    records = asyncio.run(capture.collect(context, capture.to_property_record))
+    assert [record['detail_url'] for record in records] == [
+        'https://www.boshamlan.com/ad/90211',
+        'https://www.boshamlan.com/ad/90207',
+        'https://www.boshamlan.com/ad/90190',
+        'https://www.boshamlan.com/ad/90188',
+        None,
+    ]
+    assert [record['index'] for record in records] == [0, 1, 2, 3, 4]  # The overlapping item is not repeated
+    assert [dict(parse_qsl(urlparse(url).query))['page'] for url in context.calls] == ['2', '3']
+
+
+def test_collect_pages_through_a_body_offset():
+    capture = captured(load('search_page1.json'), url='https://www.boshamlan.com/api/search', method='POST',
+                       body={'category': 1, 'offset': 0})
+    assert capture.detect_paging() == ('body', 'offset', 0, True)
+    context = StubRequestContext({3: load('search_page2.json'), 6: load('search_page3.json')}, param='offset')
+    records = asyncio.run(capture.collect(context, capture.to_property_record))
+    assert len(records) == 5
+    assert context.calls == [{'category': 1, 'offset': 3}, {'category': 1, 'offset': 6}]
+
+
+def test_collect_stops_when_asked():
+    capture = captured(load('search_page1.json'))
+    context = StubRequestContext({2: load('search_page2.json'), 3: load('search_page3.json')})
+    records = asyncio.run(capture.collect(context, capture.to_property_record, should_stop=lambda new: True))
+    assert len(records) == 3
+    assert context.calls == []
+
+
+def test_collect_stops_on_http_errors():
+    capture = captured(load('search_page1.json'))
+    context = StubRequestContext({})
+    records = asyncio.run(capture.collect(context, capture.to_property_record))
+    assert len(records) == 3
+    assert len(context.calls) == 1
+
+
+def test_collect_without_paging_uses_captured_pages():
+    capture = captured(load('offices.json'), url='https://www.boshamlan.com/api/offices')
+    context = StubRequestContext({})
+    records = asyncio.run(capture.collect(context, capture.to_office_record))
+    assert [record['title'] for record in records] == ['مكتب الوسيط العقاري', 'مكتب الدار']
+    assert context.calls == []
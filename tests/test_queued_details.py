@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from CardRecords import DetailPagesFailed
+from main import metrics_path
+from PropertyCardScraper import PropertyCardScraper
+
+
+class StubPage:
+    def __init__(self, broken):
+        self.broken = broken
+
+    async def goto(self, url):
+        if url in self.broken:
+            raise TimeoutError(f"Timeout loading {url}")
+
+    async def close(self):
+        pass
+
+
+class StubContext:
+    def __init__(self, broken):
+        self.broken = broken
+
+    async def new_page(self):
+        return StubPage(self.broken)
+
+
+class StubPool:
+    def __init__(self, broken=()):
+        self.broken = broken
+
+    async def new_context(self):
+        return StubContext(self.broken)
+
+    async def release(self, context):
+        pass
+
+
+class StubScheduler:
+    async def run(self, call, description):
+        return await call()
+
+
+def record(index):
+    return {'index': index, 'detail_url': f"https://www.boshamlan.com/ad/{index}", 'title': 't', 'price': 'p',
+            'relative_date': 'منذ ساعة', 'description': 'd', 'image_url': None, 'is_pinned': False}
+
+
+def scraper(broken=()):
+    scraper = PropertyCardScraper('https://www.boshamlan.com/search', pool=StubPool(broken), detail_pool_size=2,
+                                  scheduler=StubScheduler())
+
+    async def scrape_detail_fields(page):
+        return '99887766', '12'
+    scraper.scrape_detail_fields = scrape_detail_fields
+    return scraper
+
+
+def test_queued_cards_get_their_details():
+    cards = asyncio.run(scraper().scrape_queued_cards([record(1), record(2)]))
+    assert [(card['link'], card['mobile_number']) for card in cards] == [
+        ('https://www.boshamlan.com/ad/1', '99887766'), ('https://www.boshamlan.com/ad/2', '99887766')]
+
+
+def test_failed_detail_page_fails_the_queued_batch():
+    with pytest.raises(DetailPagesFailed) as error:
+        asyncio.run(scraper(broken={'https://www.boshamlan.com/ad/2'}).scrape_queued_cards([record(1), record(2)]))
+    assert error.value.urls == ['https://www.boshamlan.com/ad/2']
+
+
+def test_worker_metrics_file():
+    assert metrics_path('metrics.json') == 'metrics.json'
+    assert metrics_path('out/metrics.json', 'host:1234') == 'out/metrics.host-1234.json'
@@ -0,0 +1,54 @@
+import asyncio
+import csv
+import json
+import os
+
+import pytest
+
+from main import Main
+from RecordWriters import MultiWriter
+
+
+# Minimal record with the to_dict() the writers consume
+class Row:
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def to_dict(self):
+        return dict(self.fields)
+
+
+async def stream(rows, error=None):
+    for row in rows:
+        yield row
+    if error is not None:
+        raise error
+
+
+def test_text_formats_are_written(tmp_path):
+    writer = MultiWriter(str(tmp_path), 'rent', ['jsonl', 'csv'])
+    count = asyncio.run(writer.consume(stream([Row(title='شقة', views=3), Row(title='دور', views=None)])))
+    assert count == 2
+    with open(tmp_path / 'rent.jsonl', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [{'title': 'شقة', 'views': 3}, {'title': 'دور', 'views': None}]
+    with open(tmp_path / 'rent.csv', encoding='utf-8-sig', newline='') as f:
+        assert list(csv.DictReader(f)) == [{'title': 'شقة', 'views': '3'}, {'title': 'دور', 'views': ''}]
+
+
+def test_empty_section_leaves_no_files(tmp_path):
+    writer = MultiWriter(str(tmp_path / 'day'), 'rent', ['jsonl', 'csv'])
+    assert asyncio.run(writer.consume(stream([]))) == 0
+    assert not os.path.exists(tmp_path / 'day')
+
+
+def test_failed_section_leaves_no_empty_files(tmp_path):
+    writer = MultiWriter(str(tmp_path), 'rent', ['jsonl', 'csv'])
+    with pytest.raises(RuntimeError):
+        asyncio.run(writer.consume(stream([], error=RuntimeError('scrape failed'))))
+    assert os.listdir(tmp_path) == []
+
+
+def test_formats_writing_the_same_file_are_rejected():
+    with pytest.raises(ValueError):
+        Main(None, output_formats=['xlsx', 'xlsx-pandas'])
+    Main(None, output_formats=['xlsx', 'parquet', 'csv', 'jsonl'])
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from RequestScheduler import RequestScheduler
+
+
+class Response:
+    def __init__(self, status):
+        self.status = status
+        self.headers = {}
+
+
+def scheduler():
+    return RequestScheduler(rate=100.0, burst=100, max_retries=1, base_delay=0.0, max_delay=0.0)
+
+
+def test_retryable_failures_slow_down():
+    requests = scheduler()
+    for _ in range(10):
+        asyncio.run(requests.run(lambda: asyncio.sleep(0, Response(503))))
+    assert requests.rate < 100.0
+
+
+def test_other_errors_are_not_recorded():
+    requests = scheduler()
+    requests.rate = 50.0
+
+    async def broken():
+        raise ValueError('no such selector')
+
+    for _ in range(10):
+        with pytest.raises(ValueError):
+            asyncio.run(requests.run(broken))
+    assert not requests.outcomes and requests.rate == 50.0
+
+
+def test_success_is_recorded():
+    requests = scheduler()
+    requests.rate = 50.0
+    assert asyncio.run(requests.run(lambda: asyncio.sleep(0, Response(200)))).status == 200
+    assert list(requests.outcomes) == [False] and requests.rate > 50.0
+
@@ -0,0 +1,86 @@
+import pytest
+
+from fake_drive import FOLDER, FakeDrive
+from SavingOnDrive import SavingOnDrive
+
+DATE = '2024-01-31'
+
+
+@pytest.fixture
+def drive():
+    with FakeDrive() as server:
+        yield server
+
+
+@pytest.fixture
+def parents(drive):
+    return [drive.add('first', mime_type=FOLDER)['id'], drive.add('second', mime_type=FOLDER)['id']]
+
+
+@pytest.fixture
+def csv_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'sale.csv').write_text('title,price\nflat,100\n')
+    return 'sale.csv'
+
+
+def saver(drive, tmp_path, **kwargs):
+    return SavingOnDrive(None, api_endpoint=drive.base_url, max_retries=0,
+                         folder_cache_path=str(tmp_path / 'drive_folders.json'), **kwargs)
+
+
+def content(drive, file_id):
+    return drive.files[file_id]['content']
+
+
+def test_upload_once_and_copy(drive, parents, csv_file, tmp_path):
+    first, second = saver(drive, tmp_path).upload_files([csv_file], DATE, parents)[csv_file]
+    assert drive.requests['upload'] == 1 and drive.requests['copy'] == 1
+    assert drive.files[first]['parents'] != drive.files[second]['parents']
+    assert content(drive, first) == content(drive, second) == b'title,price\nflat,100\n'
+
+
+def test_folders_are_reused_across_runs(drive, parents, csv_file, tmp_path):
+    saver(drive, tmp_path).upload_files([csv_file], DATE, parents)
+    saver(drive, tmp_path).upload_files([csv_file], DATE, parents)
+    assert drive.requests['create_folder'] == 2
+    assert sum(file['name'] == DATE for file in drive.files.values()) == 2
+
+
+def test_deleted_cached_folder_is_recreated(drive, parents, csv_file, tmp_path):
+    saver(drive, tmp_path).upload_files([csv_file], DATE, parents)
+    folder_id = next(file['id'] for file in drive.files.values() if file['name'] == DATE and parents[0] in file['parents'])
+    drive.files[folder_id]['trashed'] = True
+    saver(drive, tmp_path).upload_files([csv_file], DATE, parents)
+    assert drive.requests['create_folder'] == 3
+
+
+def test_unchanged_file_is_skipped(drive, parents, csv_file, tmp_path):
+    uploaded = saver(drive, tmp_path).upload_files([csv_file], DATE, parents)
+    assert saver(drive, tmp_path).upload_files([csv_file], DATE, parents) == uploaded
+    assert drive.requests['upload'] == 1 and drive.requests['update'] == 0 and drive.requests['copy'] == 1
+
+
+def test_changed_file_is_replaced(drive, parents, csv_file, tmp_path):
+    first, second = saver(drive, tmp_path).upload_files([csv_file], DATE, parents)[csv_file]
+    (tmp_path / csv_file).write_text('title,price\nflat,120\n')
+    new_first, new_second = saver(drive, tmp_path).upload_files([csv_file], DATE, parents)[csv_file]
+    assert new_first == first and drive.requests['update'] == 1
+    assert second not in drive.files and drive.requests['copy'] == 2
+    assert content(drive, new_first) == content(drive, new_second) == b'title,price\nflat,120\n'
+
+
+def test_shortcut_in_second_parent(drive, parents, csv_file, tmp_path):
+    first, second = saver(drive, tmp_path, link_mode='shortcut').upload_files([csv_file], DATE, parents)[csv_file]
+    assert drive.files[second]['shortcutDetails'] == {'targetId': first}
+    (tmp_path / csv_file).write_text('title,price\nflat,120\n')
+    assert saver(drive, tmp_path, link_mode='shortcut').upload_files([csv_file], DATE, parents)[csv_file] == [first, second]
+    assert drive.requests['update'] == 1 and drive.requests['create_shortcut'] == 1
+
+
+def test_shortcut_in_first_parent_is_replaced(drive, parents, csv_file, tmp_path):
+    folder_id = drive.add(DATE, parents[0], FOLDER)['id']
+    stale = drive.add(csv_file, folder_id, target='elsewhere')['id']
+    first, _ = saver(drive, tmp_path).upload_files([csv_file], DATE, parents)[csv_file]
+    assert stale not in drive.files
+    assert content(drive, first) == b'title,price\nflat,100\n'